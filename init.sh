@@ -237,8 +237,36 @@ data:
   signatureKey: ${webhook_b64}
 YAML
 
+# The NetBox steps below run as commands of one long-lived eda_netbox.py
+# process, so the interpreter starts once and the token and NetBox
+# connections are shared. `lab <command>` prints the command's output and
+# returns its exit status.
+LAB_DIR=$(mktemp -d)
+mkfifo "$LAB_DIR/in" "$LAB_DIR/out"
+NETBOX_API_TOKEN="${NETBOX_API_TOKEN}" uv run scripts/eda_netbox.py serve <"$LAB_DIR/in" >"$LAB_DIR/out" &
+LAB_PID=$!
+exec 3>"$LAB_DIR/in" 4<"$LAB_DIR/out"
+stop_lab() {
+    echo exit >&3 2>/dev/null || true
+    exec 3>&- 4<&-
+    wait "$LAB_PID" 2>/dev/null || true
+    rm -rf "$LAB_DIR"
+}
+trap stop_lab EXIT
+lab() {
+    local line
+    echo "$*" >&3
+    while IFS= read -r line <&4; do
+        case "$line" in
+            "@@done "*) return "${line#@@done }" ;;
+        esac
+        printf '%s\n' "$line"
+    done
+    return 1
+}
+
 echo -e "${GREEN}--> Importing Nokia device types...${RESET}"
-uv run scripts/import_device_types.py | indent_out
+lab import | indent_out
 
 echo -e "${GREEN}--> Applying NetBox App...${RESET}"
 APP_INSTALL_WF=$(kubectl create -f ./manifests/0001_netbox_app_install.yaml)
@@ -250,16 +278,7 @@ kubectl -n eda-system wait --for=jsonpath='{.status.result}'=Completed \
     "$APP_INSTALL_WF_NAME" --timeout=300s | indent_out
 
 echo -e "${GREEN}--> Waiting for NetBox CRD to be installed...${RESET}"
-for i in {1..60}; do
-    if kubectl get crd instances.netbox.eda.nokia.com >/dev/null 2>&1; then
-        echo "NetBox CRD is ready" | indent_out
-        break
-    fi
-    echo "Waiting for CRD... ($i/60)" | indent_out
-    sleep 5
-done
-
-if ! kubectl get crd instances.netbox.eda.nokia.com >/dev/null 2>&1; then
+if ! lab wait crd instances.netbox.eda.nokia.com --timeout 300 | indent_out; then
     echo "Error: NetBox CRD not installed after 5 minutes" >&2
     exit 1
 fi
@@ -268,20 +287,19 @@ echo -e "${GREEN}--> Applying NetBox Instance manifest...${RESET}"
 kubectl apply -f ./manifests/0010_netbox_instance.yaml | indent_out
 
 echo -e "${GREEN}--> Waiting for NetBox site to be synced...${RESET}"
-for i in {1..60}; do
-    SITE_COUNT=$(curl -s -H "Authorization: Token ${NETBOX_API_TOKEN}" \
-        "${NETBOX_URL}/api/dcim/sites/?cf_objectName=${ST_STACK_NS}/netbox" | \
-        python3 -c "import sys,json; print(json.load(sys.stdin).get('count',0))" 2>/dev/null || echo 0)
-    if [[ "$SITE_COUNT" -gt 0 ]]; then
-        echo "Site synced successfully" | indent_out
-        break
-    fi
-    echo "Waiting for site... ($i/60)" | indent_out
-    sleep 10
-done
+if ! lab wait site "${ST_STACK_NS}/netbox" \
+    --netbox-url "${NETBOX_URL}" --timeout 600 | indent_out; then
+    echo "Warning: site not synced yet; continuing." >&2
+fi
+
+echo -e "${GREEN}--> Checking NetBox components...${RESET}"
+if ! lab health --timeout 600 | indent_out; then
+    echo "Error: NetBox components are not healthy; see the failing components above" >&2
+    exit 1
+fi
 
 echo -e "${GREEN}--> Configuring NetBox for EDA integration...${RESET}"
-uv run scripts/configure_netbox.py | indent_out
+lab configure | indent_out
 
 echo -e "${GREEN}--> Applying Allocations manifest...${RESET}"
 kubectl apply -f ./manifests/0020_allocations.yaml | indent_out
@@ -292,7 +310,10 @@ kubectl apply -f ./manifests/0020_allocations.yaml | indent_out
 echo -e "${GREEN}--> Triggering Instance reconciliation...${RESET}"
 kubectl delete instance netbox -n ${ST_STACK_NS} --wait=true >/dev/null 2>&1
 kubectl apply -f ./manifests/0010_netbox_instance.yaml >/dev/null 2>&1
-sleep 5
+if ! lab wait resource instances.netbox.eda.nokia.com netbox \
+    -n ${ST_STACK_NS} --timeout 120 | indent_out; then
+    echo "Warning: Instance not reconciled yet; continuing." >&2
+fi
 
 if [[ "$IS_CX" == "true" ]]; then
     echo -e "${GREEN}--> Deploying CX topology...${RESET}"
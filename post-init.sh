@@ -83,8 +83,42 @@ echo "Found ${DEVICE_TYPE_COUNT} device types in NetBox"
 
 ensure_uv
 
+# As in init.sh, the NetBox steps run as commands of one eda_netbox.py
+# serve process. `lab <command>` prints the command's output and returns
+# its exit status.
+LAB_DIR=$(mktemp -d)
+mkfifo "$LAB_DIR/in" "$LAB_DIR/out"
+NETBOX_API_TOKEN="${NETBOX_API_TOKEN}" uv run scripts/eda_netbox.py serve <"$LAB_DIR/in" >"$LAB_DIR/out" &
+LAB_PID=$!
+exec 3>"$LAB_DIR/in" 4<"$LAB_DIR/out"
+stop_lab() {
+    echo exit >&3 2>/dev/null || true
+    exec 3>&- 4<&-
+    wait "$LAB_PID" 2>/dev/null || true
+    rm -rf "$LAB_DIR"
+}
+trap stop_lab EXIT
+lab() {
+    local line
+    echo "$*" >&3
+    while IFS= read -r line <&4; do
+        case "$line" in
+            "@@done "*) return "${line#@@done }" ;;
+        esac
+        printf '%s\n' "$line"
+    done
+    return 1
+}
+
+echo -e "${GREEN}--> Checking NetBox components...${RESET}"
+# The webhook route only exists once the NetBox Instance below is applied
+if ! lab health --timeout 600 --skip webhook | indent_out; then
+    echo "Error: NetBox components are not healthy; see the failing components above" >&2
+    exit 1
+fi
+
 echo -e "${GREEN}--> Configuring NetBox for EDA integration...${RESET}"
-uv run scripts/configure_netbox.py | indent_out
+lab configure | indent_out
 
 echo -e "${GREEN}--> Applying NetBox Instance manifest...${RESET}"
 kubectl apply -f ./manifests/0010_netbox_instance.yaml | indent_out
@@ -0,0 +1,444 @@
+#!/usr/bin/env python
+# /// script
+# dependencies = ["requests"]
+# ///
+"""
+Benchmark concurrent allocations from the NetBox-backed pools
+
+Many workers claim IP addresses and subnets from the prefixes created by
+configure_netbox.py through the `available-ips` and `available-prefixes`
+endpoints, the same calls the `Allocation` resources make, and release a
+share of them again. Throughput, claim and release latency percentiles,
+duplicate and failed claims and pool fragmentation are sampled while the
+run progresses.
+
+Run against the lab NetBox (.netbox_url) or, with --local, against the
+stand-in from netbox_standin.py:
+
+    uv run scripts/bench_allocations.py --local --workers 32 --duration 20
+"""
+
+import argparse
+import ipaddress
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from netbox_client import AdaptiveLimiter, NetBoxSession
+
+# Pools of manifests/0020_allocations.yaml: tag, claim endpoint, prefix length
+POOLS = {
+    "systemip-v4": ("eda-systemip-v4", "available-ips", None),
+    "systemip-v6": ("eda-systemip-v6", "available-ips", None),
+    "isl-v4": ("eda-isl-v4", "available-prefixes", 31),
+    "isl-v6": ("eda-isl-v6", "available-prefixes", 127),
+    "mgmt-v4": ("eda-mgmt-v4", "available-ips", None),
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+class PoolState:
+    """Claims held from one parent prefix, tracked locally"""
+
+    def __init__(self, name, tag, kind, prefix_length, parent):
+        self.name = name
+        self.tag = tag
+        self.kind = kind
+        self.prefix_length = prefix_length
+        self.parent_id = parent["id"]
+        self.network = ipaddress.ip_network(parent["prefix"])
+        self.endpoint = "ipam/prefixes" if kind == "available-prefixes" else "ipam/ip-addresses"
+        self.lock = threading.Lock()
+        # object id -> (first, last) address range
+        self.held = {}
+        # first address -> object id, to detect the same block handed out twice
+        self.owners = {}
+        # Held objects with a DELETE in flight
+        self.releasing = set()
+        self.duplicates = 0
+        self.exhausted = False
+
+    def record(self, obj):
+        value = obj.get("prefix") or obj.get("address")
+        if self.kind == "available-prefixes":
+            network = ipaddress.ip_network(value)
+        else:
+            network = ipaddress.ip_network(ipaddress.ip_interface(value).ip)
+        first = int(network.network_address)
+        last = first + network.num_addresses - 1
+        with self.lock:
+            if first in self.owners:
+                self.duplicates += 1
+            self.owners[first] = obj["id"]
+            self.held[obj["id"]] = (first, last)
+
+    def pick_release(self):
+        with self.lock:
+            candidates = [obj_id for obj_id in self.held if obj_id not in self.releasing]
+            if not candidates:
+                return None
+            obj_id = random.choice(candidates)
+            self.releasing.add(obj_id)
+            return obj_id
+
+    def finish_release(self, obj_id, gone):
+        """Stop tracking a picked object once it is gone from NetBox; otherwise keep it held"""
+        with self.lock:
+            self.releasing.discard(obj_id)
+            if not gone:
+                return
+            first, _ = self.held.pop(obj_id)
+            if self.owners.get(first) == obj_id:
+                del self.owners[first]
+
+    def fragmentation(self):
+        """Return (free runs, fragmentation) of the parent prefix
+
+        Fragmentation is 1 - largest free run / total free space, so 0 means
+        all free space is contiguous.
+        """
+        with self.lock:
+            ranges = sorted(self.held.values())
+        first = int(self.network.network_address)
+        last = first + self.network.num_addresses - 1
+        runs = []
+        cursor = first
+        for start, end in ranges:
+            if start > cursor:
+                runs.append(start - cursor)
+            cursor = max(cursor, end + 1)
+        if cursor <= last:
+            runs.append(last - cursor + 1)
+        free = sum(runs)
+        if not free:
+            return 0, 0.0
+        return len(runs), round(1 - max(runs) / free, 4)
+
+
+class Stats:
+    """Latencies and counters shared by the workers"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.claim_latencies = []
+        self.release_latencies = []
+        self.failures = {}
+        self.claims = 0
+        self.releases = 0
+
+    def claimed(self, latency):
+        with self.lock:
+            self.claims += 1
+            self.claim_latencies.append(latency)
+
+    def released(self, latency):
+        with self.lock:
+            self.releases += 1
+            self.release_latencies.append(latency)
+
+    def failed(self, operation, status):
+        key = f"{operation}:{status}"
+        with self.lock:
+            self.failures[key] = self.failures.get(key, 0) + 1
+
+    def window(self, since_claims, since_releases):
+        with self.lock:
+            return (
+                self.claims,
+                self.releases,
+                self.claim_latencies[since_claims:],
+                self.release_latencies[since_releases:],
+            )
+
+
+class AllocationBenchmark:
+    def __init__(self, netbox_url, api_token, pools, workers, release_ratio):
+        self.netbox_url = netbox_url.rstrip("/")
+        # Fixed concurrency: the benchmark measures NetBox, not the limiter
+        limiter = AdaptiveLimiter(initial=workers, minimum=workers, maximum=workers)
+        self.session = NetBoxSession(api_token, max_retries=0, limiter=limiter)
+        self.workers = workers
+        self.release_ratio = release_ratio
+        self.pool_names = pools
+        self.pools = []
+        self.stats = Stats()
+        self.samples = []
+        self._stop = threading.Event()
+
+    def resolve_pools(self):
+        for name in self.pool_names:
+            tag, kind, prefix_length = POOLS[name]
+            response = self.session.get(
+                f"{self.netbox_url}/api/ipam/prefixes/", params={"tag": tag, "limit": 1}
+            )
+            results = response.json().get("results", []) if response.status_code == 200 else []
+            if not results:
+                raise RuntimeError(
+                    f"No prefix tagged '{tag}' found; run configure_netbox.py first"
+                )
+            self.pools.append(PoolState(name, tag, kind, prefix_length, results[0]))
+
+    def claim(self, pool):
+        body = {"status": "active", "description": "bench_allocations"}
+        if pool.prefix_length:
+            body["prefix_length"] = pool.prefix_length
+        start = time.monotonic()
+        response = self.session.post(
+            f"{self.netbox_url}/api/ipam/prefixes/{pool.parent_id}/{pool.kind}/", json=body
+        )
+        latency = time.monotonic() - start
+        if response.status_code == 201:
+            self.stats.claimed(latency)
+            pool.record(response.json())
+        else:
+            if response.status_code == 409:
+                pool.exhausted = True
+            self.stats.failed(f"claim/{pool.name}", response.status_code)
+
+    def release(self, pool):
+        obj_id = pool.pick_release()
+        if obj_id is None:
+            return
+        start = time.monotonic()
+        gone = False
+        try:
+            response = self.session.delete(f"{self.netbox_url}/api/{pool.endpoint}/{obj_id}/")
+            # A 404 means it is gone already; any other failure leaves it held,
+            # so release_all() still cleans it up
+            gone = response.status_code in (204, 404)
+        finally:
+            pool.finish_release(obj_id, gone)
+        latency = time.monotonic() - start
+        if response.status_code == 204:
+            self.stats.released(latency)
+        else:
+            self.stats.failed(f"release/{pool.name}", response.status_code)
+
+    def worker(self, deadline, max_claims):
+        rng = random.Random()
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            if max_claims and self.stats.claims >= max_claims:
+                return
+            if all(pool.exhausted and not pool.held for pool in self.pools):
+                return
+            pool = rng.choice(self.pools)
+            # A full pool only releases until a claim can succeed again
+            if pool.held and (pool.exhausted or rng.random() < self.release_ratio):
+                self.release(pool)
+                pool.exhausted = False
+            elif not pool.exhausted:
+                self.claim(pool)
+
+    def sample(self, start, previous):
+        claims, releases, claim_window, release_window = self.stats.window(*previous[1:])
+        now = time.monotonic()
+        interval = max(now - previous[0], 1e-9)
+        sample = {
+            "t": round(now - start, 2),
+            "claims_per_s": round((claims - previous[1]) / interval, 1),
+            "releases_per_s": round((releases - previous[2]) / interval, 1),
+            "claim_p50_ms": ms(percentile(claim_window, 0.50)),
+            "claim_p95_ms": ms(percentile(claim_window, 0.95)),
+            "claim_p99_ms": ms(percentile(claim_window, 0.99)),
+            "pools": {},
+        }
+        for pool in self.pools:
+            runs, fragmentation = pool.fragmentation()
+            sample["pools"][pool.name] = {
+                "held": len(pool.held),
+                "free_runs": runs,
+                "fragmentation": fragmentation,
+            }
+        self.samples.append(sample)
+        return (now, claims, releases), sample
+
+    def run(self, duration, max_claims=0, sample_interval=1.0, out=sys.stdout):
+        self.resolve_pools()
+        start = time.monotonic()
+        deadline = start + duration
+        previous = (start, 0, 0)
+        out.write(f"{'T':>6}  {'CLAIM/S':>8}  {'REL/S':>7}  {'P50':>7}  {'P95':>7}  {'P99':>7}  POOLS (held/frag)\n")
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(self.worker, deadline, max_claims) for _ in range(self.workers)
+            ]
+            while not all(future.done() for future in futures):
+                try:
+                    time.sleep(min(sample_interval, max(0.0, deadline - time.monotonic()) + 0.05))
+                except KeyboardInterrupt:
+                    # Let the workers finish their current request, then report
+                    self._stop.set()
+                previous, sample = self.sample(start, previous)
+                pools = "  ".join(
+                    f"{name}={state['held']}/{state['fragmentation']:.2f}"
+                    for name, state in sample["pools"].items()
+                )
+                out.write(
+                    f"{sample['t']:>6.1f}  {sample['claims_per_s']:>8.1f}  {sample['releases_per_s']:>7.1f}  "
+                    f"{sample['claim_p50_ms'] or 0:>7.1f}  {sample['claim_p95_ms'] or 0:>7.1f}  "
+                    f"{sample['claim_p99_ms'] or 0:>7.1f}  {pools}\n"
+                )
+            for future in futures:
+                future.result()
+        return self.summary(time.monotonic() - start)
+
+    def summary(self, elapsed):
+        stats = self.stats
+        return {
+            "workers": self.workers,
+            "elapsed_s": round(elapsed, 2),
+            "claims": stats.claims,
+            "releases": stats.releases,
+            "claims_per_s": round(stats.claims / elapsed, 1) if elapsed else None,
+            "claim_latency_ms": {
+                "p50": ms(percentile(stats.claim_latencies, 0.50)),
+                "p95": ms(percentile(stats.claim_latencies, 0.95)),
+                "p99": ms(percentile(stats.claim_latencies, 0.99)),
+            },
+            "release_latency_ms": {
+                "p50": ms(percentile(stats.release_latencies, 0.50)),
+                "p95": ms(percentile(stats.release_latencies, 0.95)),
+                "p99": ms(percentile(stats.release_latencies, 0.99)),
+            },
+            "duplicates": sum(pool.duplicates for pool in self.pools),
+            "failures": dict(sorted(stats.failures.items())),
+            "samples": self.samples,
+        }
+
+    def release_all(self):
+        """Bulk-delete everything still held"""
+        for pool in self.pools:
+            ids = list(pool.held)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                response = self.session.delete(
+                    f"{self.netbox_url}/api/{pool.endpoint}/",
+                    json=[{"id": obj_id} for obj_id in chunk],
+                )
+                if response.status_code != 204:
+                    print(
+                        f"Warning: could not release {len(chunk)} {pool.name} allocations: "
+                        f"{response.status_code}",
+                        file=sys.stderr,
+                    )
+            pool.held.clear()
+            pool.owners.clear()
+            pool.releasing.clear()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark concurrent allocations from the NetBox-backed pools"
+    )
+    parser.add_argument(
+        "--pool",
+        action="append",
+        choices=sorted(POOLS),
+        help="Pool to allocate from; repeat for several (default: isl-v4 and systemip-v4)",
+    )
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent allocators (default: 16)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run (default: 30)")
+    parser.add_argument("--claims", type=int, default=0, help="Stop after this many claims")
+    parser.add_argument(
+        "--release-ratio",
+        type=float,
+        default=0.3,
+        help="Share of operations that release a held allocation (default: 0.3)",
+    )
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Run against a local stand-in server instead of the lab NetBox",
+    )
+    parser.add_argument(
+        "--standin-latency",
+        type=float,
+        default=0.005,
+        help="Seconds a stand-in claim holds its parent prefix lock (default: 0.005)",
+    )
+    parser.add_argument("--pools", default=None, help="pools.json to seed the stand-in with")
+    parser.add_argument("--netbox-url", default=None, help="NetBox URL (default: .netbox_url)")
+    parser.add_argument("--report", default=None, help="Write the summary and samples as JSON")
+    parser.add_argument(
+        "--keep",
+        action="store_true",
+        help="Keep the allocations instead of releasing them at the end",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server = None
+    if args.local:
+        import netbox_standin
+
+        server, netbox_url = netbox_standin.start(
+            netbox_standin.load_prefixes(args.pools), args.standin_latency
+        )
+        api_token = "stand-in"
+        print(f"Using NetBox stand-in at {netbox_url}")
+    else:
+        from configure_netbox import get_api_token
+
+        netbox_url = args.netbox_url
+        if not netbox_url:
+            with open(".netbox_url", "r") as f:
+                netbox_url = f.read().strip()
+        api_token = get_api_token()
+
+    benchmark = AllocationBenchmark(
+        netbox_url,
+        api_token,
+        args.pool or ["isl-v4", "systemip-v4"],
+        args.workers,
+        args.release_ratio,
+    )
+    try:
+        summary = benchmark.run(args.duration, args.claims, args.sample_interval)
+    finally:
+        if not args.keep:
+            benchmark.release_all()
+        if server:
+            server.shutdown()
+
+    print(
+        f"\n{summary['claims']} claims, {summary['releases']} releases in {summary['elapsed_s']}s "
+        f"({summary['claims_per_s']} claims/s with {summary['workers']} workers)"
+    )
+    print(
+        "Claim latency ms: "
+        + ", ".join(f"{k}={v}" for k, v in summary["claim_latency_ms"].items())
+    )
+    print(
+        "Release latency ms: "
+        + ", ".join(f"{k}={v}" for k, v in summary["release_latency_ms"].items())
+    )
+    print(f"Duplicate claims: {summary['duplicates']}")
+    failures = summary["failures"]
+    print("Failed operations: " + (", ".join(f"{k}={v}" for k, v in failures.items()) or "none"))
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Report written to {args.report}")
+    if summary["duplicates"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
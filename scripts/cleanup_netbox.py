@@ -1,15 +1,29 @@
 #!/usr/bin/env python
 # /// script
-# dependencies = ["requests"]
+# dependencies = ["requests", "httpx[http2]"]
 # ///
 """
 Cleanup NetBox - reverts what configure_netbox.py creates
-(webhook, event rule, tags, prefixes, VLAN groups, ASN ranges, RIR)
+(webhook, event rule, tags, prefixes, VLAN groups, ASN ranges, RIR,
+configuration fingerprint)
+
+With --gc, every IPAM/DCIM object that EDA allocated out of those pools
+(tagged eda-* or owned by the EDA tenant) is bulk-deleted as well.
 """
 
+import asyncio
+import json
+import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
+from netbox_client import AsyncFanout, NetBoxSession, fanout_url, format_metrics
+from tracing import propagate, run, span, traced
+
 
 def get_script_dir():
     """Get the directory where this script is located"""
@@ -37,10 +51,9 @@ def read_config_files():
         sys.exit(1)
 
 
+@traced
 def get_api_token():
     """Get NetBox API token from Kubernetes secret"""
-    import subprocess
-
     cmd = [
         "kubectl",
         "-n",
@@ -51,7 +64,7 @@ def get_api_token():
         "-o",
         "jsonpath={.data.api_token}",
     ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = run(cmd, capture_output=True, text=True)
     if result.returncode != 0:
         print(f"Error getting API token: {result.stderr}")
         sys.exit(1)
@@ -61,6 +74,131 @@ def get_api_token():
     return base64.b64decode(result.stdout).decode("utf-8")
 
 
+class CleanupPaused(Exception):
+    """Raised when the per-run deletion budget is used up"""
+
+
+class CleanupJournal:
+    """Append-only record of planned and completed deletions
+
+    One JSON event per line:
+
+        {"op": "start", "netbox_url": ...}
+        {"op": "plan", "step": ..., "endpoint": ..., "ids": [[sort_key, id], ...]}
+        {"op": "deleted", "endpoint": ..., "ids": [...]}
+        {"op": "step_done", "step": ...}
+        {"op": "complete"}
+
+    Replaying the file rebuilds which steps were looked up, which IDs are
+    already gone and which steps finished, so an interrupted cleanup resumes
+    without repeating lookups. Only replayed plans and finished steps are
+    kept in memory, and each is used once: a step run again in the same
+    cleanup looks its objects up anew. Without a path nothing is replayed.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+        self.is_open = False
+        self._reset()
+
+    def _reset(self):
+        self.netbox_url = None
+        self.plans = {}
+        self.deleted = {}
+        self.steps_done = set()
+
+    def _replay(self):
+        """Load an unfinished journal; return True if there is one to resume"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Torn last line from an interrupted write
+                    break
+                op = event.get("op")
+                if op == "start":
+                    self._reset()
+                    self.netbox_url = event.get("netbox_url")
+                elif op == "plan":
+                    self.plans[event["step"]] = (
+                        event["endpoint"],
+                        [tuple(pair) for pair in event["ids"]],
+                    )
+                elif op == "deleted":
+                    self.deleted.setdefault(event["endpoint"], set()).update(event["ids"])
+                elif op == "step_done":
+                    self.steps_done.add(event["step"])
+                elif op == "complete":
+                    self._reset()
+        return self.netbox_url is not None
+
+    def open(self, netbox_url, fresh=False):
+        """Start or resume the journal; return True when resuming"""
+        resumed = not fresh and self._replay() and self.netbox_url == netbox_url
+        if not resumed:
+            self._reset()
+            self.netbox_url = netbox_url
+        if self.path:
+            self._file = open(self.path, "a" if resumed else "w")
+        self.is_open = True
+        if not resumed:
+            self._write({"op": "start", "netbox_url": netbox_url, "time": time.time()})
+        return resumed
+
+    def _write(self, event):
+        if self._file is None:
+            return
+        with self._lock:
+            self._file.write(json.dumps(event) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def planned(self, step):
+        """(endpoint, keyed IDs) of `step` as planned by the resumed run, or None"""
+        return self.plans.get(step)
+
+    def plan(self, step, endpoint, keyed_ids):
+        self._write({"op": "plan", "step": step, "endpoint": endpoint, "ids": keyed_ids})
+
+    def is_deleted(self, endpoint, obj_id):
+        return obj_id in self.deleted.get(endpoint, ())
+
+    def record_deleted(self, endpoint, ids):
+        if not ids:
+            return
+        with self._lock:
+            self.deleted.setdefault(endpoint, set()).update(ids)
+        self._write({"op": "deleted", "endpoint": endpoint, "ids": list(ids)})
+
+    def take_done(self, step):
+        """Return True, once, if the resumed run already finished `step`"""
+        if step not in self.steps_done:
+            return False
+        self.steps_done.discard(step)
+        return True
+
+    def finish_step(self, step):
+        self.plans.pop(step, None)
+        self._write({"op": "step_done", "step": step})
+
+    def complete(self):
+        """Record the end of the cleanup; the next open() starts a new one"""
+        self._write({"op": "complete", "time": time.time()})
+        self.close()
+        self._reset()
+
+    def close(self):
+        self.is_open = False
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
 class NetBoxCleaner:
     """Reverts what configure_netbox.py creates"""
 
@@ -86,194 +224,530 @@ class NetBoxCleaner:
     RIRS = ["eda"]
     WEBHOOKS = ["eda"]
     EVENT_RULES = ["eda"]
+    CONFIG_CONTEXTS = ["eda-config-fingerprint"]
     SITES_BY_TENANT = ["eda"]  # Delete sites belonging to this tenant
 
-    def __init__(self, netbox_url, api_token):
+    # Garbage collection of objects EDA allocated out of the pools, in
+    # deletion order (children before parents)
+    GC_TAG_PREFIX = "eda-"
+    GC_TENANT = "eda"
+    GC_ENDPOINTS = [
+        "ipam/ip-addresses",
+        "ipam/prefixes",
+        "ipam/vlans",
+        "ipam/asns",
+        "ipam/vlan-groups",
+        "ipam/asn-ranges",
+        "dcim/cables",
+        "dcim/devices",
+        "dcim/sites",
+    ]
+    PAGE_SIZE = 1000
+    BULK_DELETE_SIZE = 500
+    # IDs per lookup when a resumed step re-checks its plan
+    RECHECK_SIZE = 200
+
+    def __init__(self, netbox_url, api_token, journal=None, max_deletes=None, session=None, fanout=None):
         self.netbox_url = netbox_url.rstrip("/")
-        self.headers = {
-            "Authorization": f"Token {api_token}",
-            "Content-Type": "application/json",
-        }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
-
-    def delete_by_name(self, endpoint, name, lookup_field="name"):
-        """Delete a single object by name"""
-        response = self.session.get(
-            f"{self.netbox_url}/api/{endpoint}/",
-            params={lookup_field: name}
+        self.session = session or NetBoxSession(api_token)
+        self.api_token = api_token
+        self.journal = journal or CleanupJournal()
+        # With an AsyncFanout, the GC queries and the bulk delete chunks run
+        # concurrently on it instead of on worker threads
+        self.fanout = fanout
+        # Deletions left in this run; None means unlimited
+        self.budget = max_deletes
+        self._gc_tags = None
+
+    def load_pools(self, path):
+        """Delete the prefixes, VLAN groups and ASN ranges of a pools.json instead of the defaults
+
+        The file is read with NetBoxConfigurator.load_pools, so the same set
+        is removed that `configure_netbox.py --pools` created.
+        """
+        from configure_netbox import NetBoxConfigurator
+
+        configurator = NetBoxConfigurator(self.netbox_url, self.api_token, session=self.session)
+        configurator.load_pools(path)
+        self.PREFIXES = [prefix["prefix"] for prefix in configurator.PREFIXES]
+        self.VLAN_GROUPS = [group["name"] for group in configurator.VLAN_GROUPS]
+        self.ASN_RANGES = [asn_range["slug"] for asn_range in configurator.ASN_RANGES]
+
+    @traced
+    def lookup_ids(self, endpoint, field, values, ids=None):
+        """Return (0, id) pairs of the objects whose `field` matches any of `values`
+
+        `ids` restricts the lookup to those IDs.
+        """
+        # Repeated filter values are OR-ed, so one query covers the whole list
+        params = {field: values}
+        if ids is not None:
+            params["id"] = ids
+        return [(0, item.id) for item in self.iter_objects(endpoint, params)]
+
+    @traced
+    def lookup_all_ids(self, endpoint, ids=None):
+        params = {} if ids is None else {"id": ids}
+        return [(0, item.id) for item in self.iter_objects(endpoint, params)]
+
+    def delete_by_name(self, endpoint, name, lookup_field="name", step=None):
+        """Delete the objects whose `lookup_field` matches `name` (or any name in a list)"""
+        names = [name] if isinstance(name, str) else list(name)
+        deleted = self.run_step(
+            step or f"{endpoint} {lookup_field}={','.join(names)}",
+            endpoint,
+            lambda ids=None: self.lookup_ids(endpoint, lookup_field, names, ids),
         )
-        if response.status_code != 200:
-            print(f"  Error looking up {name}: {response.status_code}")
-            return False
-
-        data = response.json()
-        if data.get("count", 0) == 0:
-            return False
-
-        item = data["results"][0]
-        del_response = self.session.delete(
-            f"{self.netbox_url}/api/{endpoint}/{item['id']}/"
+        return deleted > 0
+
+    def delete_by_prefix(self, prefix, step=None):
+        """Delete a prefix (or a list of prefixes) by its CIDR"""
+        return self.delete_by_name("ipam/prefixes", prefix, "prefix", step)
+
+    def delete_sites_by_tenant(self, tenant_name, step=None):
+        """Delete all sites belonging to a tenant (or any tenant in a list)"""
+        tenants = [tenant_name] if isinstance(tenant_name, str) else list(tenant_name)
+        return self.run_step(
+            step or f"dcim/sites tenant={','.join(tenants)}",
+            "dcim/sites",
+            lambda ids=None: self.lookup_ids("dcim/sites", "tenant", tenants, ids),
         )
-        if del_response.status_code in (204, 200):
-            print(f"  Deleted: {name}")
-            return True
-        else:
-            print(f"  Failed to delete {name}: {del_response.status_code}")
-            return False
 
-    def delete_by_prefix(self, prefix):
-        """Delete a prefix by its CIDR"""
-        response = self.session.get(
-            f"{self.netbox_url}/api/ipam/prefixes/",
-            params={"prefix": prefix}
+    def delete_all_custom_fields(self, step="custom fields"):
+        """Delete all custom fields"""
+        return self.run_step(
+            step,
+            "extras/custom-fields",
+            lambda ids=None: self.lookup_all_ids("extras/custom-fields", ids),
         )
-        if response.status_code != 200:
-            print(f"  Error looking up prefix {prefix}: {response.status_code}")
-            return False
-
-        data = response.json()
-        if data.get("count", 0) == 0:
-            return False
 
-        item = data["results"][0]
-        del_response = self.session.delete(
-            f"{self.netbox_url}/api/ipam/prefixes/{item['id']}/"
+    def iter_objects(self, endpoint, params, fields=("id",)):
+        """Stream compact records of the projected fields from a list endpoint"""
+        try:
+            yield from self.session.iter_results(
+                f"{self.netbox_url}/api/{endpoint}/",
+                params,
+                fields=fields,
+                page_size=self.PAGE_SIZE,
+            )
+        except requests.HTTPError as exc:
+            print(f"  Error listing {endpoint}: {exc.response.status_code}")
+
+    @traced
+    def discover_eda_tags(self):
+        """Return slugs of all tags carrying the EDA prefix"""
+        return sorted(
+            tag.slug
+            for tag in self.iter_objects(
+                "extras/tags", {"slug__isw": self.GC_TAG_PREFIX}, fields=("slug",)
+            )
         )
-        if del_response.status_code in (204, 200):
-            print(f"  Deleted: {prefix}")
-            return True
-        else:
-            print(f"  Failed to delete {prefix}: {del_response.status_code}")
-            return False
 
-    def delete_sites_by_tenant(self, tenant_name):
-        """Delete all sites belonging to a tenant"""
-        response = self.session.get(
-            f"{self.netbox_url}/api/dcim/sites/",
-            params={"tenant": tenant_name}
-        )
-        if response.status_code != 200:
-            print(f"  Error looking up sites for tenant {tenant_name}: {response.status_code}")
-            return 0
+    def _gc_queries(self, endpoint, tags, ids=None):
+        """(queries, fields, sort key function) for collecting GC candidates"""
+        # The tag filter is AND-ed in NetBox, so each tag is queried
+        # separately and the results merged
+        queries = [{"tag": tag} for tag in tags]
+        queries.append({"tenant": self.GC_TENANT})
+        if ids is not None:
+            queries = [dict(params, id=ids) for params in queries]
+
+        if endpoint != "ipam/prefixes":
+            return queries, ("id",), lambda item: 0
+
+        def sort_key(item):
+            # Delete the most specific prefixes first
+            return -int(item.prefix.rsplit("/", 1)[1]) if item.prefix else 0
+
+        return queries, ("id", "prefix"), sort_key
+
+    @staticmethod
+    def _merge_gc(results):
+        found = {}
+        for pairs in results:
+            for sort_key, obj_id in pairs:
+                found[obj_id] = sort_key
+        return sorted((sort_key, obj_id) for obj_id, sort_key in found.items())
+
+    @traced
+    def collect_gc_ids(self, endpoint, tags, ids=None):
+        """Collect IDs on an endpoint that carry an EDA tag or belong to the EDA tenant
+
+        `ids` restricts the lookup to those IDs.
+        """
+        if self.fanout is not None:
+            return self.fanout.run(self.collect_gc_ids_async(endpoint, tags, ids))
+        # Keep only compact (sort key, id) pairs
+        queries, fields, sort_key = self._gc_queries(endpoint, tags, ids)
+
+        def collect(params):
+            return [(sort_key(item), item.id) for item in self.iter_objects(endpoint, params, fields)]
+
+        return self._merge_gc(self._map(collect, queries))
+
+    @traced
+    async def collect_gc_ids_async(self, endpoint, tags, ids=None):
+        """collect_gc_ids() with the per-tag queries running concurrently on the fanout"""
+        queries, fields, sort_key = self._gc_queries(endpoint, tags, ids)
+        url = f"{self.fanout.netbox_url}/api/{endpoint}/"
+
+        async def collect(params):
+            pairs = []
+            try:
+                async for item in self.fanout.session.iter_results(
+                    url, params, fields=fields, page_size=self.PAGE_SIZE
+                ):
+                    pairs.append((sort_key(item), item.id))
+            except requests.HTTPError as exc:
+                print(f"  Error listing {endpoint}: {exc.response.status_code}")
+            return pairs
+
+        return self._merge_gc(await asyncio.gather(*(collect(params) for params in queries)))
+
+    def _map(self, func, items):
+        """Run func over items concurrently; the session's limiter bounds load on NetBox"""
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.session.limiter.maximum) as pool:
+            return list(pool.map(propagate(func), items))
+
+    def _chunk_groups(self, keyed_ids):
+        """Chunks of IDs to bulk delete, grouped by sort key in key order"""
+        groups = {}
+        for sort_key, obj_id in keyed_ids:
+            groups.setdefault(sort_key, []).append(obj_id)
+        return [
+            [
+                groups[sort_key][start:start + self.BULK_DELETE_SIZE]
+                for start in range(0, len(groups[sort_key]), self.BULK_DELETE_SIZE)
+            ]
+            for sort_key in sorted(groups)
+        ]
+
+    @traced
+    def bulk_delete(self, endpoint, keyed_ids):
+        """Delete (sort key, id) pairs in chunks through the bulk delete endpoint
+
+        Objects sharing a sort key are deleted concurrently; groups are
+        processed in key order so children go before parents.
+        """
+        if self.fanout is not None:
+            return self.fanout.run(self.bulk_delete_async(endpoint, keyed_ids))
+        deleted = 0
+        for chunks in self._chunk_groups(keyed_ids):
+            deleted += sum(self._map(lambda chunk: self._delete_chunk(endpoint, chunk), chunks))
+        return deleted
 
-        data = response.json()
+    @traced
+    async def bulk_delete_async(self, endpoint, keyed_ids):
+        """bulk_delete() with the chunks of a group deleted concurrently on the fanout"""
         deleted = 0
-        for site in data.get("results", []):
-            del_response = self.session.delete(
-                f"{self.netbox_url}/api/dcim/sites/{site['id']}/"
+        for chunks in self._chunk_groups(keyed_ids):
+            counts = await asyncio.gather(
+                *(self._delete_chunk_async(endpoint, chunk) for chunk in chunks)
             )
-            if del_response.status_code in (204, 200):
-                print(f"  Deleted site: {site['name']}")
-                deleted += 1
-            else:
-                print(f"  Failed to delete site {site['name']}: {del_response.status_code}")
+            deleted += sum(counts)
         return deleted
 
-    def delete_all_custom_fields(self):
-        """Delete all custom fields"""
+    def _delete_chunk(self, endpoint, chunk):
+        response = self.session.delete(
+            f"{self.netbox_url}/api/{endpoint}/",
+            json=[{"id": obj_id} for obj_id in chunk],
+        )
+        if self._bulk_deleted(endpoint, chunk, response):
+            return len(chunk)
         deleted = 0
-        while True:
-            response = self.session.get(
-                f"{self.netbox_url}/api/extras/custom-fields/",
-                params={"limit": 100}
+        for obj_id in chunk:
+            del_response = self.session.delete(
+                f"{self.netbox_url}/api/{endpoint}/{obj_id}/"
             )
-            if response.status_code != 200:
-                print(f"  Error fetching custom fields: {response.status_code}")
-                break
-
-            data = response.json()
-            results = data.get("results", [])
-            if not results:
-                break
-
-            for cf in results:
-                del_response = self.session.delete(
-                    f"{self.netbox_url}/api/extras/custom-fields/{cf['id']}/"
-                )
-                if del_response.status_code in (204, 200):
-                    print(f"  Deleted custom field: {cf['name']}")
-                    deleted += 1
-                else:
-                    print(f"  Failed to delete custom field {cf['name']}: {del_response.status_code}")
+            deleted += self._deleted(endpoint, obj_id, del_response)
         return deleted
 
-    def run_cleanup(self):
-        """Revert configure_netbox.py changes"""
-        print("=" * 50)
-        print("NetBox Cleanup (reverting configure_netbox.py)")
-        print("=" * 50)
-        print("")
-
-        print("Deleting event rules...")
-        for name in self.EVENT_RULES:
-            self.delete_by_name("extras/event-rules", name)
+    async def _delete_chunk_async(self, endpoint, chunk):
+        session = self.fanout.session
+        url = f"{self.fanout.netbox_url}/api/{endpoint}/"
+        response = await session.delete(url, json=[{"id": obj_id} for obj_id in chunk])
+        if self._bulk_deleted(endpoint, chunk, response):
+            return len(chunk)
 
-        print("Deleting webhooks...")
-        for name in self.WEBHOOKS:
-            self.delete_by_name("extras/webhooks", name)
+        async def delete(obj_id):
+            return self._deleted(endpoint, obj_id, await session.delete(f"{url}{obj_id}/"))
 
-        print("Deleting prefixes...")
-        for prefix in self.PREFIXES:
-            self.delete_by_prefix(prefix)
+        return sum(await asyncio.gather(*(delete(obj_id) for obj_id in chunk)))
 
-        print("Deleting sites by tenant...")
-        for tenant in self.SITES_BY_TENANT:
-            self.delete_sites_by_tenant(tenant)
-
-        print("Deleting VLAN groups...")
-        for name in self.VLAN_GROUPS:
-            self.delete_by_name("ipam/vlan-groups", name)
-
-        print("Deleting ASN ranges...")
-        for slug in self.ASN_RANGES:
-            self.delete_by_name("ipam/asn-ranges", slug, lookup_field="slug")
+    def _bulk_deleted(self, endpoint, chunk, response):
+        if response.status_code in (204, 200):
+            self.journal.record_deleted(endpoint, chunk)
+            return True
 
-        print("Deleting RIRs...")
-        for slug in self.RIRS:
-            self.delete_by_name("ipam/rirs", slug, lookup_field="slug")
+        # Fall back to single deletes so one protected object does not
+        # block the whole chunk
+        print(
+            f"  Bulk delete on {endpoint} failed ({response.status_code}); "
+            "retrying individually"
+        )
+        return False
+
+    def _deleted(self, endpoint, obj_id, response):
+        if response.status_code in (204, 200, 404):
+            self.journal.record_deleted(endpoint, [obj_id])
+            return 1
+        print(
+            f"  Failed to delete {endpoint} #{obj_id}: "
+            f"{response.status_code} {response.text}"
+        )
+        return 0
+
+    @traced
+    def run_step(self, step, endpoint, plan):
+        """Delete the (sort key, id) pairs returned by plan(), through the journal
+
+        Steps the resumed journal records as finished are skipped. A step
+        planned in an earlier run does not repeat its full lookup:
+        `plan(ids=...)` only re-checks the remaining IDs, so objects that are
+        gone or no longer match (e.g. a reused ID) are skipped. Raises
+        CleanupPaused when the deletion budget runs out.
+        """
+        journal = self.journal
+        if journal.take_done(step):
+            print(f"  {step}: already done")
+            return 0
+        planned = journal.planned(step)
+        if planned is None:
+            remaining = plan()
+            journal.plan(step, endpoint, remaining)
+        else:
+            keyed_ids = planned[1]
+            remaining = [
+                (sort_key, obj_id)
+                for sort_key, obj_id in keyed_ids
+                if not journal.is_deleted(endpoint, obj_id)
+            ]
+            if len(remaining) < len(keyed_ids):
+                print(f"  {step}: resuming, {len(keyed_ids) - len(remaining)} already deleted")
+        if planned is not None and remaining:
+            selected = set()
+            for start in range(0, len(remaining), self.RECHECK_SIZE):
+                chunk = [obj_id for _, obj_id in remaining[start:start + self.RECHECK_SIZE]]
+                selected.update(obj_id for _, obj_id in plan(ids=chunk))
+            if len(selected) < len(remaining):
+                print(f"  {step}: {len(remaining) - len(selected)} planned objects are gone or changed; skipped")
+                remaining = [pair for pair in remaining if pair[1] in selected]
+        paused = self.budget is not None and len(remaining) > self.budget
+        if paused:
+            # Children sort first, so a partial run still deletes in order
+            remaining = sorted(remaining)[: self.budget]
+
+        deleted = self.bulk_delete(endpoint, remaining) if remaining else 0
+        if remaining:
+            print(f"  Deleted {deleted}/{len(remaining)} from {endpoint}")
+        if self.budget is not None:
+            self.budget -= deleted
+        if paused:
+            raise CleanupPaused(step)
+        if deleted == len(remaining):
+            journal.finish_step(step)
+        return deleted
 
-        print("Deleting tags...")
-        for name in self.TAGS:
-            self.delete_by_name("extras/tags", name)
+    @traced
+    def garbage_collect(self):
+        """Delete every IPAM/DCIM object tagged eda-* or owned by the EDA tenant"""
+        total = 0
+        for endpoint in self.GC_ENDPOINTS:
+            total += self.run_step(
+                f"gc {endpoint}",
+                endpoint,
+                lambda ids=None, endpoint=endpoint: self.collect_gc_ids(endpoint, self.gc_tags(), ids),
+            )
+        return total
+
+    def gc_tags(self):
+        # Only looked up when a GC step still has to be planned
+        if self._gc_tags is None:
+            self._gc_tags = self.discover_eda_tags()
+            print(f"  EDA tags: {', '.join(self._gc_tags) if self._gc_tags else '(none)'}")
+        return self._gc_tags
+
+    def steps(self, gc=False):
+        """(message, step function) pairs in deletion order
+
+        The journal step names ("event rules", ...) stay fixed so that a
+        journal written by an earlier run can be resumed.
+        """
+        steps = [
+            ("Deleting event rules...",
+             lambda: self.delete_by_name("extras/event-rules", self.EVENT_RULES, step="event rules")),
+            ("Deleting webhooks...",
+             lambda: self.delete_by_name("extras/webhooks", self.WEBHOOKS, step="webhooks")),
+        ]
+        if gc:
+            steps.append(("Garbage collecting EDA allocations...", self.garbage_collect))
+        steps += [
+            ("Deleting prefixes...", lambda: self.delete_by_prefix(self.PREFIXES, step="prefixes")),
+            ("Deleting sites by tenant...",
+             lambda: self.delete_sites_by_tenant(self.SITES_BY_TENANT, step="sites")),
+            ("Deleting VLAN groups...",
+             lambda: self.delete_by_name("ipam/vlan-groups", self.VLAN_GROUPS, step="vlan groups")),
+            ("Deleting ASN ranges...",
+             lambda: self.delete_by_name("ipam/asn-ranges", self.ASN_RANGES, "slug", "asn ranges")),
+            ("Deleting RIRs...", lambda: self.delete_by_name("ipam/rirs", self.RIRS, "slug", "rirs")),
+            ("Deleting tags...", lambda: self.delete_by_name("extras/tags", self.TAGS, step="tags")),
+            ("Deleting config contexts...",
+             lambda: self.delete_by_name(
+                 "extras/config-contexts", self.CONFIG_CONTEXTS, step="config contexts"
+             )),
+            ("Deleting custom fields...", self.delete_all_custom_fields),
+        ]
+        return steps
+
+    @traced
+    def run_cleanup(self, gc=False):
+        """Revert configure_netbox.py changes; return False if paused by the budget"""
+        print("=" * 50)
+        print("NetBox Cleanup (reverting configure_netbox.py)")
+        print("=" * 50)
+        print("")
 
-        print("Deleting custom fields...")
-        self.delete_all_custom_fields()
+        if not self.journal.is_open:
+            self.journal.open(self.netbox_url)
+        try:
+            for message, step in self.steps(gc):
+                print(message)
+                step()
+        except CleanupPaused as paused:
+            self.journal.close()
+            print("")
+            print(f"Deletion budget used up during '{paused}'; rerun to continue.")
+            return False
 
+        self.journal.complete()
         print("")
         print("=" * 50)
         print("Cleanup completed!")
         print("=" * 50)
+        return True
+
 
+def read_netbox_ui_url():
+    """The EDA httpproxy URL saved by init.sh, or None"""
+    try:
+        with open(os.path.join(get_project_root(), ".netbox_ui_url"), "r") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
 
-def main():
-    """Main function"""
+
+def main(argv=None, prog=None, api_token=None, session=None):
+    """Main function
+
+    eda_netbox.py passes its arguments, the API token and a shared session.
+    """
     import argparse
 
     parser = argparse.ArgumentParser(
-        description="Cleanup NetBox - reverts configure_netbox.py changes"
+        prog=prog, description="Cleanup NetBox - reverts configure_netbox.py changes"
     )
     parser.add_argument(
         "--yes", "-y",
         action="store_true",
         help="Skip confirmation prompt"
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--gc",
+        action="store_true",
+        help="Also delete every IPAM/DCIM object tagged eda-* or owned by the EDA tenant"
+    )
+    parser.add_argument(
+        "--pools",
+        default=None,
+        help="pools.json passed to configure_netbox.py --pools; delete its pools instead of the defaults"
+    )
+    parser.add_argument(
+        "--journal",
+        default=os.path.join(get_project_root(), ".netbox_cleanup.journal"),
+        help="Journal of planned and completed deletions (default: .netbox_cleanup.journal)"
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Ignore an unfinished journal and start over"
+    )
+    parser.add_argument(
+        "--max-deletes",
+        type=int,
+        default=None,
+        help="Stop after this many deletions; rerun to continue from the journal"
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Run the GC lookups and bulk deletes on the asyncio/HTTP/2 client instead of worker threads"
+    )
+    parser.add_argument(
+        "--health-check",
+        action="store_true",
+        help="Run the health gate (scripts/health_gate.py) once after the cleanup"
+    )
+    args = parser.parse_args(argv)
 
     netbox_url = read_config_files()
-    api_token = get_api_token()
+    api_token = api_token or get_api_token()
 
     print(f"NetBox URL: {netbox_url}")
 
     if not args.yes:
         print("\nThis will delete EDA-related objects (webhook, tags, prefixes, etc.)")
-        confirm = input("Continue? (yes/no): ")
+        try:
+            confirm = input("Continue? (yes/no): ")
+        except EOFError:
+            confirm = ""
         if confirm.lower() != "yes":
             print("Aborted.")
             sys.exit(0)
 
-    cleaner = NetBoxCleaner(netbox_url, api_token)
-    cleaner.run_cleanup()
+    journal = CleanupJournal(args.journal)
+    if journal.open(netbox_url, fresh=args.fresh):
+        print(f"Resuming the unfinished cleanup recorded in {args.journal}")
+    cleaner = NetBoxCleaner(netbox_url, api_token, journal, args.max_deletes, session=session)
+    if args.pools:
+        cleaner.load_pools(args.pools)
+    if args.use_async:
+        # The EDA certificate is usually self-signed (see health_gate.py)
+        cleaner.fanout = AsyncFanout(
+            api_token, fanout_url(netbox_url, read_netbox_ui_url()), verify=False
+        )
+    try:
+        with span("cleanup_netbox", netbox_url=netbox_url, gc=args.gc) as s:
+            completed = cleaner.run_cleanup(gc=args.gc)
+            metrics = cleaner.session.metrics()
+            for key, value in metrics.items():
+                s.set(f"client.{key}", value)
+            if cleaner.fanout is not None:
+                async_metrics = cleaner.fanout.session.metrics()
+                for key, value in async_metrics.items():
+                    s.set(f"async_client.{key}", value)
+    finally:
+        if cleaner.fanout is not None:
+            cleaner.fanout.close()
+    print(f"NetBox client: {format_metrics(metrics)}")
+    if cleaner.fanout is not None:
+        print(f"NetBox async client: {format_metrics(async_metrics)}")
+    if not completed:
+        sys.exit(3)
+
+    if args.health_check:
+        # NetBox and the EDA paths in front of it must still be healthy
+        # for the next configure run
+        from health_gate import HealthGate
+
+        gate = HealthGate.from_config(api_token, get_project_root(), netbox_url=netbox_url)
+        report = gate.check()
+        print(f"\nHealth after cleanup:\n{report.format()}")
+        if not report.healthy:
+            print(f"Not healthy after cleanup: {report.summary()}")
+            sys.exit(1)
 
 
 if __name__ == "__main__":
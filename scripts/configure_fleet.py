@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# /// script
+# dependencies = ["requests"]
+# ///
+"""Configure a fleet of NetBox instances for EDA integration concurrently.
+
+The inventory is a JSON list with one entry per lab:
+
+    [
+      {
+        "name": "lab01",
+        "netbox_url": "http://10.0.0.10/core/httpproxy/v1/netbox-ui",
+        "api_token": "0123...",
+        "eda_api": "eda01.example.com:9443"
+      }
+    ]
+
+`api_token` may be omitted when `kube_context` names a kubectl context from
+which the token can be read. Each target gets its own configurator and
+connection pool; a global cap bounds how many run at once.
+"""
+
+import argparse
+import io
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+from configure_netbox import NetBoxConfigurator, configure, get_api_token
+from tracing import span
+
+
+class _ThreadLocalStdout(io.TextIOBase):
+    """Route print output of each worker thread to its own buffer."""
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def capture(self):
+        self._local.buffer = io.StringIO()
+        return self._local.buffer
+
+    def release(self):
+        self._local.buffer = None
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        return (self._fallback if buffer is None else buffer).write(text)
+
+    def flush(self):
+        self._fallback.flush()
+
+
+def load_inventory(path: str) -> List[Dict]:
+    with open(path, "r") as f:
+        inventory = json.load(f)
+    if not isinstance(inventory, list):
+        raise ValueError(f"{path}: inventory must be a JSON list")
+    for index, entry in enumerate(inventory):
+        missing = [key for key in ("netbox_url", "eda_api") if not entry.get(key)]
+        if missing:
+            raise ValueError(f"{path}: entry {index} is missing {', '.join(missing)}")
+        entry.setdefault("name", entry["netbox_url"])
+    return inventory
+
+
+def configure_target(
+    entry: Dict, stdout: _ThreadLocalStdout, pool_size: int, max_retries: int, force: bool
+) -> Dict:
+    """Configure one NetBox target and return its result record"""
+    buffer = stdout.capture()
+    start = time.monotonic()
+    result = {"name": entry["name"], "netbox_url": entry["netbox_url"], "ok": False, "errors": []}
+    try:
+        with span("configure_target", target=entry["name"], netbox_url=entry["netbox_url"]) as s:
+            api_token = entry.get("api_token") or get_api_token(entry.get("kube_context"))
+            configurator = NetBoxConfigurator(entry["netbox_url"], api_token, pool_size=pool_size)
+            if not configurator.wait_for_netbox(max_retries=max_retries):
+                result["errors"].append("NetBox is not ready")
+            else:
+                result["ok"] = configure(configurator, entry["eda_api"], force=force)
+                result["errors"].extend(configurator.errors)
+            if not result["ok"]:
+                s.fail(result["errors"][0] if result["errors"] else None)
+    except SystemExit:
+        result["errors"].append("Unable to read API token")
+    except Exception as exc:  # noqa: BLE001 - one failing lab must not stop the fleet
+        result["errors"].append(f"{type(exc).__name__}: {exc}")
+    finally:
+        result["duration"] = time.monotonic() - start
+        result["output"] = buffer.getvalue()
+        stdout.release()
+    return result
+
+
+def print_report(results: List[Dict], wall_time: float) -> None:
+    width = max([len(r["name"]) for r in results] + [6])
+    print("")
+    print("=" * 50)
+    print("Fleet configuration report")
+    print("=" * 50)
+    print(f"{'TARGET':<{width}}  STATUS  DURATION  ERRORS")
+    for r in sorted(results, key=lambda r: r["name"]):
+        status = "ok" if r["ok"] else "FAILED"
+        print(f"{r['name']:<{width}}  {status:<6}  {r['duration']:7.1f}s  {len(r['errors'])}")
+    succeeded = sum(1 for r in results if r["ok"])
+    durations = [r["duration"] for r in results]
+    print("")
+    print(f"Succeeded: {succeeded}/{len(results)}")
+    if durations:
+        print(
+            f"Wall time: {wall_time:.1f}s "
+            f"(slowest target {max(durations):.1f}s, sum of targets {sum(durations):.1f}s)"
+        )
+    for r in results:
+        for error in r["errors"]:
+            print(f"[{r['name']}] {error}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Configure many NetBox instances for EDA integration concurrently",
+    )
+    parser.add_argument("inventory", help="Path to the JSON inventory file")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Maximum number of targets configured at once (default: 16)",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=4,
+        help="HTTP connection pool size per target (default: 4)",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=30,
+        help="Readiness checks per target before giving up (default: 30)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run a full reconcile on every target even if its fingerprint matches",
+    )
+    parser.add_argument(
+        "--report",
+        default=None,
+        help="Optional path to write the aggregated report as JSON",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Do not print per-target output",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    inventory = load_inventory(args.inventory)
+    if not inventory:
+        print("Inventory is empty; nothing to do.")
+        return
+
+    concurrency = max(1, min(args.concurrency, len(inventory)))
+    print(f"Configuring {len(inventory)} NetBox targets (concurrency {concurrency})...")
+
+    original_stdout = sys.stdout
+    stdout = _ThreadLocalStdout(original_stdout)
+    sys.stdout = stdout
+    start = time.monotonic()
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [
+                pool.submit(
+                    configure_target, entry, stdout, args.pool_size, args.max_retries, args.force
+                )
+                for entry in inventory
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if not args.quiet:
+                    for line in result["output"].splitlines():
+                        print(f"[{result['name']}] {line}")
+    finally:
+        sys.stdout = original_stdout
+    wall_time = time.monotonic() - start
+
+    print_report(results, wall_time)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(
+                {
+                    "wall_time": wall_time,
+                    "targets": [{k: v for k, v in r.items() if k != "output"} for r in results],
+                },
+                f,
+                indent=2,
+            )
+
+    if not all(r["ok"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,21 @@
 #!/usr/bin/env python
 # /// script
-# dependencies = ["requests"]
+# dependencies = ["requests", "httpx[http2]"]
 # ///
 """
 Configure NetBox for EDA integration - creates webhooks, event rules, tags, and prefixes
 """
 
+import asyncio
+import hashlib
+import json
 import sys
 import time
 import requests
 
+from netbox_client import AsyncFanout, NetBoxSession, fanout_url, format_metrics
+from tracing import run, span, traced
+
 
 def read_config_files():
     """Read configuration from saved files"""
@@ -29,12 +35,13 @@ def read_config_files():
         sys.exit(1)
 
 
-def get_api_token():
+@traced
+def get_api_token(kube_context=None):
     """Get NetBox API token from Kubernetes secret"""
-    import subprocess
-
-    cmd = [
-        "kubectl",
+    cmd = ["kubectl"]
+    if kube_context:
+        cmd.extend(["--context", kube_context])
+    cmd += [
         "-n",
         "netbox",
         "get",
@@ -43,7 +50,7 @@ def get_api_token():
         "-o",
         "jsonpath={.data.api_token}",
     ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = run(cmd, capture_output=True, text=True)
     if result.returncode != 0:
         print(f"Error getting API token: {result.stderr}")
         sys.exit(1)
@@ -54,36 +61,316 @@ def get_api_token():
     return base64.b64decode(result.stdout).decode("utf-8")
 
 
+# Synced from EDA by the NetBox app: tracked for the prefix binding, but
+# their changes (every EDA site sync) are not drift
+EDA_OWNED = ("tenancy.tenant", "dcim.site")
+
+
+def drift_types(managed):
+    """Managed object types whose change log entries count as drift"""
+    return sorted(
+        object_type
+        for object_type, ids in managed.items()
+        if ids and object_type not in EDA_OWNED
+    )
+
+
 class NetBoxConfigurator:
-    def __init__(self, netbox_url, api_token):
-        self.netbox_url = netbox_url.rstrip("/")
-        self.headers = {
-            "Authorization": f"Token {api_token}",
-            "Content-Type": "application/json",
+    # Desired state managed by this configurator
+    TAGS = [
+        {"name": "eda-systemip-v4", "slug": "eda-systemip-v4", "color": "0066cc"},
+        {"name": "eda-systemip-v6", "slug": "eda-systemip-v6", "color": "0066cc"},
+        {"name": "eda-isl-v4", "slug": "eda-isl-v4", "color": "00cc66"},
+        {"name": "eda-isl-v6", "slug": "eda-isl-v6", "color": "00cc66"},
+        {"name": "eda-mgmt-v4", "slug": "eda-mgmt-v4", "color": "cc6600"},
+        {"name": "eda-vlans", "slug": "eda-vlans", "color": "ff5722"},
+        {"name": "eda-asns", "slug": "eda-asns", "color": "9e9e9e"},
+    ]
+    EVENT_RULE_OBJECT_TYPES = [
+        "dcim.site",
+        "dcim.device",
+        "dcim.cable",
+        "dcim.devicetype",
+        "ipam.ipaddress",
+        "ipam.prefix",
+        "ipam.vlangroup",
+        "ipam.vlan",
+        "ipam.asn",
+        "ipam.asnrange",
+    ]
+    EVENT_TYPES = ["object_created", "object_updated", "object_deleted"]
+    PREFIXES = [
+        {
+            "prefix": "192.168.10.0/24",
+            "status": "active",
+            "description": "System IP pool for spine/leaf",
+            "tags": [{"name": "eda-systemip-v4"}],
+        },
+        {
+            "prefix": "10.0.0.0/16",
+            "status": "container",
+            "description": "ISL subnet pool",
+            "tags": [{"name": "eda-isl-v4"}],
+        },
+        {
+            "prefix": "2001:db8::/32",
+            "status": "active",
+            "description": "IPv6 System IP pool",
+            "tags": [{"name": "eda-systemip-v6"}],
+        },
+        {
+            "prefix": "2005::/64",
+            "status": "container",
+            "description": "IPv6 ISL subnet pool",
+            "tags": [{"name": "eda-isl-v6"}],
+        },
+        {
+            "prefix": "172.16.0.0/16",
+            "status": "active",
+            "description": "Management IP pool",
+            "tags": [{"name": "eda-mgmt-v4"}],
+        },
+    ]
+    VLAN_GROUPS = [
+        {
+            "name": "eda-vlans",
+            "slug": "eda-vlans",
+            "description": "EDA managed VLAN IDs",
+            "vid_ranges": [[1, 300]],
+            "tags": [{"name": "eda-vlans"}],
+        }
+    ]
+    RIR = {"slug": "eda", "name": "eda"}
+    ASN_RANGES = [
+        {
+            "name": "eda-asns",
+            "slug": "eda-asns",
+            "start": 65000,
+            "end": 65100,
+            "description": "EDA managed private ASNs",
+            "tags": [{"name": "eda-asns"}],
         }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+    ]
+
+    # Fingerprint of the last successful full reconcile, stored in an
+    # inactive config context so it never renders into device configs
+    FINGERPRINT_CONTEXT = "eda-config-fingerprint"
+    PAGE_SIZE = 1000
+
+    def __init__(self, netbox_url, api_token, pool_size=None, session=None, fanout=None):
+        self.netbox_url = netbox_url.rstrip("/")
+        # Lookups repeat across steps (tenant, site, RIR, ASN ranges), so
+        # identical GETs are answered once per run. A session passed in (e.g.
+        # by eda_netbox.py) keeps its connections warm across commands.
+        self.session = session or NetBoxSession(api_token, pool_size=pool_size, cache=True)
+        # With an AsyncFanout, the per-object lookups and writes of tags,
+        # prefixes and VLAN groups run concurrently on it
+        self.fanout = fanout
         self.tenant_id = None
         self.site_id = None
-
+        self.errors = []
+        # IDs of the objects this run manages, keyed by NetBox object type
+        self.managed = {}
+
+    def _error(self, message):
+        """Report an error and record it for the run summary"""
+        print(message)
+        self.errors.append(message)
+
+    def _track(self, object_type, obj_id):
+        """Remember a managed object for drift detection"""
+        if obj_id is not None:
+            self.managed.setdefault(object_type, set()).add(obj_id)
+
+    @property
+    def write_count(self):
+        """Changes made to NetBox so far, through either session"""
+        writes = self.session.write_count
+        if self.fanout is not None:
+            writes += self.fanout.session.write_count
+        return writes
+
+    @traced
     def get_tenant(self, name="eda"):
         """Get tenant created by EDA Instance"""
         response = self.session.get(f"{self.netbox_url}/api/tenancy/tenants/?name={name}")
         data = response.json()
         if data.get("count", 0) > 0:
             self.tenant_id = data["results"][0]["id"]
+            self._track("tenancy.tenant", self.tenant_id)
             return self.tenant_id
         return None
 
+    @traced
     def get_site(self, tenant_name="eda"):
         """Get site created by EDA Instance"""
         response = self.session.get(f"{self.netbox_url}/api/dcim/sites/?tenant={tenant_name}")
         data = response.json()
         if data.get("count", 0) > 0:
             self.site_id = data["results"][0]["id"]
+            self._track("dcim.site", self.site_id)
             return self.site_id
         return None
 
+    def load_pools(self, path):
+        """Replace the default prefixes, VLAN groups and ASN ranges from a JSON file
+
+        The file holds "prefixes", "vlan_groups" and/or "asn_ranges" lists in
+        the same shape as the class attributes, e.g. the pools.json written by
+        generate_fabric.py.
+        """
+        with open(path, "r") as f:
+            pools = json.load(f)
+        if "prefixes" in pools:
+            self.PREFIXES = pools["prefixes"]
+        if "vlan_groups" in pools:
+            self.VLAN_GROUPS = pools["vlan_groups"]
+        if "asn_ranges" in pools:
+            self.ASN_RANGES = pools["asn_ranges"]
+
+    def desired_state(self, eda_api):
+        """Everything a full reconcile converges NetBox to"""
+        return {
+            "tags": self.TAGS,
+            "webhook": self.webhook_payload(eda_api),
+            "event_rule": {
+                "object_types": sorted(self.EVENT_RULE_OBJECT_TYPES),
+                "event_types": self.EVENT_TYPES,
+            },
+            "prefixes": self.PREFIXES,
+            "vlan_groups": self.VLAN_GROUPS,
+            "rir": self.RIR,
+            "asn_ranges": self.ASN_RANGES,
+            "binding": {"tenant": "eda", "site_tenant": "eda"},
+        }
+
+    def fingerprint(self, eda_api):
+        """Stable hash of the desired configuration"""
+        canonical = json.dumps(
+            self.desired_state(eda_api), sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @traced
+    def load_fingerprint(self):
+        """Return (config context ID, stored fingerprint data) or (None, None)"""
+        response = self.session.get(
+            f"{self.netbox_url}/api/extras/config-contexts/",
+            params={"name": self.FINGERPRINT_CONTEXT},
+        )
+        if response.status_code != 200 or response.json().get("count", 0) == 0:
+            return None, None
+        context = response.json()["results"][0]
+        return context["id"], context.get("data") or {}
+
+    @traced
+    def latest_change_id(self):
+        """Return the newest change log ID, used as the drift high-water mark"""
+        response = self.session.get(
+            f"{self.netbox_url}/api/core/object-changes/",
+            params={"ordering": "-id", "limit": 1},
+        )
+        if response.status_code != 200:
+            return None
+        results = response.json().get("results", [])
+        return results[0]["id"] if results else 0
+
+    def change_pages(self, since, object_types, fields=None):
+        """Yield pages of change log entries of `object_types` after ID `since`, oldest first
+
+        Each page is one query, with the types as repeated changed_object_type
+        filters. Object IDs are only unique per model, so callers match the
+        (type, ID) pairs themselves. Raises RuntimeError when a query fails.
+        """
+        while object_types:
+            params = [("id__gt", since), ("ordering", "id"), ("limit", self.PAGE_SIZE)]
+            if fields:
+                params.append(("fields", fields))
+            params += [("changed_object_type", object_type) for object_type in object_types]
+            response = self.session.get(f"{self.netbox_url}/api/core/object-changes/", params=params)
+            if response.status_code != 200:
+                raise RuntimeError(f"change log query failed: {response.status_code}")
+            results = response.json().get("results", [])
+            if results:
+                yield results
+                since = results[-1]["id"]
+            # A full page means a burst of changes; keep reading until caught up
+            if len(results) < self.PAGE_SIZE:
+                return
+
+    @traced
+    def has_drifted(self, since, managed):
+        """Check the change log for edits to managed objects after `since`"""
+        try:
+            for page in self.change_pages(
+                since, drift_types(managed), "id,changed_object_type,changed_object_id"
+            ):
+                if any(
+                    change["changed_object_id"] in managed.get(change["changed_object_type"], ())
+                    for change in page
+                ):
+                    return True
+        except RuntimeError:
+            return True
+        return False
+
+    @traced
+    def is_up_to_date(self, eda_api):
+        """Return True when the stored fingerprint matches and nothing drifted"""
+        _, stored = self.load_fingerprint()
+        if not stored:
+            print("No configuration fingerprint found; running full reconcile")
+            return False
+        if stored.get("fingerprint") != self.fingerprint(eda_api):
+            print("Desired configuration changed; running full reconcile")
+            return False
+        managed = {key: set(ids) for key, ids in stored.get("objects", {}).items()}
+        # A tenant or site EDA has not synced yet does not force a reconcile;
+        # one that appeared since the last run does, to bind the prefixes
+        if (not managed.get("tenancy.tenant") and self.get_tenant("eda")) or (
+            not managed.get("dcim.site") and self.get_site("eda")
+        ):
+            print("EDA tenant/site appeared since the last run; running full reconcile")
+            return False
+        if self.has_drifted(stored.get("change_id", 0), managed):
+            print("Managed objects changed in NetBox; running full reconcile")
+            return False
+        return True
+
+    @traced
+    def store_fingerprint(self, eda_api):
+        """Record the fingerprint and change high-water mark after a full reconcile"""
+        change_id = self.latest_change_id()
+        if change_id is None:
+            print("Warning: change log unavailable; configuration fingerprint not stored")
+            return
+        payload = {
+            "name": self.FINGERPRINT_CONTEXT,
+            "description": "EDA integration desired-state fingerprint (managed by configure_netbox.py)",
+            "is_active": False,
+            "weight": 0,
+            "data": {
+                "fingerprint": self.fingerprint(eda_api),
+                "change_id": change_id,
+                "objects": {key: sorted(ids) for key, ids in sorted(self.managed.items())},
+            },
+        }
+        context_id, _ = self.load_fingerprint()
+        if context_id:
+            response = self.session.patch(
+                f"{self.netbox_url}/api/extras/config-contexts/{context_id}/", json=payload
+            )
+        else:
+            response = self.session.post(
+                f"{self.netbox_url}/api/extras/config-contexts/", json=payload
+            )
+        if response.status_code not in (200, 201):
+            print(
+                "Warning: unable to store configuration fingerprint: "
+                f"{response.status_code} {response.text}"
+            )
+
+    @traced
     def wait_for_netbox(self, max_retries=30):
         """Wait for NetBox to be ready"""
         print("Waiting for NetBox to be ready...")
@@ -99,17 +386,10 @@ class NetBoxConfigurator:
             time.sleep(10)
         return False
 
-    def create_webhook(self, eda_api):
-        """Create webhook for EDA integration"""
-        print("Creating webhook...")
-
-        # Check if webhook already exists
-        response = self.session.get(f"{self.netbox_url}/api/extras/webhooks/?name=eda")
-        if response.json()["count"] > 0:
-            print("Webhook 'eda' already exists")
-            return response.json()["results"][0]["id"]
-
-        webhook_data = {
+    @staticmethod
+    def webhook_payload(eda_api):
+        """Webhook definition pointing at the EDA NetBox app"""
+        return {
             "name": "eda",
             "payload_url": f"https://{eda_api}/core/httpproxy/v1/netbox/webhook/eda-netbox/netbox",
             "enabled": True,
@@ -119,32 +399,37 @@ class NetBoxConfigurator:
             "ssl_verification": False,
         }
 
+    @traced
+    def create_webhook(self, eda_api):
+        """Create webhook for EDA integration"""
+        print("Creating webhook...")
+
+        # Check if webhook already exists
+        response = self.session.get(f"{self.netbox_url}/api/extras/webhooks/?name=eda")
+        if response.json()["count"] > 0:
+            print("Webhook 'eda' already exists")
+            webhook_id = response.json()["results"][0]["id"]
+            self._track("extras.webhook", webhook_id)
+            return webhook_id
+
         response = self.session.post(
-            f"{self.netbox_url}/api/extras/webhooks/", json=webhook_data
+            f"{self.netbox_url}/api/extras/webhooks/", json=self.webhook_payload(eda_api)
         )
         if response.status_code == 201:
             print("Webhook created successfully")
-            return response.json()["id"]
+            webhook_id = response.json()["id"]
+            self._track("extras.webhook", webhook_id)
+            return webhook_id
         else:
-            print(f"Error creating webhook: {response.text}")
+            self._error(f"Error creating webhook: {response.text}")
             return None
 
+    @traced
     def create_event_rule(self, webhook_id):
         """Create or update the EDA event rule for the webhook"""
         print("Creating event rule...")
 
-        required_object_types = [
-            "dcim.site",
-            "dcim.device",
-            "dcim.cable",
-            "dcim.devicetype",
-            "ipam.ipaddress",
-            "ipam.prefix",
-            "ipam.vlangroup",
-            "ipam.vlan",
-            "ipam.asn",
-            "ipam.asnrange",
-        ]
+        required_object_types = self.EVENT_RULE_OBJECT_TYPES
 
         response = self.session.get(
             f"{self.netbox_url}/api/extras/event-rules/?name=eda"
@@ -153,6 +438,7 @@ class NetBoxConfigurator:
         if data["count"] > 0:
             event_rule = data["results"][0]
             event_rule_id = event_rule["id"]
+            self._track("extras.eventrule", event_rule_id)
             existing_types = set(event_rule.get("object_types", []))
             missing_types = set(required_object_types).difference(existing_types)
             updated_types = sorted(existing_types.union(required_object_types))
@@ -174,7 +460,7 @@ class NetBoxConfigurator:
                 if patch_response.status_code == 200:
                     print("Event rule 'eda' updated successfully")
                 else:
-                    print(
+                    self._error(
                         "Error updating event rule 'eda': "
                         f"{patch_response.status_code} {patch_response.text}"
                     )
@@ -186,7 +472,7 @@ class NetBoxConfigurator:
             "name": "eda",
             "object_types": required_object_types,
             "enabled": True,
-            "event_types": ["object_created", "object_updated", "object_deleted"],
+            "event_types": self.EVENT_TYPES,
             "action_type": "webhook",
             "action_object_type": "extras.webhook",
             "action_object_id": webhook_id,
@@ -197,29 +483,24 @@ class NetBoxConfigurator:
         )
         if response.status_code == 201:
             print("Event rule created successfully")
+            self._track("extras.eventrule", response.json()["id"])
         else:
-            print(f"Error creating event rule: {response.text}")
+            self._error(f"Error creating event rule: {response.text}")
 
+    @traced
     def create_tags(self):
         """Create tags for EDA integration"""
-        tags = [
-            {"name": "eda-systemip-v4", "slug": "eda-systemip-v4", "color": "0066cc"},
-            {"name": "eda-systemip-v6", "slug": "eda-systemip-v6", "color": "0066cc"},
-            {"name": "eda-isl-v4", "slug": "eda-isl-v4", "color": "00cc66"},
-            {"name": "eda-isl-v6", "slug": "eda-isl-v6", "color": "00cc66"},
-            {"name": "eda-mgmt-v4", "slug": "eda-mgmt-v4", "color": "cc6600"},
-            {"name": "eda-vlans", "slug": "eda-vlans", "color": "ff5722"},
-            {"name": "eda-asns", "slug": "eda-asns", "color": "9e9e9e"},
-        ]
-
+        if self.fanout is not None:
+            return self.fanout.run(self.create_tags_async())
         print("Creating tags...")
-        for tag in tags:
+        for tag in self.TAGS:
             # Check if tag exists
             response = self.session.get(
                 f"{self.netbox_url}/api/extras/tags/?name={tag['name']}"
             )
             if response.json()["count"] > 0:
                 print(f"Tag '{tag['name']}' already exists")
+                self._track("extras.tag", response.json()["results"][0]["id"])
                 continue
 
             response = self.session.post(
@@ -227,28 +508,23 @@ class NetBoxConfigurator:
             )
             if response.status_code == 201:
                 print(f"Tag '{tag['name']}' created successfully")
+                self._track("extras.tag", response.json()["id"])
             else:
-                print(f"Error creating tag '{tag['name']}': {response.text}")
+                self._error(f"Error creating tag '{tag['name']}': {response.text}")
 
+    @traced
     def create_vlan_groups(self):
         """Create VLAN groups used for EDA allocations"""
-        vlan_groups = [
-            {
-                "name": "eda-vlans",
-                "slug": "eda-vlans",
-                "description": "EDA managed VLAN IDs",
-                "vid_ranges": [[1, 300]],
-                "tags": [{"name": "eda-vlans"}],
-            }
-        ]
-
+        if self.fanout is not None:
+            return self.fanout.run(self.create_vlan_groups_async())
         print("Creating VLAN groups...")
-        for group in vlan_groups:
+        for group in self.VLAN_GROUPS:
             response = self.session.get(
                 f"{self.netbox_url}/api/ipam/vlan-groups/?name={group['name']}"
             )
             if response.json().get("count", 0) > 0:
                 print(f"VLAN group '{group['name']}' already exists")
+                self._track("ipam.vlangroup", response.json()["results"][0]["id"])
                 continue
 
             create_response = self.session.post(
@@ -256,13 +532,15 @@ class NetBoxConfigurator:
             )
             if create_response.status_code == 201:
                 print(f"VLAN group '{group['name']}' created successfully")
+                self._track("ipam.vlangroup", create_response.json()["id"])
             else:
-                print(
+                self._error(
                     f"Error creating VLAN group '{group['name']}': "
                     f"{create_response.status_code} {create_response.text}"
                 )
 
-    def create_rir(self, slug="eda", name="eda"):
+    @traced
+    def create_rir(self, slug=RIR["slug"], name=RIR["name"]):
         """Create or correct the RIR required for ASN allocations"""
         response = self.session.get(
             f"{self.netbox_url}/api/ipam/rirs/?slug={slug}"
@@ -281,6 +559,7 @@ class NetBoxConfigurator:
                         f"Warning: Unable to update RIR '{slug}' name: "
                         f"{patch_response.status_code} {patch_response.text}"
                     )
+            self._track("ipam.rir", rir["id"])
             return rir["id"]
 
         rir_payload = {
@@ -295,40 +574,32 @@ class NetBoxConfigurator:
         if create_response.status_code == 201:
             rir = create_response.json()
             print(f"Created RIR '{name}' with ID {rir['id']}")
+            self._track("ipam.rir", rir["id"])
             return rir["id"]
 
-        print(
+        self._error(
             "Error: Unable to create RIR '"
             f"{name}' ({create_response.status_code} {create_response.text})"
         )
         return None
 
+    @traced
     def create_asn_ranges(self):
         """Create ASN ranges used for EDA allocations"""
         rir_id = self.create_rir()
         if rir_id is None:
             return
 
-        asn_ranges = [
-            {
-                "name": "eda-asns",
-                "slug": "eda-asns",
-                "start": 65000,
-                "end": 65100,
-                "description": "EDA managed private ASNs",
-                "rir": rir_id,
-                "tags": [{"name": "eda-asns"}],
-            }
-        ]
-
         print("Creating ASN ranges...")
-        for asn_range in asn_ranges:
+        for asn_range in self.ASN_RANGES:
+            asn_range = dict(asn_range, rir=rir_id)
             response = self.session.get(
                 f"{self.netbox_url}/api/ipam/asn-ranges/?slug={asn_range['slug']}"
             )
             data = response.json()
             if data.get("count", 0) > 0:
                 existing = data["results"][0]
+                self._track("ipam.asnrange", existing["id"])
                 patch_payload = {
                     "name": asn_range["name"],
                     "start": asn_range["start"],
@@ -344,7 +615,7 @@ class NetBoxConfigurator:
                 if patch_response.status_code == 200:
                     print(f"ASN range '{asn_range['name']}' updated successfully")
                 else:
-                    print(
+                    self._error(
                         f"Error updating ASN range '{asn_range['name']}': "
                         f"{patch_response.status_code} {patch_response.text}"
                     )
@@ -356,6 +627,7 @@ class NetBoxConfigurator:
             legacy_data = legacy_response.json()
             if legacy_data.get("count", 0) > 0:
                 legacy = legacy_data["results"][0]
+                self._track("ipam.asnrange", legacy["id"])
                 patch_payload = {
                     "name": asn_range["name"],
                     "slug": asn_range["slug"],
@@ -374,7 +646,7 @@ class NetBoxConfigurator:
                         "Legacy ASN range 'eda-ans' migrated to 'eda-asns' successfully"
                     )
                 else:
-                    print(
+                    self._error(
                         "Error migrating legacy ASN range 'eda-ans': "
                         f"{patch_response.status_code} {patch_response.text}"
                     )
@@ -385,49 +657,21 @@ class NetBoxConfigurator:
             )
             if create_response.status_code == 201:
                 print(f"ASN range '{asn_range['name']}' created successfully")
+                self._track("ipam.asnrange", create_response.json()["id"])
             else:
-                print(
+                self._error(
                     f"Error creating ASN range '{asn_range['name']}': "
                     f"{create_response.status_code} {create_response.text}"
                 )
 
+    @traced
     def create_prefixes(self):
         """Create example prefixes for EDA allocation pools"""
-        prefixes = [
-            {
-                "prefix": "192.168.10.0/24",
-                "status": "active",
-                "description": "System IP pool for spine/leaf",
-                "tags": [{"name": "eda-systemip-v4"}],
-            },
-            {
-                "prefix": "10.0.0.0/16",
-                "status": "container",
-                "description": "ISL subnet pool",
-                "tags": [{"name": "eda-isl-v4"}],
-            },
-            {
-                "prefix": "2001:db8::/32",
-                "status": "active",
-                "description": "IPv6 System IP pool",
-                "tags": [{"name": "eda-systemip-v6"}],
-            },
-            {
-                "prefix": "2005::/64",
-                "status": "container",
-                "description": "IPv6 ISL subnet pool",
-                "tags": [{"name": "eda-isl-v6"}],
-            },
-            {
-                "prefix": "172.16.0.0/16",
-                "status": "active",
-                "description": "Management IP pool",
-                "tags": [{"name": "eda-mgmt-v4"}],
-            },
-        ]
-
+        if self.fanout is not None:
+            return self.fanout.run(self.create_prefixes_async())
         print("Creating prefixes...")
-        for prefix_data in prefixes:
+        for prefix_data in self.PREFIXES:
+            prefix_data = dict(prefix_data)
             # Add tenant and site if available
             if self.tenant_id:
                 prefix_data["tenant"] = self.tenant_id
@@ -440,6 +684,7 @@ class NetBoxConfigurator:
             )
             if response.json()["count"] > 0:
                 existing = response.json()["results"][0]
+                self._track("ipam.prefix", existing["id"])
                 # Update tenant/site if missing
                 patch_data = {}
                 if self.tenant_id and not existing.get("tenant"):
@@ -454,7 +699,7 @@ class NetBoxConfigurator:
                     if patch_resp.status_code == 200:
                         print(f"Prefix '{prefix_data['prefix']}' updated with tenant/site")
                     else:
-                        print(f"Error updating prefix '{prefix_data['prefix']}': {patch_resp.text}")
+                        self._error(f"Error updating prefix '{prefix_data['prefix']}': {patch_resp.text}")
                 else:
                     print(f"Prefix '{prefix_data['prefix']}' already exists")
                 continue
@@ -464,26 +709,159 @@ class NetBoxConfigurator:
             )
             if response.status_code == 201:
                 print(f"Prefix '{prefix_data['prefix']}' created successfully")
+                self._track("ipam.prefix", response.json()["id"])
             else:
-                print(
+                self._error(
                     f"Error creating prefix '{prefix_data['prefix']}': {response.text}"
                 )
 
+    async def _ensure_async(self, endpoint, object_type, kind, name, lookup, payload):
+        """Look one object up on the fanout and create it when missing
 
-def main():
-    """Main configuration function"""
-    netbox_url, eda_api, netbox_ui_url = read_config_files()
-    api_token = get_api_token()
+        Returns the existing object, or None when it was created (or failed).
+        """
+        session = self.fanout.session
+        url = f"{self.fanout.netbox_url}/api/{endpoint}/"
+        response = await session.get(url, params=lookup)
+        if response.json().get("count", 0) > 0:
+            existing = response.json()["results"][0]
+            self._track(object_type, existing["id"])
+            return existing
 
-    print(f"NetBox URL: {netbox_ui_url}")
-    print(f"EDA API: {eda_api}")
+        response = await session.post(url, json=payload)
+        if response.status_code == 201:
+            print(f"{kind[0].upper()}{kind[1:]} '{name}' created successfully")
+            self._track(object_type, response.json()["id"])
+        else:
+            self._error(f"Error creating {kind} '{name}': {response.status_code} {response.text}")
+        return None
 
-    configurator = NetBoxConfigurator(netbox_url, api_token)
+    @traced
+    async def create_tags_async(self):
+        """create_tags() with every tag looked up and created concurrently"""
+        print("Creating tags...")
 
-    # Wait for NetBox to be ready
-    if not configurator.wait_for_netbox():
-        print("NetBox is not ready. Please check the deployment.")
-        sys.exit(1)
+        async def ensure(tag):
+            if await self._ensure_async(
+                "extras/tags", "extras.tag", "tag", tag["name"], {"name": tag["name"]}, tag
+            ):
+                print(f"Tag '{tag['name']}' already exists")
+
+        await asyncio.gather(*(ensure(tag) for tag in self.TAGS))
+
+    @traced
+    async def create_vlan_groups_async(self):
+        """create_vlan_groups() with every group looked up and created concurrently"""
+        print("Creating VLAN groups...")
+
+        async def ensure(group):
+            if await self._ensure_async(
+                "ipam/vlan-groups", "ipam.vlangroup", "VLAN group", group["name"],
+                {"name": group["name"]}, group,
+            ):
+                print(f"VLAN group '{group['name']}' already exists")
+
+        await asyncio.gather(*(ensure(group) for group in self.VLAN_GROUPS))
+
+    @traced
+    async def create_prefixes_async(self):
+        """create_prefixes() with every prefix looked up and created concurrently"""
+        print("Creating prefixes...")
+
+        async def ensure(prefix_data):
+            prefix_data = dict(prefix_data)
+            if self.tenant_id:
+                prefix_data["tenant"] = self.tenant_id
+            if self.site_id:
+                prefix_data["site"] = self.site_id
+            prefix = prefix_data["prefix"]
+            existing = await self._ensure_async(
+                "ipam/prefixes", "ipam.prefix", "prefix", prefix, {"prefix": prefix}, prefix_data
+            )
+            if existing is None:
+                return
+            # Update tenant/site if missing
+            patch_data = {}
+            if self.tenant_id and not existing.get("tenant"):
+                patch_data["tenant"] = self.tenant_id
+            if self.site_id and not existing.get("site"):
+                patch_data["site"] = self.site_id
+            if not patch_data:
+                print(f"Prefix '{prefix}' already exists")
+                return
+            patch_resp = await self.fanout.session.patch(
+                f"{self.fanout.netbox_url}/api/ipam/prefixes/{existing['id']}/", json=patch_data
+            )
+            if patch_resp.status_code == 200:
+                print(f"Prefix '{prefix}' updated with tenant/site")
+            else:
+                self._error(f"Error updating prefix '{prefix}': {patch_resp.text}")
+
+        await asyncio.gather(*(ensure(prefix_data) for prefix_data in self.PREFIXES))
+
+    @traced
+    def export_pools(self):
+        """Read the EDA pools back from NetBox in the load_pools() file format
+
+        Objects are found by the tags of the configured pools (tag filters
+        are AND-ed, so one query per tag), which also picks up pools added
+        by hand with the same tags.
+        """
+        pools = {
+            "prefixes": self.PREFIXES,
+            "vlan_groups": self.VLAN_GROUPS,
+            "asn_ranges": self.ASN_RANGES,
+        }
+        endpoints = {
+            "prefixes": "ipam/prefixes",
+            "vlan_groups": "ipam/vlan-groups",
+            "asn_ranges": "ipam/asn-ranges",
+        }
+        fields = {
+            "prefixes": ("prefix", "status", "description"),
+            "vlan_groups": ("name", "slug", "description", "vid_ranges"),
+            "asn_ranges": ("name", "slug", "start", "end", "description"),
+        }
+        found = {key: {} for key in pools}
+        for key, objects in pools.items():
+            for tag in sorted({tag["name"] for obj in objects for tag in obj.get("tags", [])}):
+                for record in self._list_tagged(endpoints[key], tag, ("id", "tags") + fields[key]):
+                    found[key][record.id] = record._asdict()
+
+        def export(item, fields):
+            obj = {field: item.get(field) for field in fields}
+            if isinstance(obj.get("status"), dict):
+                obj["status"] = obj["status"]["value"]
+            obj["tags"] = [{"name": tag["name"]} for tag in item.get("tags") or []]
+            return obj
+
+        return {
+            key: [export(found[key][obj_id], fields[key]) for obj_id in sorted(found[key])]
+            for key in pools
+        }
+
+    def _list_tagged(self, endpoint, tag, fields):
+        try:
+            return list(
+                self.session.iter_results(
+                    f"{self.netbox_url}/api/{endpoint}/",
+                    {"tag": tag},
+                    fields=fields,
+                    page_size=self.PAGE_SIZE,
+                )
+            )
+        except requests.HTTPError as exc:
+            self._error(f"Error listing {endpoint} tagged {tag}: {exc.response.status_code}")
+            return []
+
+
+@traced
+def configure(configurator, eda_api, force=False):
+    """Apply the EDA integration configuration; return True when no errors occurred"""
+    # Skip the full reconcile when nothing has changed since the last run
+    if not force and configurator.is_up_to_date(eda_api):
+        print("NetBox configuration is up to date (fingerprint matches, no drift)")
+        return True
 
     # Configure NetBox - get EDA-created tenant and site
     configurator.get_tenant("eda")
@@ -495,6 +873,80 @@ def main():
     configurator.create_prefixes()
     configurator.create_vlan_groups()
     configurator.create_asn_ranges()
+    if configurator.errors:
+        return False
+    configurator.store_fingerprint(eda_api)
+    return True
+
+
+def main(argv=None, prog=None, api_token=None, session=None):
+    """Main configuration function
+
+    eda_netbox.py passes its arguments, the API token and a shared session.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Configure NetBox for EDA integration"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run a full reconcile even if the stored fingerprint matches"
+    )
+    parser.add_argument(
+        "--pools",
+        default=None,
+        help="JSON file with prefixes, VLAN groups and ASN ranges to create instead of the defaults"
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Look up and create tags, prefixes and VLAN groups concurrently on the asyncio/HTTP/2 client"
+    )
+    args = parser.parse_args(argv)
+
+    netbox_url, eda_api, netbox_ui_url = read_config_files()
+    api_token = api_token or get_api_token()
+
+    print(f"NetBox URL: {netbox_ui_url}")
+    print(f"EDA API: {eda_api}")
+
+    configurator = NetBoxConfigurator(netbox_url, api_token, session=session)
+    if args.pools:
+        configurator.load_pools(args.pools)
+    if args.use_async:
+        # The EDA certificate is usually self-signed (see health_gate.py);
+        # the cache is shared so writes on either session invalidate both
+        configurator.fanout = AsyncFanout(
+            api_token,
+            fanout_url(netbox_url, netbox_ui_url),
+            verify=False,
+            cache=configurator.session.cache,
+        )
+
+    try:
+        with span("configure_netbox", netbox_url=netbox_url) as s:
+            # Wait for NetBox to be ready
+            if not configurator.wait_for_netbox():
+                print("NetBox is not ready. Please check the deployment.")
+                sys.exit(1)
+            configure(configurator, eda_api, force=args.force)
+            metrics = configurator.session.metrics()
+            for key, value in metrics.items():
+                s.set(f"client.{key}", value)
+            if configurator.fanout is not None:
+                async_metrics = configurator.fanout.session.metrics()
+                for key, value in async_metrics.items():
+                    s.set(f"async_client.{key}", value)
+    finally:
+        if configurator.fanout is not None:
+            configurator.fanout.close()
+
+    print(f"\nNetBox client: {format_metrics(metrics)}")
+    if configurator.fanout is not None:
+        print(f"NetBox async client: {format_metrics(async_metrics)}")
 
     print("\nNetBox configuration completed!")
     print(f"You can now access NetBox at: {netbox_ui_url}")
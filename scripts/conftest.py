@@ -0,0 +1,213 @@
+"""
+pytest fixtures for the NetBox scripts
+
+`netbox` serves an in-memory NetBox on a local port with just enough of the
+REST API for the configurator, cleaner and watcher: list filters (repeated
+values OR-ed, `id__gt`, `slug__isw`), `limit`/`offset` paging, single and
+bulk writes, and a change log under `core/object-changes`.
+"""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+# Object type of each endpoint, as recorded in the change log
+OBJECT_TYPES = {
+    "tenancy/tenants": "tenancy.tenant",
+    "dcim/sites": "dcim.site",
+    "extras/tags": "extras.tag",
+    "extras/webhooks": "extras.webhook",
+    "extras/event-rules": "extras.eventrule",
+    "extras/config-contexts": "extras.configcontext",
+    "extras/custom-fields": "extras.customfield",
+    "ipam/prefixes": "ipam.prefix",
+    "ipam/vlan-groups": "ipam.vlangroup",
+    "ipam/rirs": "ipam.rir",
+    "ipam/asn-ranges": "ipam.asnrange",
+    "ipam/ip-addresses": "ipam.ipaddress",
+    "ipam/vlans": "ipam.vlan",
+    "ipam/asns": "ipam.asn",
+    "dcim/cables": "dcim.cable",
+    "dcim/devices": "dcim.device",
+}
+PAGING_PARAMS = {"limit", "offset", "ordering", "fields", "brief"}
+
+
+class FakeNetBox:
+    """In-memory NetBox objects, change log and request counts"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables = {endpoint: {} for endpoint in OBJECT_TYPES}
+        self.changes = []
+        self.next_id = 1
+        self.requests = []
+
+    def add(self, endpoint, data):
+        with self.lock:
+            obj = dict(data, id=self.next_id)
+            self.next_id += 1
+            if "tags" in obj:
+                obj["tags"] = [
+                    {"name": tag["name"], "slug": tag.get("slug", tag["name"])}
+                    for tag in obj["tags"]
+                ]
+            self.tables[endpoint][obj["id"]] = obj
+            self._log("create", endpoint, obj["id"])
+            return obj
+
+    def objects(self, endpoint):
+        return list(self.tables[endpoint].values())
+
+    def _log(self, action, endpoint, obj_id):
+        self.changes.append({
+            "id": len(self.changes) + 1,
+            "action": action,
+            "changed_object_type": OBJECT_TYPES[endpoint],
+            "changed_object_id": obj_id,
+        })
+
+    def update(self, endpoint, obj_id, data):
+        with self.lock:
+            obj = self.tables[endpoint].get(obj_id)
+            if obj is None:
+                return None
+            obj.update(data)
+            self._log("update", endpoint, obj_id)
+            return obj
+
+    def delete(self, endpoint, ids):
+        with self.lock:
+            table = self.tables[endpoint]
+            if any(obj_id not in table for obj_id in ids):
+                return False
+            for obj_id in ids:
+                del table[obj_id]
+                self._log("delete", endpoint, obj_id)
+            return True
+
+    def select(self, items, query):
+        return [
+            item for item in items
+            if all(self._matches(item, key, values) for key, values in query.items())
+        ]
+
+    @staticmethod
+    def _matches(item, key, values):
+        if key in PAGING_PARAMS:
+            return True
+        field, _, lookup = key.partition("__")
+        value = item.get(field)
+        if field.startswith("cf_"):
+            value = (item.get("custom_fields") or {}).get(field[3:])
+        if field == "tag":
+            return any(tag["slug"] in values for tag in item.get("tags") or [])
+        if field == "tenant":
+            tenant = value if isinstance(value, dict) else {}
+            return tenant.get("slug") in values or tenant.get("name") in values
+        if isinstance(value, dict):
+            value = value.get("id")
+        if lookup == "gt":
+            return value is not None and int(value) > int(values[0])
+        if lookup == "isw":
+            return str(value).startswith(values[0])
+        return str(value) in values
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None):
+        data = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _parse(self):
+        netbox = self.server.netbox
+        parts = urlsplit(self.path)
+        netbox.requests.append((self.command, parts.path))
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        match = re.match(r"^/api/([a-z-]+/[a-z-]+)/(?:(\d+)/)?$", parts.path)
+        if not match:
+            return None, None, parse_qs(parts.query), body
+        obj_id = int(match.group(2)) if match.group(2) else None
+        return match.group(1), obj_id, parse_qs(parts.query), body
+
+    def do_GET(self):
+        netbox = self.server.netbox
+        endpoint, obj_id, query, _ = self._parse()
+        if self.path.split("?")[0] == "/api/":
+            return self._send(200, {})
+        if endpoint == "core/object-changes":
+            items = netbox.select(netbox.changes, query)
+            if query.get("ordering") == ["-id"]:
+                items = items[::-1]
+        elif endpoint in netbox.tables:
+            if obj_id is not None:
+                obj = netbox.tables[endpoint].get(obj_id)
+                return self._send(200, obj) if obj else self._send(404, {"detail": "Not found."})
+            items = netbox.select(list(netbox.tables[endpoint].values()), query)
+        else:
+            return self._send(404, {"detail": "Not found."})
+        limit = int(query.get("limit", ["50"])[0])
+        offset = int(query.get("offset", ["0"])[0])
+        more = offset + limit < len(items)
+        self._send(200, {
+            "count": len(items),
+            "next": f"{self.path}&offset={offset + limit}" if more else None,
+            "previous": None,
+            "results": items[offset:offset + limit],
+        })
+
+    def do_POST(self):
+        endpoint, _, _, body = self._parse()
+        if endpoint not in self.server.netbox.tables:
+            return self._send(404, {"detail": "Not found."})
+        self._send(201, self.server.netbox.add(endpoint, body))
+
+    def do_PATCH(self):
+        endpoint, obj_id, _, body = self._parse()
+        obj = self.server.netbox.update(endpoint, obj_id, body)
+        self._send(200, obj) if obj else self._send(404, {"detail": "Not found."})
+
+    def do_DELETE(self):
+        endpoint, obj_id, _, body = self._parse()
+        ids = [item["id"] for item in body] if obj_id is None else [obj_id]
+        if self.server.netbox.delete(endpoint, ids):
+            self._send(204)
+        else:
+            self._send(404, {"detail": "Not found."})
+
+
+@pytest.fixture
+def netbox():
+    """A FakeNetBox seeded with the EDA tenant and site, served on `netbox.url`"""
+    fake = FakeNetBox()
+    tenant = fake.add("tenancy/tenants", {"name": "eda", "slug": "eda"})
+    fake.add("dcim/sites", {
+        "name": "eda",
+        "slug": "eda",
+        "tenant": {"id": tenant["id"], "name": "eda", "slug": "eda"},
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.netbox = fake
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    fake.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield fake
+    server.shutdown()
+    server.server_close()
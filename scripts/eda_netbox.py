@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# /// script
+# dependencies = ["requests", "httpx[http2]"]
+# ///
+"""
+Single entry point for the lab's NetBox steps
+
+    uv run scripts/eda_netbox.py import [--vendors nokia]
+    uv run scripts/eda_netbox.py wait crd|resource|site ...
+    uv run scripts/eda_netbox.py configure [--force] [--pools FILE] [--async]
+    uv run scripts/eda_netbox.py cleanup [--yes] [--gc] ...
+    uv run scripts/eda_netbox.py export [--output pools.json]
+    uv run scripts/eda_netbox.py health [--timeout 600] [--once]
+    uv run scripts/eda_netbox.py serve
+
+Each subcommand takes the options of the script it wraps and imports that
+script only when it runs. `serve` keeps one process for a whole bring-up:
+it reads one command per line from stdin, prints "@@done <status>" after
+each one, and shares the API token (NETBOX_API_TOKEN or kubectl, fetched
+once) and one NetBox connection pool across commands. init.sh drives it
+through a pair of FIFOs.
+
+Startup time (process start, or the `uv run` launcher's start, until the
+first command is dispatched) is reported on stderr apart from the time of
+each command, the lazy imports and the token lookup.
+"""
+
+import time
+
+MODULE_START = time.monotonic()
+
+import importlib
+import os
+import shlex
+import sys
+import traceback
+
+PROG = "eda_netbox.py"
+DONE_MARKER = "@@done"
+
+
+def _stat_fields(pid):
+    """Fields of /proc/<pid>/stat after the command name (field 3 onwards)"""
+    with open(f"/proc/{pid}/stat", "r") as f:
+        return f.read().rsplit(")", 1)[1].split()
+
+
+def startup_seconds():
+    """Seconds since this process (or its `uv run` parent) started
+
+    Uses the start times in /proc; elsewhere falls back to the time since
+    this module started executing.
+    """
+    try:
+        fields = _stat_fields("self")
+        start_ticks = int(fields[19])
+        parent = fields[1]
+        with open(f"/proc/{parent}/comm", "r") as f:
+            if f.read().strip() == "uv":
+                # Include uv's dependency resolution
+                start_ticks = int(_stat_fields(parent)[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - MODULE_START
+
+
+class Lab:
+    """State shared by the commands run in one process"""
+
+    def __init__(self):
+        self.timings = []
+        self._modules = {}
+        self._api_token = os.environ.get("NETBOX_API_TOKEN") or None
+        self._session = None
+
+    def _time(self, label, start):
+        self.timings.append((label, time.monotonic() - start))
+
+    def load(self, name):
+        """Import a sibling script on first use and time the import"""
+        if name not in self._modules:
+            start = time.monotonic()
+            self._modules[name] = importlib.import_module(name)
+            self._time(f"import {name}", start)
+        return self._modules[name]
+
+    @property
+    def has_token(self):
+        return self._api_token is not None
+
+    @property
+    def api_token(self):
+        if self._api_token is None:
+            start = time.monotonic()
+            self._api_token = self.load("configure_netbox").get_api_token()
+            self._time("token", start)
+        return self._api_token
+
+    @property
+    def session(self):
+        """NetBoxSession shared by every command; its connections stay warm"""
+        if self._session is None:
+            netbox_client = self.load("netbox_client")
+            self._session = netbox_client.NetBoxSession(self.api_token, cache=True)
+        return self._session
+
+    def run(self, argv):
+        """Run one command line; return its exit status"""
+        if not argv or argv[0] not in COMMANDS:
+            print(f"Unknown command: {' '.join(argv)}", file=sys.stderr)
+            print(f"Commands: {', '.join(sorted(COMMANDS))}", file=sys.stderr)
+            return 2
+        name, args = argv[0], argv[1:]
+        if self._session is not None:
+            # Each command starts from NetBox's current state
+            self._session.clear_cache()
+        start = time.monotonic()
+        status = 0
+        try:
+            with self.load("tracing").span(f"eda_netbox {name}", argv=" ".join(argv)):
+                COMMANDS[name](self, args, f"{PROG} {name}")
+        except SystemExit as exc:
+            if isinstance(exc.code, int) or exc.code is None:
+                status = exc.code or 0
+            else:
+                print(exc.code, file=sys.stderr)
+                status = 1
+        except Exception:
+            traceback.print_exc()
+            status = 1
+        sys.stdout.flush()
+        self._time(name, start)
+        print(f"[{PROG}] {name}: {self.timings[-1][1]:.2f}s (exit {status})", file=sys.stderr)
+        return status
+
+    def report(self, startup):
+        parts = [f"startup {startup:.2f}s"]
+        parts += [f"{label} {seconds:.2f}s" for label, seconds in self.timings]
+        if self._session is not None:
+            requests = self._session.metrics()["requests"]
+            parts.append(f"{requests} NetBox requests on one session")
+        print(f"[{PROG}] {', '.join(parts)}", file=sys.stderr)
+
+
+def cmd_import(lab, args, prog):
+    # Only the readiness probe talks to NetBox; reuse the pool when the
+    # token is already known rather than fetching it for an anonymous GET
+    session = lab.session if lab.has_token else None
+    lab.load("import_device_types").main(args, prog=prog, session=session)
+
+
+def cmd_wait(lab, args, prog):
+    if args and args[0] == "site":
+        lab.load("wait_for").main(args, prog=prog, api_token=lab.api_token, session=lab.session)
+    else:
+        lab.load("wait_for").main(args, prog=prog)
+
+
+def cmd_configure(lab, args, prog):
+    lab.load("configure_netbox").main(args, prog=prog, api_token=lab.api_token, session=lab.session)
+
+
+def cmd_cleanup(lab, args, prog):
+    lab.load("cleanup_netbox").main(args, prog=prog, api_token=lab.api_token, session=lab.session)
+
+
+def cmd_health(lab, args, prog):
+    lab.load("health_gate").main(args, prog=prog, api_token=lab.api_token)
+
+
+def cmd_export(lab, args, prog):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Write the EDA pools in NetBox as a pools.json for configure --pools",
+    )
+    parser.add_argument("--output", "-o", default="-", help="Output file (default: stdout)")
+    parser.add_argument("--pools", default=None, help="pools.json whose tags select what to export")
+    args = parser.parse_args(args)
+
+    configure_netbox = lab.load("configure_netbox")
+    netbox_url, _, _ = configure_netbox.read_config_files()
+    configurator = configure_netbox.NetBoxConfigurator(netbox_url, lab.api_token, session=lab.session)
+    if args.pools:
+        configurator.load_pools(args.pools)
+    pools = configurator.export_pools()
+    if configurator.errors:
+        sys.exit(1)
+    text = json.dumps(pools, indent=2) + "\n"
+    if args.output == "-":
+        sys.stdout.write(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(
+            f"Exported {len(pools['prefixes'])} prefixes, {len(pools['vlan_groups'])} VLAN groups "
+            f"and {len(pools['asn_ranges'])} ASN ranges to {args.output}"
+        )
+
+
+COMMANDS = {
+    "import": cmd_import,
+    "wait": cmd_wait,
+    "configure": cmd_configure,
+    "cleanup": cmd_cleanup,
+    "export": cmd_export,
+    "health": cmd_health,
+}
+
+
+def serve(lab):
+    """Run command lines from stdin until EOF or `exit`; return the last failure status"""
+    # Commands keep reading from the original stdin; the commands themselves
+    # (and any kubectl they start) get /dev/null so they cannot eat input
+    commands = os.fdopen(os.dup(0), "r")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    sys.stdin = open(os.devnull, "r")
+    sys.stdout.reconfigure(line_buffering=True)
+
+    last_failure = 0
+    for line in commands:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line in ("exit", "quit"):
+            break
+        try:
+            argv = shlex.split(line)
+        except ValueError as exc:
+            print(f"Cannot parse command: {exc}", file=sys.stderr)
+            status = 2
+        else:
+            status = lab.run(argv)
+        if status:
+            last_failure = status
+        print(f"{DONE_MARKER} {status}", flush=True)
+    return last_failure
+
+
+def main():
+    argv = sys.argv[1:]
+    if not argv or argv[0] in ("-h", "--help"):
+        print(__doc__.strip())
+        sys.exit(0 if argv else 2)
+
+    lab = Lab()
+    startup = startup_seconds()
+    print(f"[{PROG}] startup {startup:.2f}s", file=sys.stderr)
+    # tracing pulls in requests, so it is loaded after startup is measured
+    with lab.load("tracing").span("eda_netbox", startup_s=round(startup, 3)):
+        if argv[0] == "serve":
+            status = serve(lab)
+        else:
+            status = lab.run(argv)
+    lab.report(startup)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
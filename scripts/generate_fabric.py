@@ -0,0 +1,508 @@
+#!/usr/bin/env python
+# /// script
+# dependencies = ["pyyaml", "requests"]
+# ///
+"""
+Generate leaf/spine (optionally super-spine) fabrics for scale testing
+
+For a given fabric size this writes, into one output directory:
+
+    <name>.clab.yaml          containerlab topology
+    lab-topo.yaml             CX NetworkTopology
+    pools.json                NetBox pools sized for the fabric, for
+                              `configure_netbox.py --pools`
+    0020_allocations.yaml     Allocation CRs for the NetBox pools
+    0060_fabric.yaml          Fabric CR using those allocations
+
+Nodes and links follow the conventions of eda-nb.clab.yaml and
+cx/topology/lab-topo.yaml, so the output can be deployed the same way.
+"""
+
+import argparse
+import ipaddress
+import json
+import math
+import os
+import sys
+
+import yaml
+
+from sync_topology import CLAB_SRL_TYPES
+
+PLATFORM_CLAB_TYPES = {model: clab_type for clab_type, model in CLAB_SRL_TYPES.items()}
+# Front panel ports per platform, used to warn about fabrics that do not fit
+PLATFORM_PORTS = {
+    "7220 IXR-D1": 52,
+    "7220 IXR-D2": 56,
+    "7220 IXR-D2L": 58,
+    "7220 IXR-D3": 34,
+    "7220 IXR-D3L": 34,
+    "7220 IXR-D4": 36,
+    "7220 IXR-D5": 64,
+    "7220 IXR-H2": 128,
+    "7220 IXR-H3": 34,
+    "7220 IXR-H4": 66,
+}
+SRL_IMAGE = "ghcr.io/nokia/srlinux:25.3.2"
+SERVER_IMAGE = "ghcr.io/srl-labs/network-multitool"
+NODE_PROFILE = "srlinux-ghcr-25.10.1"
+NAMESPACE = "eda-netbox"
+
+# Base addresses of the pools created by configure_netbox.py; larger fabrics
+# widen these to the covering supernet
+SYSTEM_V4_BASE = "192.168.10.0"
+ISL_V4_BASE = "10.0.0.0"
+MGMT_V4_BASE = "172.16.0.0"
+CLAB_MGMT_BASE = "10.59.2.0"
+ASN_PRIVATE_2B = (65000, 65534)
+ASN_PRIVATE_4B = (4200000000, 4294967294)
+MAX_VLAN_ID = 4094
+
+
+class Fabric:
+    """Nodes and links of a generated fabric"""
+
+    def __init__(self):
+        # name -> {"role", "platform", "pod"}
+        self.nodes = {}
+        # (a_node, a_port, b_node, b_port, role)
+        self.links = []
+        # (server, leaf, leaf_port)
+        self.servers = []
+        self.ports_used = {}
+
+    def add_node(self, name, role, platform, pod=None):
+        self.nodes[name] = {"role": role, "platform": platform, "pod": pod}
+        self.ports_used[name] = 0
+
+    def next_port(self, node, start=1):
+        self.ports_used[node] = max(self.ports_used[node] + 1, start)
+        return self.ports_used[node]
+
+    @property
+    def switch_count(self):
+        return len(self.nodes)
+
+    def isl_count(self):
+        return sum(1 for link in self.links if link[4] == "interSwitch")
+
+
+def build_fabric(args):
+    fabric = Fabric()
+    for s in range(1, args.super_spines + 1):
+        fabric.add_node(f"superspine{s}", "superspine", args.superspine_platform)
+
+    for pod in range(1, args.pods + 1):
+        prefix = f"pod{pod}-" if args.pods > 1 else ""
+        pod_label = str(pod) if args.pods > 1 else None
+        spines = [f"{prefix}spine{s}" for s in range(1, args.spines + 1)]
+        leaves = [f"{prefix}leaf{l}" for l in range(1, args.leaves + 1)]
+        for spine in spines:
+            fabric.add_node(spine, "spine", args.spine_platform, pod_label)
+        for leaf in leaves:
+            fabric.add_node(leaf, "leaf", args.leaf_platform, pod_label)
+
+        for leaf in leaves:
+            for spine in spines:
+                for _ in range(args.uplinks):
+                    fabric.links.append(
+                        (
+                            leaf,
+                            fabric.next_port(leaf, args.leaf_uplink_start),
+                            spine,
+                            fabric.next_port(spine),
+                            "interSwitch",
+                        )
+                    )
+        for spine in spines:
+            for s in range(1, args.super_spines + 1):
+                superspine = f"superspine{s}"
+                fabric.links.append(
+                    (
+                        spine,
+                        fabric.next_port(spine),
+                        superspine,
+                        fabric.next_port(superspine),
+                        "interSwitch",
+                    )
+                )
+        for leaf in leaves:
+            for n in range(1, args.servers_per_leaf + 1):
+                server = f"{leaf}-server{n}"
+                fabric.servers.append((server, leaf, n))
+    return fabric
+
+
+def check_ports(fabric):
+    """Return warnings for nodes using more ports than their platform has"""
+    warnings = []
+    for name, node in fabric.nodes.items():
+        limit = PLATFORM_PORTS.get(node["platform"])
+        if limit and fabric.ports_used[name] > limit:
+            warnings.append(
+                f"{name} uses port {fabric.ports_used[name]} but a "
+                f"{node['platform']} has {limit}"
+            )
+    return warnings
+
+
+def sized_v4(base, addresses, max_length):
+    """IPv4 network around `base` holding `addresses`, no smaller than /max_length"""
+    length = 32 - max(0, math.ceil(math.log2(max(addresses, 1))))
+    length = min(length, max_length)
+    return str(ipaddress.ip_network(f"{base}/{length}", strict=False))
+
+
+def pool_sizes(fabric, headroom, vlans):
+    """Prefix, VLAN group and ASN range definitions sized for the fabric"""
+    switches = math.ceil(fabric.switch_count * headroom)
+    isls = math.ceil(fabric.isl_count() * headroom)
+    # Host addresses plus network and broadcast
+    system_v4 = sized_v4(SYSTEM_V4_BASE, switches + 2, 24)
+    mgmt_v4 = sized_v4(MGMT_V4_BASE, switches + 2, 16)
+    # Each ISL takes one /31
+    isl_v4 = sized_v4(ISL_V4_BASE, isls * 2, 16)
+
+    prefixes = [
+        {
+            "prefix": system_v4,
+            "status": "active",
+            "description": "System IP pool for spine/leaf",
+            "tags": [{"name": "eda-systemip-v4"}],
+        },
+        {
+            "prefix": isl_v4,
+            "status": "container",
+            "description": "ISL subnet pool",
+            "tags": [{"name": "eda-isl-v4"}],
+        },
+        {
+            "prefix": "2001:db8::/32",
+            "status": "active",
+            "description": "IPv6 System IP pool",
+            "tags": [{"name": "eda-systemip-v6"}],
+        },
+        {
+            "prefix": "2005::/64",
+            "status": "container",
+            "description": "IPv6 ISL subnet pool",
+            "tags": [{"name": "eda-isl-v6"}],
+        },
+        {
+            "prefix": mgmt_v4,
+            "status": "active",
+            "description": "Management IP pool",
+            "tags": [{"name": "eda-mgmt-v4"}],
+        },
+    ]
+
+    vlan_groups = [
+        {
+            "name": "eda-vlans",
+            "slug": "eda-vlans",
+            "description": "EDA managed VLAN IDs",
+            "vid_ranges": [[1, min(vlans, MAX_VLAN_ID)]],
+            "tags": [{"name": "eda-vlans"}],
+        }
+    ]
+
+    # One ASN per switch; move to the 4-byte private range when the 2-byte
+    # range is too small
+    start, end = ASN_PRIVATE_2B
+    if start + switches - 1 > end:
+        start, end = ASN_PRIVATE_4B
+    asn_ranges = [
+        {
+            "name": "eda-asns",
+            "slug": "eda-asns",
+            "start": start,
+            "end": min(end, start + max(switches, 101) - 1),
+            "description": "EDA managed private ASNs",
+            "tags": [{"name": "eda-asns"}],
+        }
+    ]
+    return {"prefixes": prefixes, "vlan_groups": vlan_groups, "asn_ranges": asn_ranges}
+
+
+def clab_topology(fabric, name):
+    nodes = {}
+    for node_name, node in fabric.nodes.items():
+        entry = {"kind": "nokia_srlinux"}
+        clab_type = PLATFORM_CLAB_TYPES.get(node["platform"])
+        if clab_type:
+            entry["type"] = clab_type
+        labels = {"eda.nokia.com/role": node["role"]}
+        if node["pod"]:
+            labels["eda.nokia.com/pod"] = node["pod"]
+        entry["labels"] = labels
+        nodes[node_name] = entry
+    for server, _, _ in fabric.servers:
+        nodes[server] = {
+            "kind": "linux",
+            "image": SERVER_IMAGE,
+            "binds": ["configs/servers:/configs"],
+            "exec": ["bash /configs/__clabNodeName__.sh"],
+        }
+
+    links = [
+        {"endpoints": [f"{a}:ethernet-1/{a_port}", f"{b}:ethernet-1/{b_port}"]}
+        for a, a_port, b, b_port, _ in fabric.links
+    ]
+    links.extend(
+        {"endpoints": [f"{leaf}:ethernet-1/{port}", f"{server}:eth1"]}
+        for server, leaf, port in fabric.servers
+    )
+
+    # Room for every node plus the gateway
+    mgmt_hosts = len(nodes) + 2
+    mgmt_subnet = sized_v4(CLAB_MGMT_BASE, mgmt_hosts, 24)
+    return {
+        "name": name,
+        "mgmt": {"network": name, "ipv4-subnet": mgmt_subnet},
+        "topology": {
+            "kinds": {"nokia_srlinux": {"image": SRL_IMAGE}},
+            "nodes": nodes,
+            "links": links,
+        },
+    }
+
+
+def cx_topology(fabric, name):
+    roles = sorted({node["role"] for node in fabric.nodes.values()})
+    platforms = {node["role"]: node["platform"] for node in fabric.nodes.values()}
+    templates = [
+        {
+            "name": role,
+            "nodeProfile": NODE_PROFILE,
+            "platform": platforms[role],
+            "labels": {
+                "eda.nokia.com/security-profile": "managed",
+                "eda.nokia.com/role": role,
+            },
+        }
+        for role in roles
+    ]
+
+    nodes = []
+    for node_name, node in fabric.nodes.items():
+        entry = {"name": node_name, "template": node["role"]}
+        if node["pod"]:
+            entry["labels"] = {"eda.nokia.com/pod": node["pod"]}
+        nodes.append(entry)
+
+    links = []
+    for a, a_port, b, b_port, _ in fabric.links:
+        links.append(
+            {
+                "name": f"{a}-{b}-{a_port}",
+                "template": "isl",
+                "endpoints": [
+                    {
+                        "local": {"node": a, "interface": f"ethernet-1-{a_port}"},
+                        "remote": {"node": b, "interface": f"ethernet-1-{b_port}"},
+                    }
+                ],
+            }
+        )
+    for server, leaf, port in fabric.servers:
+        links.append(
+            {
+                "name": f"{leaf}-{server}",
+                "template": "edge",
+                "endpoints": [
+                    {
+                        "local": {"node": leaf, "interface": f"ethernet-1-{port}"},
+                        "sim": {"simNode": server, "simNodeInterface": "eth1"},
+                    }
+                ],
+            }
+        )
+
+    spec = {
+        "operation": "ReplaceAll",
+        "nodeTemplates": templates,
+        "nodes": nodes,
+        "linkTemplates": [
+            {"name": "isl", "type": "InterSwitch", "labels": {"eda.nokia.com/role": "interSwitch"}},
+            {"name": "edge", "type": "Edge", "labels": {"eda.nokia.com/role": "edge"}},
+        ],
+        "links": links,
+    }
+    if fabric.servers:
+        spec["simulation"] = {
+            "simNodeTemplates": [
+                {"name": "multitool", "type": "Linux", "image": f"{SERVER_IMAGE}:v0.5.0"}
+            ],
+            "simNodes": [
+                {"name": server, "template": "multitool"} for server, _, _ in fabric.servers
+            ],
+        }
+    return {
+        "apiVersion": "topologies.eda.nokia.com/v1",
+        "kind": "NetworkTopology",
+        "metadata": {"generateName": f"{name}-", "namespace": NAMESPACE},
+        "spec": spec,
+    }
+
+
+def allocation_manifests():
+    """Allocation CRs for the pools, as in manifests/0020_allocations.yaml"""
+    pools = [
+        ("nb-systemip-v4", "eda-systemip-v4", "ip-address", None, "IPv4 System IPs for spine and leaf switches"),
+        ("nb-systemip-v6", "eda-systemip-v6", "ip-address", None, "IPv6 System IPs for spine and leaf switches"),
+        ("nb-isl-v4", "eda-isl-v4", "subnet", 31, "IPv4 subnets for inter-switch links"),
+        ("nb-isl-v6", "eda-isl-v6", "subnet", 127, "IPv6 subnets for inter-switch links"),
+        ("nb-mgmt-v4", "eda-mgmt-v4", "ip-in-subnet", 32, "Management IPs for devices"),
+        ("nb-vlans", "eda-vlans", "vlan", None, "VLAN IDs managed via NetBox"),
+        ("nb-asns", "eda-asns", "asn", None, "Private ASNs sourced from NetBox"),
+    ]
+    manifests = []
+    for name, tag, pool_type, subnet_length, description in pools:
+        spec = {"enabled": True, "instance": "netbox", "tags": [tag], "type": pool_type}
+        if subnet_length is not None:
+            spec["subnetLength"] = subnet_length
+        spec["description"] = description
+        manifests.append(
+            {
+                "apiVersion": "netbox.eda.nokia.com/v1alpha1",
+                "kind": "Allocation",
+                "metadata": {"name": name, "namespace": NAMESPACE},
+                "spec": spec,
+            }
+        )
+    return manifests
+
+
+def fabric_manifest(name, super_spines, asn_pool):
+    """Fabric CR, as in manifests/0060_fabric.yaml"""
+    spec = {
+        "leafs": {"leafNodeSelectors": ["eda.nokia.com/role=leaf"]},
+        "spines": {"spineNodeSelectors": ["eda.nokia.com/role=spine"]},
+    }
+    if super_spines:
+        spec["superSpines"] = {"superSpineNodeSelectors": ["eda.nokia.com/role=superspine"]}
+    spec.update(
+        {
+            "interSwitchLinks": {
+                "linkSelectors": ["eda.nokia.com/role=interSwitch"],
+                "poolIPv4": "nb-isl-v4",
+                "poolIPv6": "nb-isl-v6",
+            },
+            "systemPoolIPv4": "nb-systemip-v4",
+            "systemPoolIPv6": "nb-systemip-v6",
+            "underlayProtocol": {"bgp": {"asnPool": asn_pool}, "protocols": ["EBGP"]},
+            "overlayProtocol": {"protocol": "EBGP"},
+        }
+    )
+    return {
+        "apiVersion": "fabrics.eda.nokia.com/v1",
+        "kind": "Fabric",
+        "metadata": {"name": f"{name}-ebgp-fabric", "namespace": NAMESPACE},
+        "spec": spec,
+    }
+
+
+def write_yaml(path, documents):
+    with open(path, "w") as f:
+        yaml.safe_dump_all(documents, f, sort_keys=False, default_flow_style=False, width=120)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Generate a leaf/spine fabric with matching NetBox pools and EDA manifests"
+    )
+    parser.add_argument("--name", default="eda-nb-scale", help="Topology name")
+    parser.add_argument("--pods", type=int, default=1, help="Number of pods (default: 1)")
+    parser.add_argument("--leaves", type=int, default=4, help="Leaves per pod (default: 4)")
+    parser.add_argument("--spines", type=int, default=2, help="Spines per pod (default: 2)")
+    parser.add_argument(
+        "--super-spines",
+        type=int,
+        default=0,
+        help="Super-spines connecting the pods (default: 0)",
+    )
+    parser.add_argument(
+        "--uplinks",
+        type=int,
+        default=1,
+        help="Links between each leaf and each spine (default: 1)",
+    )
+    parser.add_argument(
+        "--servers-per-leaf",
+        type=int,
+        default=0,
+        help="Linux servers attached to each leaf (default: 0)",
+    )
+    parser.add_argument("--leaf-platform", default="7220 IXR-D2L")
+    parser.add_argument("--spine-platform", default="7220 IXR-D3L")
+    parser.add_argument("--superspine-platform", default="7220 IXR-D3L")
+    parser.add_argument(
+        "--leaf-uplink-start",
+        type=int,
+        default=49,
+        help="First leaf port used for spine uplinks (default: 49)",
+    )
+    parser.add_argument(
+        "--headroom",
+        type=float,
+        default=2.0,
+        help="Pool size multiplier over the fabric's needs (default: 2.0)",
+    )
+    parser.add_argument(
+        "--vlans",
+        type=int,
+        default=300,
+        help="Size of the VLAN pool (default: 300)",
+    )
+    parser.add_argument(
+        "--asn-pool",
+        default="nb-asns",
+        help="ASN pool for the Fabric underlay (default: nb-asns, the NetBox-backed pool)",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Output directory (default: fabric-<name>)",
+    )
+    args = parser.parse_args()
+    if args.pods > 1 and not args.super_spines:
+        parser.error("--pods > 1 requires --super-spines")
+    if args.servers_per_leaf >= args.leaf_uplink_start:
+        parser.error("--servers-per-leaf must leave room below --leaf-uplink-start")
+    return args
+
+
+def main():
+    args = parse_args()
+    output = args.output or f"fabric-{args.name}"
+    os.makedirs(output, exist_ok=True)
+
+    fabric = build_fabric(args)
+    for warning in check_ports(fabric):
+        print(f"Warning: {warning}", file=sys.stderr)
+    pools = pool_sizes(fabric, args.headroom, args.vlans)
+
+    write_yaml(os.path.join(output, f"{args.name}.clab.yaml"), [clab_topology(fabric, args.name)])
+    write_yaml(os.path.join(output, "lab-topo.yaml"), [cx_topology(fabric, args.name)])
+    write_yaml(os.path.join(output, "0020_allocations.yaml"), allocation_manifests())
+    write_yaml(
+        os.path.join(output, "0060_fabric.yaml"),
+        [fabric_manifest(args.name, args.super_spines, args.asn_pool)],
+    )
+    with open(os.path.join(output, "pools.json"), "w") as f:
+        json.dump(pools, f, indent=2)
+        f.write("\n")
+
+    print(
+        f"Generated {fabric.switch_count} switches, {fabric.isl_count()} inter-switch links "
+        f"and {len(fabric.servers)} servers in {output}/"
+    )
+    for prefix in pools["prefixes"]:
+        print(f"  {prefix['tags'][0]['name']:<16} {prefix['prefix']}")
+    asn_range = pools["asn_ranges"][0]
+    print(f"  {'eda-asns':<16} {asn_range['start']}-{asn_range['end']}")
+    print(f"  {'eda-vlans':<16} {pools['vlan_groups'][0]['vid_ranges'][0]}")
+
+
+if __name__ == "__main__":
+    main()
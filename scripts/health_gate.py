@@ -0,0 +1,425 @@
+#!/usr/bin/env python
+# /// script
+# dependencies = ["requests"]
+# ///
+"""Probe every component the lab depends on concurrently and return one readiness verdict.
+
+    uv run scripts/health_gate.py [--timeout 600] [--once] [--skip postgres,valkey]
+
+Each probe has its own deadline, so one hung component cannot hold up the
+others, and the verdict lists every component with its latency. `--timeout`
+repeats the gate until all components are healthy; components that are not
+are named after every round instead of only when the timeout expires.
+"""
+
+import argparse
+import concurrent.futures
+import os
+import re
+import subprocess
+import sys
+import time
+import warnings
+from collections import namedtuple
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from urllib3.exceptions import InsecureRequestWarning
+
+from tracing import TracedSession, run, span, traced
+from wait_for import WaitTimeout, poll
+
+
+ProbeResult = namedtuple("ProbeResult", ["component", "healthy", "latency", "detail"])
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def ignore_insecure_warnings(*urls: Optional[str]) -> None:
+    """Filter InsecureRequestWarning for the hosts of `urls` only
+
+    Warnings for other hosts the process talks to are left alone. Call it
+    before the threads making those requests start.
+    """
+    for url in urls:
+        host = urlsplit(url).hostname if url else None
+        if host:
+            warnings.filterwarnings(
+                "ignore",
+                message=f"Unverified HTTPS request is being made to host '{re.escape(host)}'",
+                category=InsecureRequestWarning,
+            )
+
+
+class ProbeFailed(Exception):
+    """Raised by a probe whose component answered but is not healthy."""
+
+
+class HealthReport:
+    """Verdict of one gate run: a ProbeResult per component"""
+
+    def __init__(self, results: List[ProbeResult]):
+        self.results = results
+
+    @property
+    def healthy(self) -> bool:
+        return all(result.healthy for result in self.results)
+
+    @property
+    def failing(self) -> List[ProbeResult]:
+        return [result for result in self.results if not result.healthy]
+
+    def summary(self) -> str:
+        """One line naming the failing components, or "healthy" """
+        if self.healthy:
+            return "healthy"
+        return "; ".join(f"{result.component}: {result.detail}" for result in self.failing)
+
+    def format(self) -> str:
+        lines = []
+        for result in self.results:
+            state = "ok" if result.healthy else "FAIL"
+            lines.append(
+                f"{result.component:<10} {state:<4} {result.latency * 1000:8.1f} ms  {result.detail}"
+            )
+        return "\n".join(lines)
+
+
+class HealthGate:
+    """Concurrent probes of NetBox, its backing services and the EDA paths in front of it"""
+
+    # Seconds each probe may take before its component is reported as stuck
+    DEADLINES = {
+        "api": 5.0,
+        "worker": 5.0,
+        "database": 5.0,
+        "proxy": 10.0,
+        "webhook": 10.0,
+        "postgres": 15.0,
+        "valkey": 15.0,
+    }
+
+    def __init__(
+        self,
+        netbox_url: str,
+        api_token: str,
+        eda_api: Optional[str] = None,
+        netbox_ui_url: Optional[str] = None,
+        namespace: str = "netbox",
+        postgres: str = "statefulset/netbox-server-postgresql",
+        valkey: str = "statefulset/netbox-server-valkey-primary",
+        deadlines: Optional[Dict[str, float]] = None,
+        skip: Optional[List[str]] = None,
+    ):
+        self.netbox_url = netbox_url.rstrip("/")
+        self.netbox_ui_url = (netbox_ui_url or "").rstrip("/") or None
+        self.eda_api = eda_api
+        self.namespace = namespace
+        self.postgres = postgres
+        self.valkey = valkey
+        self.deadlines = dict(self.DEADLINES, **(deadlines or {}))
+        self.session = TracedSession()
+        self.session.headers.update(
+            {"Authorization": f"Token {api_token}", "Accept": "application/json"}
+        )
+        self.session.verify = False
+        # The lab serves self-signed certificates
+        ignore_insecure_warnings(
+            self.netbox_url, self.netbox_ui_url, self.eda_api and f"https://{self.eda_api}"
+        )
+        # One worker per probe, kept across rounds; a probe still stuck
+        # from an earlier round is not started again
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._running: Dict[str, concurrent.futures.Future] = {}
+
+        probes = {
+            "api": self.probe_api,
+            "worker": self.probe_worker,
+            "database": self.probe_database,
+            "proxy": self.probe_proxy,
+            "webhook": self.probe_webhook,
+            "postgres": self.probe_postgres,
+            "valkey": self.probe_valkey,
+        }
+        if not self.netbox_ui_url:
+            probes.pop("proxy")
+        if not self.eda_api:
+            probes.pop("webhook")
+        self.probes: Dict[str, Callable[[float], str]] = {
+            name: probe for name, probe in probes.items() if name not in (skip or [])
+        }
+
+    @classmethod
+    def from_config(
+        cls, api_token: str, directory: str = ".", netbox_url: Optional[str] = None, **kwargs
+    ) -> "HealthGate":
+        """Gate for the lab whose URLs init.sh saved in `directory`"""
+        netbox_url = netbox_url or _read(os.path.join(directory, ".netbox_url"))
+        if not netbox_url:
+            raise FileNotFoundError(f"{os.path.join(directory, '.netbox_url')} not found")
+        return cls(
+            netbox_url,
+            api_token,
+            eda_api=_read(os.path.join(directory, ".eda_api_address")),
+            netbox_ui_url=_read(os.path.join(directory, ".netbox_ui_url")),
+            **kwargs,
+        )
+
+    def _get(self, url: str, deadline: float, **kwargs) -> requests.Response:
+        return self._request("GET", url, deadline, **kwargs)
+
+    def _request(self, method: str, url: str, deadline: float, **kwargs) -> requests.Response:
+        try:
+            return self.session.request(method, url, timeout=deadline, **kwargs)
+        except requests.exceptions.Timeout:
+            raise ProbeFailed(f"no answer from {urlsplit(url).netloc} within {deadline:.0f}s") from None
+        except requests.exceptions.RequestException as exc:
+            raise ProbeFailed(f"cannot reach {urlsplit(url).netloc} ({type(exc).__name__})") from None
+
+    def _status(self, deadline: float) -> Dict:
+        response = self._get(f"{self.netbox_url}/api/status/", deadline)
+        if response.status_code != 200:
+            raise ProbeFailed(f"/api/status/ returned HTTP {response.status_code}")
+        return response.json()
+
+    def probe_api(self, deadline: float) -> str:
+        """NetBox answers /api/status/"""
+        return f"NetBox {self._status(deadline).get('netbox-version', '?')}"
+
+    def probe_worker(self, deadline: float) -> str:
+        """At least one RQ worker (netbox-worker) is consuming the queues"""
+        workers = self._status(deadline).get("rq-workers-running", 0)
+        if not workers:
+            raise ProbeFailed("no RQ workers running")
+        return f"{workers} RQ workers running"
+
+    def probe_database(self, deadline: float) -> str:
+        """A one-row query, i.e. a round trip from NetBox to Postgres"""
+        response = self._get(
+            f"{self.netbox_url}/api/dcim/sites/", deadline, params={"limit": 1, "brief": 1}
+        )
+        if response.status_code != 200:
+            raise ProbeFailed(f"/api/dcim/sites/ returned HTTP {response.status_code}")
+        return f"{response.json().get('count', 0)} sites"
+
+    def probe_proxy(self, deadline: float) -> str:
+        """The netbox-ui HttpProxy (0005_netbox_ui_httpproxy.yaml) reaches NetBox"""
+        response = self._get(f"{self.netbox_ui_url}/api/status/", deadline)
+        if response.status_code != 200:
+            raise ProbeFailed(f"{self.netbox_ui_url}/api/status/ returned HTTP {response.status_code}")
+        return "netbox-ui reaches NetBox"
+
+    def probe_webhook(self, deadline: float) -> str:
+        """The EDA endpoint that NetBox's webhook posts to answers
+
+        The endpoint only takes POSTs, so an OPTIONS request is sent and a
+        405 counts as an answer: anything other than a 404 or a proxy 5xx
+        means the route to the EDA NetBox app exists. The route appears once
+        the NetBox Instance (0010_netbox_instance.yaml) is applied; skip
+        this probe before that.
+        """
+        from configure_netbox import NetBoxConfigurator
+
+        url = NetBoxConfigurator.webhook_payload(self.eda_api)["payload_url"]
+        response = self._request("OPTIONS", url, deadline, headers={"Authorization": None})
+        if response.status_code == 404 or response.status_code >= 500:
+            raise ProbeFailed(f"webhook endpoint returned HTTP {response.status_code}")
+        return f"webhook endpoint answers (HTTP {response.status_code})"
+
+    def _exec(self, workload: str, command: List[str], deadline: float) -> str:
+        cmd = ["kubectl", "-n", self.namespace, "exec", workload, "--"] + command
+        try:
+            result = run(cmd, capture_output=True, text=True, timeout=deadline)
+        except FileNotFoundError:
+            raise ProbeFailed("kubectl not found") from None
+        except subprocess.TimeoutExpired:
+            raise ProbeFailed(f"kubectl exec {workload} timed out") from None
+        output = (result.stdout + result.stderr).strip()
+        if result.returncode != 0:
+            raise ProbeFailed(output.splitlines()[-1] if output else f"exit {result.returncode}")
+        return output
+
+    def probe_postgres(self, deadline: float) -> str:
+        """pg_isready inside the Postgres pod"""
+        output = self._exec(self.postgres, ["pg_isready", "-h", "127.0.0.1"], deadline)
+        return output.splitlines()[-1] if output else "accepting connections"
+
+    def probe_valkey(self, deadline: float) -> str:
+        """PING inside the Valkey pod (which has its password in VALKEY_PASSWORD)"""
+        output = self._exec(
+            self.valkey,
+            ["sh", "-c", 'REDISCLI_AUTH="${VALKEY_PASSWORD:-}" valkey-cli -h 127.0.0.1 ping'],
+            deadline,
+        )
+        if "PONG" not in output:
+            raise ProbeFailed(output or "no reply to PING")
+        return "PONG"
+
+    def _timed(self, name: str, deadline: float) -> ProbeResult:
+        start = time.monotonic()
+        try:
+            detail = self.probes[name](deadline)
+            healthy = True
+        except ProbeFailed as exc:
+            detail, healthy = str(exc), False
+        except Exception as exc:
+            detail, healthy = f"{type(exc).__name__}: {exc}", False
+        return ProbeResult(name, healthy, time.monotonic() - start, detail)
+
+    @traced
+    def check(self, budget: Optional[float] = None) -> HealthReport:
+        """Run every probe concurrently; a probe past its deadline is reported as stuck
+
+        `budget` caps every deadline, so a run never takes longer than it.
+        """
+        deadlines = {
+            name: max(0.1, min(self.deadlines[name], budget or self.deadlines[name]))
+            for name in self.probes
+        }
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=len(self.probes) or 1, thread_name_prefix="probe"
+            )
+        start = time.monotonic()
+        results = {}
+        futures = {}
+        for name in self.probes:
+            previous = self._running.get(name)
+            if previous is not None and not previous.done():
+                results[name] = ProbeResult(name, False, 0.0, "still stuck in an earlier round")
+                continue
+            future = self._executor.submit(self._timed, name, deadlines[name])
+            futures[future] = name
+            self._running[name] = future
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            for future in [f for f in pending if now - start >= deadlines[futures[f]]]:
+                name = futures[future]
+                results[name] = ProbeResult(
+                    name, False, now - start, f"no answer within {deadlines[name]:.0f}s"
+                )
+                pending.discard(future)
+            if not pending:
+                break
+            next_deadline = min(deadlines[futures[f]] for f in pending)
+            done, pending = concurrent.futures.wait(
+                pending,
+                timeout=max(0.0, start + next_deadline - time.monotonic()),
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            for future in done:
+                results[futures[future]] = future.result()
+        # Stuck probes end on their own request or kubectl timeout
+        return HealthReport([results[name] for name in self.probes])
+
+    @traced
+    def wait(self, timeout: float) -> HealthReport:
+        """Repeat check() until every component is healthy; raise WaitTimeout naming the rest"""
+        reports = []
+        deadline = time.monotonic() + timeout
+
+        def all_healthy() -> bool:
+            report = self.check(budget=deadline - time.monotonic())
+            reports.append(report)
+            if not report.healthy:
+                print(f"Not ready: {report.summary()}", flush=True)
+            return report.healthy
+
+        try:
+            poll(all_healthy, timeout, initial_delay=1.0, max_delay=10.0)
+        except WaitTimeout:
+            raise WaitTimeout(
+                f"Timed out after {timeout:.0f}s; still failing: {reports[-1].summary()}"
+            ) from None
+        return reports[-1]
+
+
+def parse_args(
+    argv: Optional[List[str]] = None, prog: Optional[str] = None
+) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Check that NetBox and the components around it are healthy"
+    )
+    parser.add_argument("--netbox-url", default=None, help="NetBox URL (default: .netbox_url)")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=600,
+        help="Repeat the gate until everything is healthy or this many seconds pass",
+    )
+    parser.add_argument("--once", action="store_true", help="Run the gate once and report")
+    parser.add_argument(
+        "--skip",
+        default="",
+        help=f"Comma-separated components not to probe ({', '.join(HealthGate.DEADLINES)})",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Per-probe deadline in seconds for every component (default: per component)",
+    )
+    parser.add_argument("--namespace", default="netbox", help="Namespace of the NetBox release")
+    return parser.parse_args(argv)
+
+
+def main(
+    argv: Optional[List[str]] = None,
+    prog: Optional[str] = None,
+    api_token: Optional[str] = None,
+) -> None:
+    """Run the gate; eda_netbox.py passes its arguments and the API token."""
+    args = parse_args(argv, prog)
+    api_token = api_token or os.environ.get("NETBOX_API_TOKEN")
+    if not api_token:
+        from configure_netbox import get_api_token
+
+        api_token = get_api_token()
+
+    skip = [name.strip() for name in args.skip.split(",") if name.strip()]
+    unknown = sorted(set(skip) - set(HealthGate.DEADLINES))
+    if unknown:
+        print(f"Error: unknown components: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(2)
+    deadlines = None
+    if args.deadline is not None:
+        deadlines = {name: args.deadline for name in HealthGate.DEADLINES}
+
+    try:
+        gate = HealthGate.from_config(
+            api_token,
+            netbox_url=args.netbox_url,
+            namespace=args.namespace,
+            deadlines=deadlines,
+            skip=skip,
+        )
+    except FileNotFoundError as exc:
+        print(f"Error: {exc}. Run init.sh first.", file=sys.stderr)
+        sys.exit(1)
+    start = time.monotonic()
+    with span("health_gate", netbox_url=gate.netbox_url, components=",".join(gate.probes)) as s:
+        try:
+            report = gate.check() if args.once else gate.wait(args.timeout)
+        except WaitTimeout as exc:
+            s.fail(str(exc))
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        for result in report.results:
+            s.set(f"latency_ms.{result.component}", round(result.latency * 1000, 1))
+    print(report.format())
+    if not report.healthy:
+        print(f"Not healthy: {report.summary()}", file=sys.stderr)
+        sys.exit(1)
+    print(f"All {len(report.results)} components healthy (gate took {time.monotonic() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
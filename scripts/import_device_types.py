@@ -7,17 +7,16 @@
 """Import NetBox device types from the community library using the official importer."""
 
 import argparse
-import subprocess
 import sys
 import time
 import textwrap
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import requests
-from urllib3.exceptions import InsecureRequestWarning
 
-requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
+from health_gate import ignore_insecure_warnings
+from tracing import TracedSession, run, span, traced
 
 
 DEFAULT_LIBRARY_URL = "https://github.com/netbox-community/devicetype-library.git"
@@ -33,11 +32,15 @@ def read_netbox_url() -> str:
     return path.read_text().strip()
 
 
-def wait_for_netbox(url: str, retries: int = 30, delay: int = 5) -> None:
+@traced
+def wait_for_netbox(
+    url: str, retries: int = 30, delay: int = 5, session: Optional[requests.Session] = None
+) -> None:
     """Poll the NetBox API root until it responds with HTTP 200."""
+    session = session or TracedSession()
     for attempt in range(1, retries + 1):
         try:
-            response = requests.get(f"{url.rstrip('/')}/api/", timeout=10, verify=False)
+            response = session.get(f"{url.rstrip('/')}/api/", timeout=10, verify=False)
             if response.status_code == 200:
                 return
         except requests.RequestException:
@@ -48,8 +51,11 @@ def wait_for_netbox(url: str, retries: int = 30, delay: int = 5) -> None:
     )
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(
+    argv: Optional[List[str]] = None, prog: Optional[str] = None
+) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
+        prog=prog,
         description="Import device types from the NetBox Device Type Library",
     )
     parser.add_argument(
@@ -85,7 +91,7 @@ def parse_args() -> argparse.Namespace:
         default="kifeo/netbox-device-type-library-import:latest",
         help="Container image to use for the Kubernetes job",
     )
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def render_job_manifest(
@@ -160,6 +166,7 @@ def render_job_manifest(
     return "\n".join(lines)
 
 
+@traced
 def run_importer_job(
     namespace: str,
     netbox_url: str,
@@ -180,7 +187,7 @@ def run_importer_job(
         library_branch,
     )
 
-    apply = subprocess.run(
+    apply = run(
         ["kubectl", "apply", "-f", "-"],
         input=manifest,
         text=True,
@@ -202,9 +209,9 @@ def run_importer_job(
             namespace,
             f"--timeout={timeout_seconds}s",
         ]
-        wait = subprocess.run(wait_cmd, capture_output=True, text=True, check=False)
+        wait = run(wait_cmd, capture_output=True, text=True, check=False)
         if wait.returncode != 0:
-            describe = subprocess.run(
+            describe = run(
                 ["kubectl", "describe", f"job/{job_name}", "-n", namespace],
                 text=True,
                 capture_output=True,
@@ -215,7 +222,7 @@ def run_importer_job(
                 + ("\n\nJob description:\n" + describe.stdout if describe.stdout else "")
             )
     finally:
-        logs = subprocess.run(
+        logs = run(
             ["kubectl", "logs", f"job/{job_name}", "-n", namespace],
             text=True,
             capture_output=True,
@@ -227,23 +234,32 @@ def run_importer_job(
 
 
 
-def main() -> None:
-    args = parse_args()
+def main(
+    argv: Optional[List[str]] = None,
+    prog: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+) -> None:
+    """Run the import; eda_netbox.py passes its arguments and a shared session."""
+    args = parse_args(argv, prog)
     vendors = [v.strip() for v in args.vendors.split(",") if v.strip()]
     if not vendors:
         raise ValueError("At least one vendor must be specified for import.")
 
     netbox_url = read_netbox_url()
-    wait_for_netbox(netbox_url)
-
-    run_importer_job(
-        namespace=args.k8s_namespace,
-        netbox_url=args.cluster_netbox_url or netbox_url,
-        vendors=vendors,
-        image=args.importer_image,
-        library_url=args.library_url,
-        library_branch=args.library_branch,
-    )
+    # wait_for_netbox() skips certificate checks; only its host is quieted,
+    # since eda_netbox.py serve runs other commands in the same process
+    ignore_insecure_warnings(netbox_url)
+    with span("import_device_types", vendors=",".join(vendors)):
+        wait_for_netbox(netbox_url, session=session)
+
+        run_importer_job(
+            namespace=args.k8s_namespace,
+            netbox_url=args.cluster_netbox_url or netbox_url,
+            vendors=vendors,
+            image=args.importer_image,
+            library_url=args.library_url,
+            library_branch=args.library_branch,
+        )
 
 
 if __name__ == "__main__":
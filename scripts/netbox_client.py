@@ -0,0 +1,769 @@
+"""
+NetBox API client shared by configure_netbox.py and cleanup_netbox.py
+
+NetBoxSession is a requests session with an adaptive (AIMD) concurrency
+limiter in front of every request, so parallel and bulk work cannot
+overload the single netbox-server deployment and its Postgres instance.
+Its iter_results() streams large list responses into compact records, and
+an optional ResponseCache memoizes repeated GETs within a run.
+
+AsyncNetBoxSession is the asyncio counterpart on httpx (HTTP/2 where the
+server offers it). AsyncFanout runs it on its own event loop, so the
+blocking configurator and cleaner can hand their fan-out work to it.
+"""
+
+import asyncio
+import codecs
+import collections
+import email.utils
+import functools
+import json
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from tracing import TracedSession, get_tracer
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit driven by latency and throttling signals.
+
+    The limit grows by roughly one slot per window of successful requests
+    while p95 latency stays within `latency_tolerance` of the best p95 seen,
+    and is cut multiplicatively on 429/503 responses, timeouts or a rising
+    p95. A Retry-After pause blocks all new requests until it expires.
+    """
+
+    def __init__(
+        self,
+        initial=4,
+        minimum=1,
+        maximum=16,
+        window=50,
+        latency_tolerance=2.0,
+        backoff=0.5,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.latencies = collections.deque(maxlen=window)
+        self.baseline_p95 = None
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.throttle_events = 0
+        self.latency_backoffs = 0
+        self.peak_limit = self.limit
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, latency=None, throttled=False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttle_events += 1
+                self._decrease()
+            elif latency is not None:
+                self._observe(latency)
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """Hold back every new request for `seconds` (Retry-After)"""
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def p95(self):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _observe(self, latency):
+        self.latencies.append(latency)
+        if len(self.latencies) < min(10, self.latencies.maxlen):
+            self._increase()
+            return
+        p95 = self.p95()
+        if self.baseline_p95 is None or p95 < self.baseline_p95:
+            self.baseline_p95 = p95
+        if p95 > self.baseline_p95 * self.latency_tolerance:
+            self.latency_backoffs += 1
+            self._decrease()
+            # Start a fresh window so one slow burst only backs off once
+            self.latencies.clear()
+        else:
+            self._increase()
+
+    def _increase(self):
+        self.limit = min(self.maximum, self.limit + 1.0 / max(self.limit, 1.0))
+        self.peak_limit = max(self.peak_limit, self.limit)
+
+    def _decrease(self):
+        self.limit = max(self.minimum, self.limit * self.backoff)
+
+    def snapshot(self):
+        with self._cond:
+            p95 = self.p95()
+            return {
+                "limit": int(self.limit),
+                "peak_limit": int(self.peak_limit),
+                "throttle_events": self.throttle_events,
+                "latency_backoffs": self.latency_backoffs,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            }
+
+
+class AsyncAdaptiveLimiter(AdaptiveLimiter):
+    """AdaptiveLimiter whose acquire() is awaited instead of blocking
+
+    Meant for a single event loop: waiters sleep on an asyncio.Event that
+    every release sets, or until a Retry-After pause expires.
+    """
+
+    def __init__(self, initial=8, minimum=1, maximum=64, **kwargs):
+        super().__init__(initial=initial, minimum=minimum, maximum=maximum, **kwargs)
+        self._changed = None
+
+    async def acquire(self):
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        while True:
+            wait = self.paused_until - time.monotonic()
+            if wait <= 0 and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=wait if wait > 0 else None)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, latency=None, throttled=False):
+        super().release(latency, throttled)
+        if self._changed is not None:
+            self._changed.set()
+
+
+def parse_retry_after(value):
+    """Return the Retry-After delay in seconds, or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+_RESULTS_KEY = re.compile(r'"results"\s*:\s*\[')
+_SEPARATORS = " \t\r\n,"
+
+
+class ResultsParser:
+    """Incremental parser for the top-level "results" array of a JSON document
+
+    feed() takes the next chunk of bytes and returns the items completed by
+    it, so only the item being parsed and one network chunk are held in
+    memory. Top-level keys that precede "results" (count, next and previous
+    in NetBox list responses) are stored into `page` when a dict is given.
+    """
+
+    def __init__(self, page=None):
+        self.page = page
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._in_results = False
+        self.done = False
+
+    def feed(self, chunk, final=False):
+        if self.done:
+            return []
+        self._buffer += self._decode(chunk or b"", final=final)
+
+        if not self._in_results:
+            match = _RESULTS_KEY.search(self._buffer)
+            if not match:
+                if final:
+                    raise ValueError("Response has no results array")
+                return []
+            if self.page is not None:
+                head = self._buffer[: match.start()].rstrip().rstrip(",")
+                self.page.update(json.loads(head + "}") if head.strip() != "{" else {})
+            self._buffer = self._buffer[match.end():]
+            self._in_results = True
+
+        items = []
+        buffer = self._buffer
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in _SEPARATORS:
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                self.done = True
+                self._buffer = ""
+                return items
+            try:
+                item, pos = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Incomplete item: wait for the next chunk
+                break
+            items.append(item)
+        self._buffer = buffer[pos:]
+        if final:
+            raise ValueError("Truncated results array")
+        return items
+
+
+def iter_json_results(chunks, page=None):
+    """Yield the items of the top-level "results" array from JSON byte chunks
+
+    See ResultsParser; items are yielded as soon as they are complete.
+    """
+    parser = ResultsParser(page)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
+    yield from parser.feed(b"", final=True)
+
+
+@functools.lru_cache(maxsize=None)
+def record_type(fields):
+    """A namedtuple type for projected fields; "tenant.id" becomes tenant_id"""
+    names = [field.replace(".", "_") for field in fields]
+    return collections.namedtuple("Record", names)
+
+
+def _project(item, paths):
+    values = []
+    for path in paths:
+        value = item
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        values.append(value)
+    return values
+
+
+class ResponseCache:
+    """Per-run memo of successful GET responses, keyed by the full URL
+
+    Concurrent identical GETs are coalesced: the first caller fetches while
+    the others wait for its response (threads with fetch(), coroutines with
+    fetch_async()). A POST, PATCH, PUT or DELETE drops the
+    cached entries of its endpoint (e.g. ipam/asn-ranges) and of the change
+    log, which every write appends to.
+    """
+
+    ALWAYS_INVALIDATED = ("core/object-changes",)
+
+    def __init__(self):
+        self.entries = {}
+        self.in_flight = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint(url):
+        """"ipam/asn-ranges" for .../api/ipam/asn-ranges/12/?slug=x"""
+        parts = [part for part in urlsplit(url).path.split("/") if part]
+        if "api" in parts:
+            parts = parts[parts.index("api") + 1:]
+        return "/".join(parts[:2])
+
+    def fetch(self, key, send):
+        """Return the cached response for `key`, or send() it exactly once"""
+        with self._lock:
+            if key in self.entries:
+                self.hits += 1
+                return self.entries[key]
+            waiter = self.in_flight.get(key)
+            if waiter is None:
+                # [done, response, invalidated while in flight]
+                waiter = self.in_flight[key] = [threading.Event(), None, False]
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.coalesced += 1
+        if not owner:
+            waiter[0].wait()
+            if waiter[1] is not None:
+                return waiter[1]
+            # The leader failed or got an uncacheable answer; ask ourselves
+            return send()
+
+        response = None
+        try:
+            response = send()
+            return response
+        finally:
+            self._settle(key, waiter, response)
+            waiter[0].set()
+
+    async def fetch_async(self, key, send):
+        """fetch() for coroutines; send is an async callable"""
+        with self._lock:
+            if key in self.entries:
+                self.hits += 1
+                return self.entries[key]
+            waiter = self.in_flight.get(key)
+            if waiter is None:
+                future = asyncio.get_running_loop().create_future()
+                waiter = self.in_flight[key] = [future, None, False]
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.coalesced += 1
+        if not owner:
+            # shield: a cancelled waiter must not cancel the shared future
+            await asyncio.shield(waiter[0])
+            if waiter[1] is not None:
+                return waiter[1]
+            return await send()
+
+        response = None
+        try:
+            response = await send()
+            return response
+        finally:
+            self._settle(key, waiter, response)
+            waiter[0].set_result(None)
+
+    def _settle(self, key, waiter, response):
+        with self._lock:
+            del self.in_flight[key]
+            if response is not None and response.status_code == 200:
+                waiter[1] = response
+                # Do not keep an answer that a concurrent write made stale
+                if not waiter[2]:
+                    self.entries[key] = response
+
+    def invalidate(self, url):
+        stale = (self.endpoint(url),) + self.ALWAYS_INVALIDATED
+        with self._lock:
+            for key in [key for key in self.entries if key[1] in stale]:
+                del self.entries[key]
+            for key, waiter in self.in_flight.items():
+                if key[1] in stale:
+                    waiter[2] = True
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            for waiter in self.in_flight.values():
+                waiter[2] = True
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.coalesced + self.misses
+            saved = self.hits + self.coalesced
+            return {
+                "cache_hits": self.hits,
+                "cache_coalesced": self.coalesced,
+                "cache_hit_rate": round(saved / lookups, 2) if lookups else None,
+            }
+
+
+class NetBoxSession(TracedSession):
+    """Authenticated NetBox session with adaptive rate control and retries"""
+
+    RETRY_STATUSES = (429, 503)
+    MAX_PAUSE = 120.0
+
+    def __init__(
+        self,
+        api_token,
+        pool_size=None,
+        timeout=30,
+        max_retries=5,
+        limiter=None,
+        cache=False,
+        verify=True,
+    ):
+        super().__init__()
+        self.limiter = limiter or AdaptiveLimiter()
+        self.cache = ResponseCache() if cache else None
+        self.verify = verify
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.request_count = 0
+        self.retry_count = 0
+        # Successful POST/PATCH/PUT/DELETE requests, i.e. changes made to NetBox
+        self.write_count = 0
+        self._stats_lock = threading.Lock()
+        self.headers.update(
+            {
+                "Authorization": f"Token {api_token}",
+                "Content-Type": "application/json",
+            }
+        )
+        # Dedicated connection pool per NetBox target, large enough for the
+        # highest concurrency the limiter may allow
+        pool_size = pool_size or self.limiter.maximum
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        if self.cache is None or kwargs.get("stream"):
+            return self._send(method, url, *args, **kwargs)
+        if method.upper() != "GET":
+            try:
+                return self._send(method, url, *args, **kwargs)
+            finally:
+                self.cache.invalidate(url)
+        full_url = requests.models.PreparedRequest()
+        full_url.prepare_url(url, kwargs.get("params"))
+        key = (full_url.url, ResponseCache.endpoint(url))
+        return self.cache.fetch(key, lambda: self._send(method, url, *args, **kwargs))
+
+    def clear_cache(self):
+        """Forget memoized GETs, e.g. when NetBox may have changed under us"""
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _send(self, method, url, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        retryable = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            attempt += 1
+            self.limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except requests.exceptions.Timeout:
+                # A timeout is an overload signal: back off and replay if safe
+                self.limiter.release(throttled=True)
+                self._count(retry=False)
+                if not retryable or attempt > self.max_retries:
+                    raise
+                self._count(retry=True)
+                time.sleep(min(30.0, 0.5 * 2 ** (attempt - 1)))
+                continue
+            except Exception:
+                self.limiter.release()
+                self._count(retry=False)
+                raise
+
+            self._count(retry=False)
+            if response.status_code not in self.RETRY_STATUSES:
+                self.limiter.release(latency=time.monotonic() - start)
+                if method.upper() != "GET" and response.status_code < 400:
+                    self._count(retry=False, write=True)
+                return response
+
+            self.limiter.release(throttled=True)
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = 0.5 * 2 ** (attempt - 1)
+            self.limiter.pause(min(delay, self.MAX_PAUSE))
+            # 429 means the request was rejected before processing; a 503 may
+            # not have been, so only idempotent requests are replayed
+            if attempt > self.max_retries or (response.status_code != 429 and not retryable):
+                return response
+            self._count(retry=True)
+
+    def iter_results(self, url, params=None, fields=("id",), page_size=1000):
+        """Stream every object of a list endpoint as compact records
+
+        Only `fields` are requested from NetBox and kept; each result is
+        reduced to a namedtuple (see record_type) as soon as it is parsed, so
+        memory stays flat however large the pages are. Dotted fields such as
+        "tenant.id" select nested values. Raises requests.HTTPError on a
+        non-200 page.
+        """
+        fields = tuple(fields)
+        record = record_type(fields)
+        paths = [tuple(field.split(".")) for field in fields]
+        top_level = sorted({path[0] for path in paths})
+        offset = 0
+        while True:
+            page_params = dict(
+                params or {}, limit=page_size, offset=offset, fields=",".join(top_level)
+            )
+            page = {}
+            count = 0
+            with self.get(url, params=page_params, stream=True) as response:
+                response.raise_for_status()
+                for item in iter_json_results(response.iter_content(65536), page):
+                    count += 1
+                    yield record._make(_project(item, paths))
+            offset += count
+            if count < page_size or not page.get("next"):
+                return
+
+    def _count(self, retry, write=False):
+        with self._stats_lock:
+            if write:
+                self.write_count += 1
+            elif retry:
+                self.retry_count += 1
+            else:
+                self.request_count += 1
+
+    def metrics(self):
+        """Request and rate-control counters for the run summary"""
+        metrics = {"requests": self.request_count, "retries": self.retry_count}
+        metrics.update(self.limiter.snapshot())
+        if self.cache is not None:
+            metrics.update(self.cache.snapshot())
+        return metrics
+
+
+def format_metrics(metrics):
+    return ", ".join(f"{key}={value}" for key, value in metrics.items())
+
+
+class AsyncNetBoxSession:
+    """asyncio NetBox session on httpx with the same rate control and retries
+
+    Over TLS (e.g. the EDA httpproxy URL) HTTP/2 is negotiated, and the
+    concurrent requests are multiplexed as streams over a few connections.
+    Plain-HTTP targets (the LoadBalancer URL) use HTTP/1.1 keep-alive with
+    one connection per in-flight request. Transport failures are raised as
+    the requests exceptions NetBoxSession raises, so callers handle both
+    sessions alike. `cache` is True for a new ResponseCache or the cache of
+    a NetBoxSession to share, so a write through either session drops the
+    stale entries of both. httpx is only needed once this class is used.
+    """
+
+    RETRY_STATUSES = NetBoxSession.RETRY_STATUSES
+    MAX_PAUSE = NetBoxSession.MAX_PAUSE
+
+    def __init__(
+        self, api_token, timeout=30, max_retries=5, limiter=None, cache=False, http2=True, verify=True
+    ):
+        import httpx
+
+        self._httpx = httpx
+        self.limiter = limiter or AsyncAdaptiveLimiter()
+        self.cache = cache if isinstance(cache, ResponseCache) else ResponseCache() if cache else None
+        self.max_retries = max_retries
+        self.request_count = 0
+        self.retry_count = 0
+        # Successful POST/PATCH/PUT/DELETE requests, as on NetBoxSession
+        self.write_count = 0
+        self.http_versions = collections.Counter()
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            verify=verify,
+            timeout=timeout,
+            headers={
+                "Authorization": f"Token {api_token}",
+                "Content-Type": "application/json",
+            },
+            limits=httpx.Limits(
+                max_connections=self.limiter.maximum,
+                max_keepalive_connections=self.limiter.maximum,
+            ),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def patch(self, url, **kwargs):
+        return await self.request("PATCH", url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request("DELETE", url, **kwargs)
+
+    async def request(self, method, url, **kwargs):
+        method = method.upper()
+        if self.cache is None:
+            return await self._send(method, url, **kwargs)
+        if method != "GET":
+            try:
+                return await self._send(method, url, **kwargs)
+            finally:
+                self.cache.invalidate(url)
+        full_url = requests.models.PreparedRequest()
+        full_url.prepare_url(url, kwargs.get("params"))
+        key = (full_url.url, ResponseCache.endpoint(url))
+        return await self.cache.fetch_async(key, lambda: self._send(method, url, **kwargs))
+
+    async def _send(self, method, url, stream=False, **kwargs):
+        """Send with limiter, retries and tracing; a stream=True response must be closed"""
+        httpx = self._httpx
+        retryable = method in IDEMPOTENT_METHODS
+        # httpx spells a JSON body as json= for every method, but a body on
+        # DELETE needs the generic request builder
+        request = self.client.build_request(method, url, **kwargs)
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = await self._traced_send(request, stream)
+            except httpx.TimeoutException as exc:
+                self.limiter.release(throttled=True)
+                self.request_count += 1
+                if not retryable or attempt > self.max_retries:
+                    raise requests.exceptions.Timeout(str(exc)) from exc
+                self.retry_count += 1
+                await asyncio.sleep(min(30.0, 0.5 * 2 ** (attempt - 1)))
+                continue
+            except httpx.TransportError as exc:
+                self.limiter.release()
+                self.request_count += 1
+                raise requests.exceptions.ConnectionError(str(exc)) from exc
+            except BaseException:
+                self.limiter.release()
+                self.request_count += 1
+                raise
+
+            self.request_count += 1
+            self.http_versions[response.http_version] += 1
+            if response.status_code not in self.RETRY_STATUSES:
+                self.limiter.release(latency=time.monotonic() - start)
+                if method != "GET" and response.status_code < 400:
+                    self.write_count += 1
+                return response
+
+            self.limiter.release(throttled=True)
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = 0.5 * 2 ** (attempt - 1)
+            self.limiter.pause(min(delay, self.MAX_PAUSE))
+            if attempt > self.max_retries or (response.status_code != 429 and not retryable):
+                return response
+            await response.aclose()
+            self.retry_count += 1
+
+    async def _traced_send(self, request, stream):
+        tracer = get_tracer()
+        if not tracer.enabled:
+            return await self.client.send(request, stream=stream)
+        with tracer.span(
+            f"HTTP {request.method}",
+            "http",
+            {
+                "http.method": request.method,
+                "http.path": request.url.path,
+                "http.host": request.url.netloc.decode(),
+            },
+        ) as s:
+            response = await self.client.send(request, stream=stream)
+            s.set("http.status_code", response.status_code)
+            s.set("http.version", response.http_version)
+            if response.status_code >= 400:
+                s.fail(f"HTTP {response.status_code}")
+            return response
+
+    async def iter_results(self, url, params=None, fields=("id",), page_size=1000):
+        """Async counterpart of NetBoxSession.iter_results"""
+        fields = tuple(fields)
+        record = record_type(fields)
+        paths = [tuple(field.split(".")) for field in fields]
+        top_level = sorted({path[0] for path in paths})
+        offset = 0
+        while True:
+            page_params = dict(
+                params or {}, limit=page_size, offset=offset, fields=",".join(top_level)
+            )
+            page = {}
+            count = 0
+            response = await self._send("GET", url, params=page_params, stream=True)
+            try:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise requests.HTTPError(
+                        f"{response.status_code} for url: {response.url}", response=response
+                    )
+                parser = ResultsParser(page)
+                async for chunk in response.aiter_bytes(65536):
+                    for item in parser.feed(chunk):
+                        count += 1
+                        yield record._make(_project(item, paths))
+                for item in parser.feed(b"", final=True):
+                    count += 1
+                    yield record._make(_project(item, paths))
+            finally:
+                await response.aclose()
+            offset += count
+            if count < page_size or not page.get("next"):
+                return
+
+    def metrics(self):
+        metrics = {"requests": self.request_count, "retries": self.retry_count}
+        metrics.update(self.limiter.snapshot())
+        if self.cache is not None:
+            metrics.update(self.cache.snapshot())
+        metrics["http_versions"] = "/".join(
+            f"{version}:{count}" for version, count in sorted(self.http_versions.items())
+        )
+        return metrics
+
+
+class AsyncFanout:
+    """An AsyncNetBoxSession and the event loop it runs on, for blocking callers
+
+    The configurator and cleaner stay blocking. Where they fan out over many
+    independent objects (per-object lookups and writes, bulk delete chunks,
+    GC queries) and were given a fanout, they hand that part to their
+    *_async variant through run(), which shares a few multiplexed
+    connections instead of one thread and connection per request. Async
+    callers can await the *_async variants directly.
+
+    `netbox_url` may differ from the blocking session's URL, e.g. the HTTPS
+    EDA httpproxy URL, since HTTP/2 is only negotiated over TLS.
+    """
+
+    def __init__(self, api_token, netbox_url, verify=True, cache=False):
+        self.netbox_url = netbox_url.rstrip("/")
+        self.loop = asyncio.new_event_loop()
+        self.session = AsyncNetBoxSession(api_token, cache=cache, verify=verify)
+
+    def run(self, coro):
+        """Run a coroutine of the fanned-out work to completion"""
+        return self.loop.run_until_complete(coro)
+
+    def close(self):
+        self.run(self.session.aclose())
+        self.loop.close()
+
+
+def fanout_url(netbox_url, netbox_ui_url=None):
+    """The URL an AsyncFanout should use for the lab
+
+    The EDA httpproxy URL when it is HTTPS (its route passes the NetBox
+    token through), so the fan-out gets HTTP/2; otherwise the NetBox URL.
+    """
+    if netbox_ui_url and netbox_ui_url.startswith("https://"):
+        return netbox_ui_url
+    return netbox_url
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# /// script
+# dependencies = ["requests"]
+# ///
+"""
+Local stand-in for the NetBox IPAM allocation endpoints
+
+Serves just enough of the NetBox REST API for bench_allocations.py to run
+without a cluster: prefix lookup by tag, `available-ips` and
+`available-prefixes` claims, and single or bulk deletes of the claimed IP
+addresses and prefixes. Claims against one parent prefix are serialized
+with a per-prefix lock held for `--latency` seconds, mimicking the advisory
+lock NetBox takes on the parent while it finds and writes the next free
+block.
+
+The prefixes from NetBoxConfigurator.PREFIXES are seeded at start-up
+(or those from a `--pools` file written by generate_fabric.py).
+
+    uv run scripts/netbox_standin.py --port 8000
+"""
+
+import argparse
+import bisect
+import ipaddress
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from configure_netbox import NetBoxConfigurator
+
+
+class InsufficientSpace(Exception):
+    pass
+
+
+class Pool:
+    """A parent prefix and its allocated children as sorted integer ranges"""
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.network = ipaddress.ip_network(obj["prefix"])
+        self.lock = threading.Lock()
+        # Sorted (first, last) address ranges of allocated children
+        self.ranges = []
+        # Per block size, an address below which no free block exists; keeps
+        # first-fit from rescanning the allocated head of the pool
+        self.hints = {}
+
+    def _find(self, size, first, last):
+        """First-fit search for a free block of `size` aligned addresses"""
+        cursor = max(first, self.hints.get(size, first))
+        index = bisect.bisect_left(self.ranges, (cursor, cursor))
+        if index and self.ranges[index - 1][1] >= cursor:
+            cursor = self.ranges[index - 1][1] + 1
+        for start, end in itertools.islice(self.ranges, index, None):
+            candidate = -(-cursor // size) * size
+            if candidate + size - 1 < start:
+                break
+            cursor = max(cursor, end + 1)
+        candidate = -(-cursor // size) * size
+        if candidate + size - 1 > last:
+            raise InsufficientSpace()
+        self.hints[size] = candidate + size
+        return candidate
+
+    def claim_prefix(self, prefix_length):
+        if prefix_length < self.network.prefixlen or prefix_length > self.network.max_prefixlen:
+            raise ValueError(f"Invalid prefix length {prefix_length}")
+        size = 2 ** (self.network.max_prefixlen - prefix_length)
+        first = int(self.network.network_address)
+        start = self._find(size, first, first + self.network.num_addresses - 1)
+        bisect.insort(self.ranges, (start, start + size - 1))
+        network = ipaddress.ip_network((start, prefix_length))
+        return start, start + size - 1, str(network)
+
+    def claim_ip(self):
+        first = int(self.network.network_address)
+        last = first + self.network.num_addresses - 1
+        # Like NetBox, skip the network and broadcast addresses of IPv4
+        # prefixes that are not point-to-point
+        if self.network.version == 4 and self.network.prefixlen < 31:
+            first, last = first + 1, last - 1
+        start = self._find(1, first, last)
+        bisect.insort(self.ranges, (start, start))
+        address = ipaddress.ip_address(start)
+        return start, start, f"{address}/{self.network.prefixlen}"
+
+    def release(self, start, end):
+        index = bisect.bisect_left(self.ranges, (start, end))
+        if index < len(self.ranges) and self.ranges[index] == (start, end):
+            del self.ranges[index]
+            for size, hint in self.hints.items():
+                self.hints[size] = min(hint, start)
+
+
+class StandInNetBox:
+    """In-memory state behind the stand-in HTTP handler"""
+
+    def __init__(self, prefixes, latency=0.0):
+        self.latency = latency
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.pools = {}
+        # id -> (endpoint, pool id, first, last, object)
+        self.children = {}
+        for prefix in prefixes:
+            obj = dict(prefix, id=next(self._ids))
+            self.pools[obj["id"]] = Pool(obj)
+
+    def list_prefixes(self, params):
+        tags = params.get("tag", [])
+        prefixes = params.get("prefix", [])
+        results = []
+        for pool in self.pools.values():
+            slugs = {tag.get("slug", tag.get("name")) for tag in pool.obj.get("tags", [])}
+            if tags and not slugs.intersection(tags):
+                continue
+            if prefixes and pool.obj["prefix"] not in prefixes:
+                continue
+            results.append(pool.obj)
+        return results
+
+    def claim(self, pool_id, kind, body):
+        pool = self.pools.get(pool_id)
+        if pool is None:
+            return 404, {"detail": "Not found."}
+        with pool.lock:
+            if self.latency:
+                time.sleep(self.latency)
+            try:
+                if kind == "available-prefixes":
+                    first, last, value = pool.claim_prefix(int(body.get("prefix_length", 0)))
+                    endpoint, field = "ipam/prefixes", "prefix"
+                else:
+                    first, last, value = pool.claim_ip()
+                    endpoint, field = "ipam/ip-addresses", "address"
+            except InsufficientSpace:
+                return 409, {
+                    "detail": "Insufficient space is available to accommodate the requested allocation"
+                }
+            except ValueError as exc:
+                return 400, {"prefix_length": [str(exc)]}
+        obj = {"id": next(self._ids), field: value, "status": body.get("status", "active")}
+        with self._lock:
+            self.children[obj["id"]] = (endpoint, pool_id, first, last, obj)
+        return 201, obj
+
+    def delete(self, endpoint, ids):
+        with self._lock:
+            if any(self.children.get(i, (None,))[0] != endpoint for i in ids):
+                return 404, {"detail": "Not found."}
+            removed = [self.children.pop(i) for i in ids]
+        for _, pool_id, first, last, _ in removed:
+            pool = self.pools[pool_id]
+            with pool.lock:
+                pool.release(first, last)
+        return 204, None
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    netbox = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None):
+        data = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path in ("/api/", "/api/status/"):
+            return self._send(200, {"netbox-version": "stand-in"})
+        if url.path == "/api/ipam/prefixes/":
+            results = self.netbox.list_prefixes(parse_qs(url.query))
+            return self._send(
+                200, {"count": len(results), "next": None, "previous": None, "results": results}
+            )
+        self._send(404, {"detail": "Not found."})
+
+    def do_POST(self):
+        body = self._body() or {}
+        match = re.match(r"^/api/ipam/prefixes/(\d+)/(available-prefixes|available-ips)/$", self.path)
+        if not match:
+            return self._send(404, {"detail": "Not found."})
+        self._send(*self.netbox.claim(int(match.group(1)), match.group(2), body))
+
+    def do_DELETE(self):
+        body = self._body()
+        url = urlsplit(self.path).path
+        match = re.match(r"^/api/(ipam/(?:prefixes|ip-addresses))/(?:(\d+)/)?$", url)
+        if not match:
+            return self._send(404, {"detail": "Not found."})
+        if match.group(2):
+            ids = [int(match.group(2))]
+        else:
+            ids = [item["id"] for item in body or []]
+        self._send(*self.netbox.delete(match.group(1), ids))
+
+
+def load_prefixes(pools_path=None):
+    if pools_path:
+        with open(pools_path, "r") as f:
+            return json.load(f)["prefixes"]
+    return NetBoxConfigurator.PREFIXES
+
+
+def start(prefixes, latency=0.0, host="127.0.0.1", port=0):
+    """Serve a stand-in NetBox in a background thread; return (server, url)"""
+    handler = type("StandInHandler", (Handler,), {"netbox": StandInNetBox(prefixes, latency)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for NetBox IPAM allocations")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.005,
+        help="Seconds each claim holds its parent prefix lock (default: 0.005)",
+    )
+    parser.add_argument("--pools", default=None, help="pools.json from generate_fabric.py")
+    args = parser.parse_args()
+
+    server, url = start(load_prefixes(args.pools), args.latency, args.host, args.port)
+    print(f"NetBox stand-in listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
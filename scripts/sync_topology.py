@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+# /// script
+# dependencies = ["requests", "pyyaml"]
+# ///
+"""
+Sync a containerlab or CX topology file into NetBox DCIM
+
+Nodes are mapped to the imported Nokia device types and created as devices
+in the EDA site; interfaces missing from the device type templates and the
+cables between them are created as well. Existing objects are diffed page
+by page and all writes go through the bulk endpoints, so large topologies
+take a handful of requests per object type.
+"""
+
+import argparse
+import sys
+
+import requests
+import yaml
+
+from configure_netbox import get_api_token
+from netbox_client import NetBoxSession, format_metrics
+from tracing import span, traced
+
+try:
+    YamlLoader = yaml.CSafeLoader
+except AttributeError:
+    YamlLoader = yaml.SafeLoader
+
+# containerlab SR Linux types to NetBox device type models
+CLAB_SRL_TYPES = {
+    "ixrd1": "7220 IXR-D1",
+    "ixrd2": "7220 IXR-D2",
+    "ixrd2l": "7220 IXR-D2L",
+    "ixrd3": "7220 IXR-D3",
+    "ixrd3l": "7220 IXR-D3L",
+    "ixrd4": "7220 IXR-D4",
+    "ixrd5": "7220 IXR-D5",
+    "ixrh2": "7220 IXR-H2",
+    "ixrh3": "7220 IXR-H3",
+    "ixrh4": "7220 IXR-H4",
+    "ixr6e": "7250 IXR-6e",
+    "ixr10e": "7250 IXR-10e",
+}
+CLAB_SRL_DEFAULT_TYPE = "ixrd2l"
+CLAB_SRL_KINDS = ("nokia_srlinux", "srl")
+ROLE_LABEL = "eda.nokia.com/role"
+
+
+class Topology:
+    """Nodes and links of a topology in NetBox terms"""
+
+    def __init__(self):
+        # name -> (device type model, role)
+        self.nodes = {}
+        # ((node, interface), (node, interface))
+        self.links = []
+        self.skipped_nodes = set()
+
+
+def guess_role(name):
+    for role in ("superspine", "spine", "leaf", "borderleaf"):
+        if role in name:
+            return role
+    return "switch"
+
+
+def cx_interface_name(name):
+    """CX uses ethernet-1-49; NetBox device types use ethernet-1/49"""
+    if name.startswith("ethernet-"):
+        prefix, rest = name.split("-", 1)
+        return f"{prefix}-{rest.replace('-', '/')}"
+    return name
+
+
+def parse_clab(doc):
+    topology = Topology()
+    topo = doc.get("topology", {})
+    defaults = topo.get("defaults", {})
+    kinds = topo.get("kinds", {})
+    for name, node in (topo.get("nodes") or {}).items():
+        node = node or {}
+        kind = node.get("kind") or defaults.get("kind")
+        if kind not in CLAB_SRL_KINDS:
+            topology.skipped_nodes.add(name)
+            continue
+        node_type = (
+            node.get("type")
+            or kinds.get(kind, {}).get("type")
+            or defaults.get("type")
+            or CLAB_SRL_DEFAULT_TYPE
+        )
+        model = CLAB_SRL_TYPES.get(str(node_type).lower())
+        if model is None:
+            topology.skipped_nodes.add(name)
+            continue
+        role = (node.get("labels") or {}).get(ROLE_LABEL) or guess_role(name)
+        topology.nodes[name] = (model, role)
+
+    for link in topo.get("links") or []:
+        endpoints = link.get("endpoints") or []
+        if len(endpoints) != 2 or not all(isinstance(ep, str) for ep in endpoints):
+            continue
+        (a_node, a_if), (b_node, b_if) = (ep.split(":", 1) for ep in endpoints)
+        topology.links.append(((a_node, a_if), (b_node, b_if)))
+    return topology
+
+
+def parse_cx(doc):
+    topology = Topology()
+    spec = doc.get("spec", {})
+    templates = {t["name"]: t for t in spec.get("nodeTemplates") or []}
+    for node in spec.get("nodes") or []:
+        template = templates.get(node.get("template"), {})
+        model = node.get("platform") or template.get("platform")
+        if not model:
+            topology.skipped_nodes.add(node["name"])
+            continue
+        labels = dict(template.get("labels") or {})
+        labels.update(node.get("labels") or {})
+        role = labels.get(ROLE_LABEL) or guess_role(node["name"])
+        topology.nodes[node["name"]] = (model, role)
+
+    for link in spec.get("links") or []:
+        for endpoint in link.get("endpoints") or []:
+            local, remote = endpoint.get("local"), endpoint.get("remote")
+            if not local or not remote:
+                # Edge links to simulated nodes have no NetBox counterpart
+                continue
+            topology.links.append(
+                (
+                    (local["node"], cx_interface_name(local["interface"])),
+                    (remote["node"], cx_interface_name(remote["interface"])),
+                )
+            )
+    return topology
+
+
+def load_topology(path):
+    with open(path, "r") as f:
+        doc = yaml.load(f, Loader=YamlLoader)
+    if doc.get("kind") == "NetworkTopology":
+        return parse_cx(doc)
+    return parse_clab(doc)
+
+
+class TopologySync:
+    """Create devices, interfaces and cables for a topology in bulk"""
+
+    PAGE_SIZE = 1000
+    BULK_SIZE = 500
+    MANUFACTURER = "nokia"
+
+    def __init__(self, netbox_url, api_token, site_id, tenant_id=None, dry_run=False, session=None):
+        self.netbox_url = netbox_url.rstrip("/")
+        self.session = session or NetBoxSession(api_token)
+        self.site_id = site_id
+        self.tenant_id = tenant_id
+        self.dry_run = dry_run
+        self.errors = []
+
+    def _error(self, message):
+        print(message)
+        self.errors.append(message)
+
+    def iter_objects(self, endpoint, params, fields=("id",)):
+        """Stream compact records of the projected fields from a list endpoint"""
+        try:
+            yield from self.session.iter_results(
+                f"{self.netbox_url}/api/{endpoint}/",
+                params,
+                fields=fields,
+                page_size=self.PAGE_SIZE,
+            )
+        except requests.HTTPError as exc:
+            self._error(f"Error listing {endpoint}: {exc.response.status_code}")
+
+    def bulk_create(self, endpoint, objects):
+        """POST objects in chunks; return the created objects"""
+        created = []
+        if self.dry_run:
+            return created
+        for start in range(0, len(objects), self.BULK_SIZE):
+            chunk = objects[start:start + self.BULK_SIZE]
+            response = self.session.post(f"{self.netbox_url}/api/{endpoint}/", json=chunk)
+            if response.status_code == 201:
+                created.extend(response.json())
+            else:
+                self._error(
+                    f"Error creating {len(chunk)} objects on {endpoint}: "
+                    f"{response.status_code} {response.text[:500]}"
+                )
+        return created
+
+    @traced
+    def device_types(self, models):
+        """Map the required device type models to IDs"""
+        found = {}
+        for item in self.iter_objects(
+            "dcim/device-types", {"manufacturer": self.MANUFACTURER}, ("id", "model")
+        ):
+            if item.model in models:
+                found[item.model] = item.id
+        return found
+
+    @traced
+    def device_roles(self, roles):
+        """Map role names to IDs, creating missing roles"""
+        found = {}
+        for item in self.iter_objects("dcim/device-roles", {}, ("id", "slug")):
+            if item.slug in roles:
+                found[item.slug] = item.id
+        missing = sorted(roles.difference(found))
+        for role in self.bulk_create(
+            "dcim/device-roles",
+            [{"name": r, "slug": r, "color": "9e9e9e"} for r in missing],
+        ):
+            found[role["slug"]] = role["id"]
+        return found
+
+    @traced
+    def sync_devices(self, topology):
+        models = {model for model, _ in topology.nodes.values()}
+        type_ids = self.device_types(models)
+        for model in sorted(models.difference(type_ids)):
+            self._error(
+                f"Device type '{model}' not found in NetBox; run import_device_types.py first"
+            )
+        role_ids = self.device_roles({role for _, role in topology.nodes.values()})
+
+        device_ids = {}
+        for item in self.iter_objects(
+            "dcim/devices", {"site_id": self.site_id}, ("id", "name")
+        ):
+            if item.name in topology.nodes:
+                device_ids[item.name] = item.id
+
+        new_devices = []
+        for name, (model, role) in topology.nodes.items():
+            if name in device_ids or model not in type_ids:
+                continue
+            device = {
+                "name": name,
+                "device_type": type_ids[model],
+                "role": role_ids.get(role),
+                "site": self.site_id,
+                "status": "active",
+            }
+            if self.tenant_id:
+                device["tenant"] = self.tenant_id
+            new_devices.append(device)
+
+        print(f"Devices: {len(device_ids)} existing, {len(new_devices)} to create")
+        for device in self.bulk_create("dcim/devices", new_devices):
+            device_ids[device["name"]] = device["id"]
+        return device_ids
+
+    @traced
+    def sync_interfaces(self, topology, device_ids):
+        """Map link endpoints to interface IDs, creating interfaces not in the templates"""
+        wanted = set()
+        for a, b in topology.links:
+            for node, interface in (a, b):
+                if node in topology.nodes:
+                    wanted.add((node, interface))
+
+        names_by_id = {device_id: name for name, device_id in device_ids.items()}
+        interface_ids = {}
+        cabled = set()
+        for item in self.iter_objects(
+            "dcim/interfaces",
+            {"site_id": self.site_id},
+            ("id", "name", "device.id", "cable.id"),
+        ):
+            key = (names_by_id.get(item.device_id), item.name)
+            if key in wanted:
+                interface_ids[key] = item.id
+                if item.cable_id:
+                    cabled.add(item.id)
+
+        missing = sorted(wanted.difference(interface_ids))
+        print(f"Interfaces: {len(interface_ids)} existing, {len(missing)} to create")
+        created = self.bulk_create(
+            "dcim/interfaces",
+            [
+                {"device": device_ids[node], "name": interface, "type": "other"}
+                for node, interface in missing
+                if node in device_ids
+            ],
+        )
+        for item in created:
+            interface_ids[(names_by_id[item["device"]["id"]], item["name"])] = item["id"]
+        return interface_ids, cabled
+
+    @traced
+    def sync_cables(self, topology, interface_ids, cabled):
+        new_cables = []
+        existing = 0
+        for a, b in topology.links:
+            if a not in interface_ids or b not in interface_ids:
+                continue
+            a_id, b_id = interface_ids[a], interface_ids[b]
+            if a_id in cabled or b_id in cabled:
+                existing += 1
+                continue
+            cable = {
+                "a_terminations": [{"object_type": "dcim.interface", "object_id": a_id}],
+                "b_terminations": [{"object_type": "dcim.interface", "object_id": b_id}],
+                "status": "connected",
+                "label": f"{a[0]}:{a[1]}--{b[0]}:{b[1]}"[:100],
+            }
+            if self.tenant_id:
+                cable["tenant"] = self.tenant_id
+            new_cables.append(cable)
+            cabled.update((a_id, b_id))
+
+        print(f"Cables: {existing} existing, {len(new_cables)} to create")
+        return self.bulk_create("dcim/cables", new_cables)
+
+    @traced
+    def run(self, topology):
+        if topology.skipped_nodes:
+            print(
+                f"Skipping {len(topology.skipped_nodes)} nodes without a Nokia device type: "
+                + ", ".join(sorted(topology.skipped_nodes)[:10])
+                + (" ..." if len(topology.skipped_nodes) > 10 else "")
+            )
+        device_ids = self.sync_devices(topology)
+        interface_ids, cabled = self.sync_interfaces(topology, device_ids)
+        self.sync_cables(topology, interface_ids, cabled)
+        return not self.errors
+
+
+def lookup_id(session, netbox_url, endpoint, params):
+    response = session.get(f"{netbox_url}/api/{endpoint}/", params=dict(params, brief=1))
+    if response.status_code != 200 or response.json().get("count", 0) == 0:
+        return None
+    return response.json()["results"][0]["id"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Sync a containerlab or CX topology file into NetBox DCIM"
+    )
+    parser.add_argument(
+        "topology",
+        help="Topology file (e.g. eda-nb.clab.yaml or cx/topology/lab-topo.yaml)",
+    )
+    parser.add_argument(
+        "--tenant",
+        default="eda",
+        help="Tenant owning the devices and the target site (default: eda)",
+    )
+    parser.add_argument(
+        "--site",
+        default=None,
+        help="Site slug to place devices in (default: the tenant's site)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report what would be created",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with open(".netbox_url", "r") as f:
+        netbox_url = f.read().strip().rstrip("/")
+    api_token = get_api_token()
+
+    topology = load_topology(args.topology)
+    print(f"Topology: {len(topology.nodes)} nodes, {len(topology.links)} links")
+
+    session = NetBoxSession(api_token)
+    tenant_id = lookup_id(session, netbox_url, "tenancy/tenants", {"slug": args.tenant})
+    if args.site:
+        site_id = lookup_id(session, netbox_url, "dcim/sites", {"slug": args.site})
+    else:
+        site_id = lookup_id(session, netbox_url, "dcim/sites", {"tenant": args.tenant})
+    if site_id is None:
+        print("Error: target site not found. Has the EDA Instance synced its site?")
+        sys.exit(1)
+
+    # One session for the lookups and the sync, so the metrics cover both
+    sync = TopologySync(
+        netbox_url, api_token, site_id, tenant_id, dry_run=args.dry_run, session=session
+    )
+    with span("sync_topology", topology=args.topology):
+        ok = sync.run(topology)
+    print(f"NetBox client: {format_metrics(sync.session.metrics())}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+from bench_allocations import PoolState
+
+
+def make_pool():
+    pool = PoolState("isl-v4", "eda-isl-v4", "available-prefixes", 31, {"id": 1, "prefix": "10.0.0.0/24"})
+    pool.record({"id": 10, "prefix": "10.0.0.0/31"})
+    pool.record({"id": 11, "prefix": "10.0.0.2/31"})
+    return pool
+
+
+def test_failed_release_keeps_the_object_held():
+    pool = make_pool()
+
+    obj_id = pool.pick_release()
+    pool.finish_release(obj_id, gone=False)
+
+    assert set(pool.held) == {10, 11}
+    assert pool.releasing == set()
+
+
+def test_object_is_dropped_once_gone_and_not_picked_twice():
+    pool = make_pool()
+
+    first = pool.pick_release()
+    second = pool.pick_release()
+    assert {first, second} == {10, 11}
+    assert pool.pick_release() is None
+
+    pool.finish_release(first, gone=True)
+    assert set(pool.held) == {second}
+    assert len(pool.owners) == 1
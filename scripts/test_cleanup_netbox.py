@@ -0,0 +1,98 @@
+import pytest
+
+from cleanup_netbox import CleanupJournal, NetBoxCleaner
+from configure_netbox import NetBoxConfigurator, configure
+from netbox_client import AsyncFanout
+
+EDA_API = "eda.example.com:9443"
+CONFIGURED = [
+    "extras/tags",
+    "extras/webhooks",
+    "extras/event-rules",
+    "extras/config-contexts",
+    "ipam/prefixes",
+    "ipam/vlan-groups",
+    "ipam/asn-ranges",
+    "ipam/rirs",
+]
+
+
+@pytest.fixture(params=["blocking", "fanout"])
+def cleaner(request, netbox):
+    cleaner = NetBoxCleaner(netbox.url, "token")
+    if request.param == "fanout":
+        cleaner.fanout = AsyncFanout("token", netbox.url)
+    yield cleaner
+    if cleaner.fanout is not None:
+        cleaner.fanout.close()
+
+
+def test_cleanup_reverts_configure(netbox, cleaner):
+    assert configure(NetBoxConfigurator(netbox.url, "token"), EDA_API)
+
+    assert cleaner.run_cleanup()
+
+    for endpoint in CONFIGURED:
+        assert netbox.objects(endpoint) == [], endpoint
+    # EDA owns the tenant; the site goes with it
+    assert len(netbox.objects("tenancy/tenants")) == 1
+    assert netbox.objects("dcim/sites") == []
+
+
+def test_gc_deletes_eda_allocations(netbox, cleaner):
+    netbox.add("extras/tags", {"name": "eda-isl-v4", "slug": "eda-isl-v4"})
+    tagged = [{"name": "eda-isl-v4"}]
+    parent = netbox.add("ipam/prefixes", {"prefix": "10.1.0.0/16", "tags": tagged})
+    child = netbox.add("ipam/prefixes", {"prefix": "10.1.0.0/31", "tags": tagged})
+    for host in range(5):
+        netbox.add("ipam/ip-addresses", {"address": f"10.1.1.{host}/31", "tags": tagged})
+    kept = netbox.add("ipam/ip-addresses", {"address": "192.0.2.1/32"})
+    cleaner.BULK_DELETE_SIZE = 2
+
+    assert cleaner.run_cleanup(gc=True)
+
+    assert netbox.objects("ipam/ip-addresses") == [kept]
+    assert netbox.objects("ipam/prefixes") == []
+    deletes = [path for method, path in netbox.requests if method == "DELETE"]
+    assert deletes.count("/api/ipam/ip-addresses/") == 3  # chunks of 2
+    deleted = [
+        change["changed_object_id"] for change in netbox.changes
+        if change["action"] == "delete" and change["changed_object_type"] == "ipam.prefix"
+    ]
+    # The most specific prefix goes first
+    assert deleted == [child["id"], parent["id"]]
+
+
+def test_cleanup_runs_again_on_the_same_cleaner(netbox, cleaner):
+    for _ in range(2):
+        assert configure(NetBoxConfigurator(netbox.url, "token"), EDA_API)
+        assert cleaner.run_cleanup()
+
+        for endpoint in CONFIGURED:
+            assert netbox.objects(endpoint) == [], endpoint
+
+
+def test_delete_by_name_repeats(netbox, cleaner):
+    for _ in range(2):
+        netbox.add("extras/tags", {"name": "eda-vlans", "slug": "eda-vlans"})
+        assert cleaner.delete_by_name("extras/tags", "eda-vlans")
+        assert netbox.objects("extras/tags") == []
+
+
+def test_paused_cleanup_resumes_from_journal(netbox, tmp_path):
+    assert configure(NetBoxConfigurator(netbox.url, "token"), EDA_API)
+    path = str(tmp_path / "cleanup.journal")
+    journal = CleanupJournal(path)
+    journal.open(netbox.url)
+
+    assert not NetBoxCleaner(netbox.url, "token", journal, max_deletes=4).run_cleanup()
+    assert netbox.objects("ipam/prefixes")
+
+    journal = CleanupJournal(path)
+    assert journal.open(netbox.url)
+    cleaner = NetBoxCleaner(netbox.url, "token", journal)
+    assert cleaner.run_cleanup()
+    for endpoint in CONFIGURED:
+        assert netbox.objects(endpoint) == [], endpoint
+    # The journal is finished, so the next cleanup starts over
+    assert not CleanupJournal(path).open(netbox.url)
@@ -0,0 +1,91 @@
+import pytest
+
+from configure_netbox import NetBoxConfigurator, configure
+from netbox_client import AsyncFanout
+
+EDA_API = "eda.example.com:9443"
+
+
+@pytest.fixture(params=["blocking", "fanout"])
+def configurator(request, netbox):
+    configurator = NetBoxConfigurator(netbox.url, "token")
+    if request.param == "fanout":
+        configurator.fanout = AsyncFanout("token", netbox.url, cache=configurator.session.cache)
+    yield configurator
+    if configurator.fanout is not None:
+        configurator.fanout.close()
+
+
+def names(netbox, endpoint, field="name"):
+    return sorted(obj[field] for obj in netbox.objects(endpoint))
+
+
+def test_configure_creates_pools(netbox, configurator):
+    assert configure(configurator, EDA_API)
+
+    assert names(netbox, "extras/tags") == sorted(tag["name"] for tag in configurator.TAGS)
+    assert names(netbox, "ipam/prefixes", "prefix") == sorted(
+        prefix["prefix"] for prefix in configurator.PREFIXES
+    )
+    assert names(netbox, "ipam/vlan-groups") == sorted(
+        group["name"] for group in configurator.VLAN_GROUPS
+    )
+    assert names(netbox, "extras/webhooks") == ["eda"]
+    assert names(netbox, "extras/event-rules") == ["eda"]
+    tenant_id = netbox.objects("tenancy/tenants")[0]["id"]
+    assert all(prefix["tenant"] == tenant_id for prefix in netbox.objects("ipam/prefixes"))
+
+
+def test_write_count_covers_both_sessions(netbox, configurator):
+    configure(configurator, EDA_API)
+
+    writes = [method for method, _ in netbox.requests if method in ("POST", "PATCH")]
+    assert configurator.write_count == len(writes)
+    if configurator.fanout is not None:
+        assert configurator.fanout.session.write_count > 0
+
+
+def test_second_run_takes_fast_path(netbox, configurator, capsys):
+    assert configure(configurator, EDA_API)
+    writes = configurator.write_count
+    capsys.readouterr()
+
+    assert configure(configurator, EDA_API)
+    assert "up to date" in capsys.readouterr().out
+    assert configurator.write_count == writes
+
+
+def test_existing_prefix_is_bound_to_tenant(netbox, configurator):
+    netbox.add("ipam/prefixes", {"prefix": "10.0.0.0/16"})
+
+    assert configure(configurator, EDA_API)
+
+    prefixes = [prefix for prefix in netbox.objects("ipam/prefixes") if prefix["prefix"] == "10.0.0.0/16"]
+    assert len(prefixes) == 1
+    assert prefixes[0]["tenant"] == netbox.objects("tenancy/tenants")[0]["id"]
+
+
+def test_eda_site_sync_is_not_drift(netbox, configurator, capsys):
+    assert configure(configurator, EDA_API)
+    site = netbox.objects("dcim/sites")[0]
+    netbox.update("dcim/sites", site["id"], {"description": "synced by EDA"})
+    capsys.readouterr()
+
+    assert configure(configurator, EDA_API)
+    assert "up to date" in capsys.readouterr().out
+
+
+def test_missing_tenant_does_not_block_fast_path(netbox, configurator, capsys):
+    netbox.delete("dcim/sites", [site["id"] for site in netbox.objects("dcim/sites")])
+    netbox.delete("tenancy/tenants", [tenant["id"] for tenant in netbox.objects("tenancy/tenants")])
+    assert configure(configurator, EDA_API)
+    capsys.readouterr()
+
+    assert configure(configurator, EDA_API)
+    assert "up to date" in capsys.readouterr().out
+
+    # Once EDA syncs its tenant, the next run binds the prefixes to it
+    tenant = netbox.add("tenancy/tenants", {"name": "eda", "slug": "eda"})
+    assert configure(NetBoxConfigurator(netbox.url, "token"), EDA_API)
+    assert "appeared" in capsys.readouterr().out
+    assert all(prefix.get("tenant") == tenant["id"] for prefix in netbox.objects("ipam/prefixes"))
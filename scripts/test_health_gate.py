@@ -0,0 +1,45 @@
+import threading
+import warnings
+
+from urllib3.exceptions import InsecureRequestWarning
+
+from health_gate import HealthGate
+
+
+def test_stuck_probe_is_not_started_again(netbox):
+    gate = HealthGate(netbox.url, "token", skip=["api", "worker", "postgres", "valkey"])
+    release = threading.Event()
+    started = []
+
+    def stuck(deadline):
+        started.append(deadline)
+        release.wait(5)
+        return "late"
+
+    gate.probes["worker"] = stuck
+    gate.deadlines["worker"] = 0.2
+    try:
+        first = gate.check()
+        second = gate.check()
+    finally:
+        release.set()
+
+    assert len(started) == 1
+    assert [result.component for result in first.failing] == ["worker"]
+    assert [result.detail for result in second.failing] == ["still stuck in an earlier round"]
+    assert second.results[0].healthy
+
+
+def test_insecure_warnings_are_filtered_for_lab_hosts_only():
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        HealthGate("https://netbox.lab.example", "token", eda_api="eda.lab.example:9443")
+        for host in ("netbox.lab.example", "eda.lab.example", "elsewhere.example"):
+            warnings.warn(
+                f"Unverified HTTPS request is being made to host '{host}'. ",
+                InsecureRequestWarning,
+            )
+
+    assert [str(warning.message) for warning in caught] == [
+        "Unverified HTTPS request is being made to host 'elsewhere.example'. "
+    ]
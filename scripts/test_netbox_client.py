@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from netbox_client import NetBoxSession, ResponseCache, ResultsParser, iter_json_results
+
+ITEMS = [
+    {"id": 1, "name": "plain"},
+    {"id": 2, "name": 'quote " and ] and } and ,', "tags": [{"name": "eda-vlans"}]},
+    {"id": 3, "description": "escapes \\ \" \n \t \u00e9 \U0001f600"},
+    {"id": 4, "name": "unicodé ☃", "nested": {"results": [1, 2]}},
+    {"id": 5, "custom_fields": {}, "status": {"value": "active"}},
+]
+
+
+def chunked(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 100])
+def test_items_survive_any_chunk_split(size):
+    document = {"count": len(ITEMS), "next": None, "previous": None, "results": ITEMS}
+    page = {}
+
+    items = list(iter_json_results(chunked(json.dumps(document).encode(), size), page))
+
+    assert items == ITEMS
+    assert page == {"count": len(ITEMS), "next": None, "previous": None}
+
+
+@pytest.mark.parametrize("size", [1, 5])
+def test_escaped_strings_inside_items(size):
+    document = json.dumps({"results": ITEMS[1:3]}, ensure_ascii=False).encode()
+
+    assert list(iter_json_results(chunked(document, size))) == ITEMS[1:3]
+
+
+def test_items_are_returned_as_they_complete():
+    parser = ResultsParser()
+    head, tail = b'{"count": 2, "results": [{"id": 1}, {"id"', b': 2}]}'
+
+    assert parser.feed(head) == [{"id": 1}]
+    assert parser.feed(tail) == [{"id": 2}]
+    assert parser.done
+
+
+def test_empty_results():
+    assert list(iter_json_results([b'{"count": 0, "results": []}'])) == []
+
+
+def test_truncated_document_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_results([b'{"results": [{"id": 1}, {"id": 2']))
+
+
+def test_concurrent_identical_gets_are_sent_once():
+    cache = ResponseCache()
+    release = threading.Event()
+    sent = []
+
+    def send():
+        sent.append(1)
+        release.wait(5)
+        return SimpleNamespace(status_code=200)
+
+    key = ("http://netbox/api/extras/tags/?name=x", "extras/tags")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.fetch(key, send))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Hold the leader's request until every other thread waits on it
+    deadline = time.monotonic() + 5
+    while cache.snapshot()["cache_coalesced"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(sent) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    assert cache.fetch(key, send) is results[0]
+    assert cache.snapshot()["cache_hits"] == 1
+
+
+def test_concurrent_identical_async_gets_are_sent_once():
+    cache = ResponseCache()
+    sent = []
+
+    async def send():
+        sent.append(1)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(status_code=200)
+
+    async def main():
+        key = ("http://netbox/api/ipam/prefixes/", "ipam/prefixes")
+        return await asyncio.gather(*(cache.fetch_async(key, send) for _ in range(8)))
+
+    results = asyncio.run(main())
+
+    assert len(sent) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_write_during_fetch_keeps_the_answer_out_of_the_cache():
+    cache = ResponseCache()
+    key = ("http://netbox/api/extras/tags/", "extras/tags")
+
+    def send():
+        cache.invalidate("http://netbox/api/extras/tags/7/")
+        return SimpleNamespace(status_code=200)
+
+    cache.fetch(key, send)
+
+    assert key not in cache.entries
+
+
+def test_write_invalidates_its_endpoint_and_the_change_log(netbox):
+    session = NetBoxSession("token", cache=True)
+    tags = f"{netbox.url}/api/extras/tags/"
+    prefixes = f"{netbox.url}/api/ipam/prefixes/"
+    changes = f"{netbox.url}/api/core/object-changes/"
+    for url in (tags, prefixes, changes):
+        session.get(url)
+
+    session.post(tags, json={"name": "eda-vlans", "slug": "eda-vlans"})
+
+    assert session.get(tags).json()["count"] == 1
+    assert session.get(changes).json()["count"] == 3
+    session.get(prefixes)
+    gets = [path for method, path in netbox.requests if method == "GET"]
+    assert gets.count("/api/extras/tags/") == 2
+    assert gets.count("/api/core/object-changes/") == 2
+    assert gets.count("/api/ipam/prefixes/") == 1
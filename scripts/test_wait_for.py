@@ -0,0 +1,51 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from netbox_client import NetBoxSession
+from wait_for import WaitTimeout, wait_for_site
+
+
+def test_wait_for_site_polls_netbox_and_keeps_the_cache(netbox):
+    session = NetBoxSession("token", cache=True)
+    tags_url = f"{netbox.url}/api/extras/tags/"
+    session.get(tags_url)
+    timer = threading.Timer(
+        0.3,
+        netbox.add,
+        ("dcim/sites", {"name": "lab", "slug": "lab", "custom_fields": {"objectName": "eda/lab"}}),
+    )
+    timer.start()
+    try:
+        wait_for_site(netbox.url, "token", "eda/lab", timeout=10, session=session)
+    finally:
+        timer.cancel()
+
+    polls = [path for method, path in netbox.requests if path == "/api/dcim/sites/"]
+    assert len(polls) > 1
+    session.get(tags_url)
+    assert session.cache.snapshot()["cache_hits"] == 1
+
+
+def test_wait_for_site_keeps_polling_through_a_non_json_page():
+    class ProxyPage(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            body = b"<html>upstream not ready</html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = HTTPServer(("127.0.0.1", 0), ProxyPage)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    try:
+        with pytest.raises(WaitTimeout):
+            wait_for_site(f"http://127.0.0.1:{server.server_address[1]}", "token", "eda/lab", timeout=1)
+    finally:
+        server.shutdown()
+        server.server_close()
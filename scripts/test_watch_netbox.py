@@ -0,0 +1,33 @@
+from configure_netbox import NetBoxConfigurator
+from watch_netbox import DriftWatcher
+
+EDA_API = "eda.example.com:9443"
+
+
+def test_poll_sends_one_query_and_matches_pairs(netbox, tmp_path):
+    watcher = DriftWatcher(
+        NetBoxConfigurator(netbox.url, "token"), EDA_API, str(tmp_path / "cursor")
+    )
+    assert watcher.start()
+    tag = netbox.objects("extras/tags")[0]
+
+    netbox.update("extras/tags", tag["id"], {"color": "ff0000"})
+    # Same ID as the managed tag, but an unmanaged prefix
+    netbox.changes.append({
+        "id": len(netbox.changes) + 1,
+        "action": "update",
+        "changed_object_type": "ipam.prefix",
+        "changed_object_id": tag["id"],
+    })
+    netbox.add("ipam/prefixes", {"prefix": "198.51.100.0/24"})
+    netbox.update("tenancy/tenants", netbox.objects("tenancy/tenants")[0]["id"], {"description": "x"})
+    netbox.requests.clear()
+
+    changes, last_id = watcher.poll()
+
+    assert [(c["changed_object_type"], c["changed_object_id"]) for c in changes] == [
+        ("extras.tag", tag["id"])
+    ]
+    # The cursor can move past unmanaged entries of the queried types
+    assert last_id == netbox.changes[-2]["id"]
+    assert netbox.requests == [("GET", "/api/core/object-changes/")]
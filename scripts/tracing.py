@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# /// script
+# dependencies = ["requests"]
+# ///
+"""Structured span tracing for the configure, cleanup and import scripts.
+
+Tracing is enabled by pointing EDA_NETBOX_TRACE at a file. Every finished
+span is appended to it as one JSON line in the Chrome Trace Event format
+("complete" events with microsecond timestamps), so a trace file can be
+opened in Perfetto or chrome://tracing after wrapping it with:
+
+    uv run scripts/tracing.py to-chrome trace.jsonl > trace.json
+
+When the variable is unset, spans are no-ops.
+"""
+
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+TRACE_ENV = "EDA_NETBOX_TRACE"
+
+
+class Span:
+    """A timed unit of work with attributes and an outcome."""
+
+    __slots__ = (
+        "tracer", "name", "category", "span_id", "parent_id", "attributes", "outcome", "start",
+        "previous",
+    )
+
+    def __init__(self, tracer, name, category, span_id, parent_id, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.outcome = "ok"
+        self.start = 0.0
+        self.previous = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def fail(self, reason=None):
+        self.outcome = "error"
+        if reason is not None:
+            self.attributes["error"] = reason
+
+    def __enter__(self):
+        self.start = time.time()
+        self.previous = _current_span.get()
+        _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.time()
+        if _current_span.get() is self:
+            _current_span.set(self.previous)
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            self.fail(f"{exc_type.__name__}: {exc}")
+        self.tracer._emit(self, end)
+        return False
+
+
+class _NullSpan:
+    """Span stand-in used when tracing is disabled."""
+
+    def set(self, key, value):
+        pass
+
+    def fail(self, reason=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+# The open span, per thread and per asyncio task: each task runs in a copy of
+# its creator's context, so concurrent coroutines keep their own parent chain
+_current_span = contextvars.ContextVar("eda_netbox_span", default=None)
+
+
+class Tracer:
+    """Writes finished spans to a JSONL file; nesting is tracked per thread and per task."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._file = open(path, "a", buffering=1) if path else None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pid = os.getpid()
+        self._run = f"{self._pid}-{int(time.time() * 1000)}"
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def span(self, name, category="step", attributes=None):
+        if not self._file:
+            return _NULL_SPAN
+        parent = _current_span.get()
+        parent_id = parent.span_id if parent is not None else None
+        return Span(self, name, category, next(self._ids), parent_id, dict(attributes or {}))
+
+    def _emit(self, span, end):
+        event = {
+            "name": span.name,
+            "cat": span.category,
+            "ph": "X",
+            "ts": int(span.start * 1_000_000),
+            "dur": int((end - span.start) * 1_000_000),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": dict(
+                span.attributes,
+                run=self._run,
+                span_id=span.span_id,
+                parent_id=span.parent_id,
+                outcome=span.outcome,
+            ),
+        }
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+
+_tracer = Tracer(os.environ.get(TRACE_ENV) or None)
+
+
+def get_tracer():
+    return _tracer
+
+
+def span(name, category="step", **attributes):
+    """Open a span on the process-wide tracer"""
+    return _tracer.span(name, category, attributes)
+
+
+def propagate(func):
+    """Wrap func so spans it opens in a worker thread nest under the caller's span"""
+    parent = _current_span.get() if _tracer.enabled else None
+    if parent is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Worker threads do not inherit the caller's context
+        token = _current_span.set(parent)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_span.reset(token)
+
+    return wrapper
+
+
+def _scalar_args(signature, args, kwargs):
+    try:
+        bound = signature.bind_partial(*args, **kwargs)
+    except TypeError:
+        return {}
+    return {
+        key: value
+        for key, value in bound.arguments.items()
+        if key != "self" and isinstance(value, (str, int, float, bool))
+    }
+
+
+def traced(func):
+    """Record a step span around each call, with scalar arguments as attributes
+
+    Works for coroutine functions too; concurrent tasks each nest under
+    the span that was open when they were created.
+    """
+    signature = inspect.signature(func)
+
+    def fail_on_new_errors(s, owner, errors_before):
+        # Configurator steps report failures through self.errors, not exceptions
+        errors = getattr(owner, "errors", ())
+        if len(errors) > errors_before:
+            s.fail(errors[-1])
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return await func(*args, **kwargs)
+            owner = args[0] if args else None
+            errors_before = len(getattr(owner, "errors", ()))
+            with _tracer.span(func.__name__, "step", _scalar_args(signature, args, kwargs)) as s:
+                result = await func(*args, **kwargs)
+                fail_on_new_errors(s, owner, errors_before)
+                return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _tracer.enabled:
+            return func(*args, **kwargs)
+        owner = args[0] if args else None
+        errors_before = len(getattr(owner, "errors", ()))
+        with _tracer.span(func.__name__, "step", _scalar_args(signature, args, kwargs)) as s:
+            result = func(*args, **kwargs)
+            fail_on_new_errors(s, owner, errors_before)
+            return result
+
+    return wrapper
+
+
+def run(cmd, **kwargs):
+    """subprocess.run wrapped in a kubectl/command span"""
+    if not _tracer.enabled:
+        return subprocess.run(cmd, **kwargs)
+    verb = " ".join(cmd[:2]) if cmd and cmd[0] == "kubectl" else cmd[0]
+    category = "kubectl" if cmd[0] == "kubectl" else "exec"
+    with _tracer.span(verb, category, {"command": " ".join(cmd)}) as s:
+        result = subprocess.run(cmd, **kwargs)
+        s.set("returncode", result.returncode)
+        if result.returncode != 0:
+            s.fail()
+        return result
+
+
+class TracedSession(requests.Session):
+    """requests.Session that records an HTTP span per request"""
+
+    def request(self, method, url, *args, **kwargs):
+        if not _tracer.enabled:
+            return super().request(method, url, *args, **kwargs)
+        parts = urlsplit(url)
+        with _tracer.span(
+            f"HTTP {method.upper()}",
+            "http",
+            {"http.method": method.upper(), "http.path": parts.path, "http.host": parts.netloc},
+        ) as s:
+            response = super().request(method, url, *args, **kwargs)
+            s.set("http.status_code", response.status_code)
+            if response.status_code >= 400:
+                s.fail(f"HTTP {response.status_code}")
+            return response
+
+
+def to_chrome(path, out=sys.stdout):
+    """Convert a JSONL trace into a Chrome trace JSON document"""
+    out.write('{"traceEvents": [\n')
+    first = True
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if not first:
+                out.write(",\n")
+            out.write(line)
+            first = False
+    out.write('\n], "displayTimeUnit": "ms"}\n')
+
+
+def summarize(path, out=sys.stdout, limit=20):
+    """Print the slowest steps of a JSONL trace"""
+    totals = {}
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            key = (event.get("cat"), event["name"])
+            count, dur, errors = totals.get(key, (0, 0, 0))
+            failed = event.get("args", {}).get("outcome") == "error"
+            totals[key] = (count + 1, dur + event["dur"], errors + int(failed))
+    rows = sorted(totals.items(), key=lambda kv: kv[1][1], reverse=True)[:limit]
+    out.write(f"{'CATEGORY':<8}  {'NAME':<32}  {'COUNT':>6}  {'TOTAL':>9}  ERRORS\n")
+    for (category, name), (count, dur, errors) in rows:
+        out.write(f"{category:<8}  {name:<32}  {count:>6}  {dur / 1e6:8.2f}s  {errors}\n")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect span traces written via EDA_NETBOX_TRACE")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    chrome = subparsers.add_parser("to-chrome", help="Convert JSONL spans to a Chrome trace JSON")
+    chrome.add_argument("path")
+    summary = subparsers.add_parser("summary", help="Print the slowest steps")
+    summary.add_argument("path")
+    summary.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "to-chrome":
+        to_chrome(args.path)
+    else:
+        summarize(args.path, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
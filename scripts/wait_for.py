@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# /// script
+# dependencies = ["requests"]
+# ///
+"""Wait for lab resources using Kubernetes watch streams and short-interval NetBox polling.
+
+Every wait returns as soon as its condition holds and reports the elapsed time,
+replacing the fixed sleep-poll loops previously used in init.sh.
+"""
+
+import argparse
+import json
+import os
+import selectors
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+import requests
+
+from tracing import TracedSession, traced
+
+
+class WaitTimeout(TimeoutError):
+    """Raised when a wait condition does not hold before its deadline."""
+
+
+def _watch_events(cmd: List[str], deadline: float) -> Iterator[Dict]:
+    """Yield watch events emitted by a `kubectl get --watch` command until the deadline."""
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    decoder = json.JSONDecoder()
+    buffer = ""
+    selector = selectors.DefaultSelector()
+    selector.register(proc.stdout, selectors.EVENT_READ)
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not selector.select(timeout=remaining):
+                continue
+            chunk = os.read(proc.stdout.fileno(), 65536)
+            if not chunk:
+                return
+            buffer += chunk.decode("utf-8", errors="replace")
+            while True:
+                buffer = buffer.lstrip()
+                if not buffer:
+                    break
+                try:
+                    event, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    break
+                buffer = buffer[end:]
+                yield event
+    finally:
+        selector.close()
+        if proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+@traced
+def wait_for_resource(
+    resource: str,
+    name: str,
+    namespace: Optional[str] = None,
+    condition: Optional[Callable[[Dict], bool]] = None,
+    timeout: float = 300,
+) -> float:
+    """Watch a Kubernetes resource until `condition` holds; return the elapsed seconds.
+
+    Without a condition the wait completes as soon as the object exists. The
+    watch is re-established if the API server closes the stream early.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    cmd = [
+        "kubectl",
+        "get",
+        resource,
+        f"--field-selector=metadata.name={name}",
+        "--watch",
+        "--output-watch-events",
+        "-o",
+        "json",
+    ]
+    if namespace:
+        cmd.extend(["-n", namespace])
+
+    while time.monotonic() < deadline:
+        for event in _watch_events(cmd, deadline):
+            if event.get("type") not in ("ADDED", "MODIFIED"):
+                continue
+            obj = event.get("object", {})
+            if condition is None or condition(obj):
+                return time.monotonic() - start
+        # Stream ended (API server timeout or kubectl error); back off briefly and rewatch
+        time.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+
+    target = f"{namespace}/{name}" if namespace else name
+    raise WaitTimeout(f"Timed out after {timeout:.0f}s waiting for {resource} {target}")
+
+
+def crd_established(obj: Dict) -> bool:
+    """Return True once a CustomResourceDefinition reports Established=True."""
+    for cond in obj.get("status", {}).get("conditions", []):
+        if cond.get("type") == "Established" and cond.get("status") == "True":
+            return True
+    return False
+
+
+def has_status(obj: Dict) -> bool:
+    """Return True once the controller has written a status to the object."""
+    return bool(obj.get("status"))
+
+
+def field_equals(path: str, value: str) -> Callable[[Dict], bool]:
+    """Build a condition comparing a dotted field path (e.g. status.result) to a value."""
+    keys = path.split(".")
+
+    def check(obj: Dict) -> bool:
+        current = obj
+        for key in keys:
+            if not isinstance(current, dict) or key not in current:
+                return False
+            current = current[key]
+        return str(current) == value
+
+    return check
+
+
+@traced
+def wait_for_crd(name: str, timeout: float = 300) -> float:
+    """Wait for a CRD to be established; return the elapsed seconds."""
+    return wait_for_resource(
+        "customresourcedefinitions", name, condition=crd_established, timeout=timeout
+    )
+
+
+def poll(
+    check: Callable[[], bool],
+    timeout: float,
+    initial_delay: float = 0.5,
+    max_delay: float = 5.0,
+    factor: float = 1.5,
+) -> float:
+    """Call `check` with exponential backoff until it returns True; return the elapsed seconds."""
+    start = time.monotonic()
+    deadline = start + timeout
+    delay = initial_delay
+    while True:
+        if check():
+            return time.monotonic() - start
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise WaitTimeout(f"Timed out after {timeout:.0f}s")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * factor, max_delay)
+
+
+@traced
+def wait_for_site(
+    netbox_url: str,
+    api_token: str,
+    object_name: str,
+    timeout: float = 600,
+    session: Optional[requests.Session] = None,
+) -> float:
+    """Wait for the EDA Instance to sync its site into NetBox; return the elapsed seconds."""
+    session = session or TracedSession()
+    url = f"{netbox_url.rstrip('/')}/api/dcim/sites/"
+    headers = {"Authorization": f"Token {api_token}"}
+
+    def site_synced() -> bool:
+        # Every poll must reach NetBox: a shared NetBoxSession never answers
+        # a streamed GET from its cache, and the rest of its cache is kept
+        try:
+            with session.get(
+                url,
+                params={"cf_objectName": object_name, "brief": 1, "limit": 1},
+                headers=headers,
+                timeout=10,
+                stream=True,
+            ) as response:
+                if response.status_code != 200:
+                    return False
+                data = response.json()
+        except (requests.RequestException, ValueError):
+            # ValueError: not JSON, e.g. a proxy error page; keep polling
+            return False
+        return data.get("count", 0) > 0
+
+    try:
+        return poll(site_synced, timeout)
+    except WaitTimeout:
+        raise WaitTimeout(
+            f"Timed out after {timeout:.0f}s waiting for site '{object_name}' in NetBox"
+        ) from None
+
+
+def parse_args(
+    argv: Optional[List[str]] = None, prog: Optional[str] = None
+) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=prog, description="Wait for EDA NetBox lab resources")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crd = subparsers.add_parser("crd", help="Wait for a CRD to be established")
+    crd.add_argument("name", help="CRD name, e.g. instances.netbox.eda.nokia.com")
+    crd.add_argument("--timeout", type=float, default=300)
+
+    resource = subparsers.add_parser(
+        "resource", help="Wait for a custom resource to exist and be reconciled"
+    )
+    resource.add_argument("resource", help="Resource type, e.g. instances.netbox.eda.nokia.com")
+    resource.add_argument("name", help="Resource name")
+    resource.add_argument("-n", "--namespace", default=None)
+    resource.add_argument(
+        "--field",
+        default=None,
+        help="Condition as PATH=VALUE (default: wait for a non-empty status)",
+    )
+    resource.add_argument("--timeout", type=float, default=300)
+
+    site = subparsers.add_parser("site", help="Wait for the EDA Instance site sync in NetBox")
+    site.add_argument("object_name", help="Value of the objectName custom field, e.g. eda-netbox/netbox")
+    site.add_argument("--netbox-url", default=None, help="NetBox URL (default: .netbox_url)")
+    site.add_argument("--timeout", type=float, default=600)
+    return parser.parse_args(argv)
+
+
+def main(
+    argv: Optional[List[str]] = None,
+    prog: Optional[str] = None,
+    api_token: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+) -> None:
+    """Run one wait; eda_netbox.py passes its arguments, the API token and a shared session."""
+    args = parse_args(argv, prog)
+    try:
+        if args.command == "crd":
+            elapsed = wait_for_crd(args.name, timeout=args.timeout)
+            print(f"CRD {args.name} is established (waited {elapsed:.2f}s)")
+        elif args.command == "resource":
+            condition = has_status
+            if args.field:
+                path, _, value = args.field.partition("=")
+                condition = field_equals(path, value)
+            elapsed = wait_for_resource(
+                args.resource,
+                args.name,
+                namespace=args.namespace,
+                condition=condition,
+                timeout=args.timeout,
+            )
+            print(f"{args.resource} {args.name} is ready (waited {elapsed:.2f}s)")
+        elif args.command == "site":
+            netbox_url = args.netbox_url
+            if not netbox_url:
+                with open(".netbox_url", "r") as f:
+                    netbox_url = f.read().strip()
+            api_token = api_token or os.environ.get("NETBOX_API_TOKEN")
+            if not api_token:
+                from configure_netbox import get_api_token
+
+                api_token = get_api_token()
+            elapsed = wait_for_site(
+                netbox_url, api_token, args.object_name, timeout=args.timeout, session=session
+            )
+            print(f"Site '{args.object_name}' synced (waited {elapsed:.2f}s)")
+    except WaitTimeout as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+#!/usr/bin/env python
+# /// script
+# dependencies = ["requests"]
+# ///
+"""
+Keep the EDA integration objects in NetBox converged by tailing the change log
+
+After an initial configure run, the watcher polls /api/core/object-changes/
+for entries newer than a persisted cursor, filtered in NetBox to the
+objects the configurator manages (one query per managed object type).
+Managed objects that were edited or renamed are patched back field by
+field, and deleted ones are recreated by the configurator step that owns
+them. When nothing changed, each interval costs one empty query per type.
+
+Drift-repair latency (change log timestamp to repaired) and poll counters
+are exported in the Prometheus text format when --metrics-port is set.
+
+    uv run scripts/watch_netbox.py --interval 10 --metrics-port 9464
+"""
+
+import argparse
+import collections
+import json
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from configure_netbox import (
+    EDA_OWNED,
+    NetBoxConfigurator,
+    configure,
+    drift_types,
+    get_api_token,
+    read_config_files,
+)
+from netbox_client import format_metrics
+from tracing import span, traced
+
+# Managed object types: API endpoint and the field identifying the desired entry
+OBJECT_TYPES = {
+    "extras.tag": ("extras/tags", "name"),
+    "extras.webhook": ("extras/webhooks", "name"),
+    "extras.eventrule": ("extras/event-rules", "name"),
+    "ipam.prefix": ("ipam/prefixes", "prefix"),
+    "ipam.vlangroup": ("ipam/vlan-groups", "name"),
+    "ipam.rir": ("ipam/rirs", "slug"),
+    "ipam.asnrange": ("ipam/asn-ranges", "slug"),
+    "tenancy.tenant": ("tenancy/tenants", "name"),
+    "dcim.site": ("dcim/sites", "name"),
+}
+# Only the name is compared here; the owning step checks the other fields
+OWNER_COMPARED = ("extras.eventrule",)
+# Write-only fields that NetBox never returns, so they cannot be compared
+WRITE_ONLY_FIELDS = ("secret",)
+# Outcomes of repairing one object
+IN_SYNC, REPAIRED, FAILED = "in-sync", "repaired", "failed"
+CHANGE_FIELDS = "id,time,action,changed_object_type,changed_object_id"
+
+
+def normalize(value):
+    """Reduce a NetBox API value to what the desired state specifies"""
+    if isinstance(value, dict):
+        if "value" in value:
+            return value["value"]
+        if "id" in value:
+            return value["id"]
+    if isinstance(value, list) and value and isinstance(value[0], dict) and "name" in value[0]:
+        # Tags: compare by name only
+        return sorted(item["name"] for item in value)
+    return value
+
+
+def parse_time(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+class DriftMetrics:
+    """Counters and a repair latency window, rendered as Prometheus text"""
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.counters = collections.Counter()
+        self.latencies = collections.deque(maxlen=window)
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.cursor = 0
+        self.last_poll = 0.0
+
+    def inc(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def observe_repair(self, latency):
+        with self.lock:
+            self.latencies.append(latency)
+            self.latency_sum += latency
+            self.latency_count += 1
+
+    def quantile(self, fraction):
+        ordered = sorted(self.latencies)
+        if not ordered:
+            return float("nan")
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for name in ("polls", "poll_errors", "changes_seen", "drifted_objects", "repairs", "repair_failures"):
+                lines.append(f"# TYPE netbox_drift_{name}_total counter")
+                lines.append(f"netbox_drift_{name}_total {self.counters[name]}")
+            lines.append("# TYPE netbox_drift_cursor gauge")
+            lines.append(f"netbox_drift_cursor {self.cursor}")
+            lines.append("# TYPE netbox_drift_last_poll_timestamp_seconds gauge")
+            lines.append(f"netbox_drift_last_poll_timestamp_seconds {self.last_poll:.3f}")
+            lines.append("# HELP netbox_drift_repair_latency_seconds Time from a change log entry to its repair")
+            lines.append("# TYPE netbox_drift_repair_latency_seconds summary")
+            for fraction in (0.5, 0.95, 0.99):
+                lines.append(
+                    f'netbox_drift_repair_latency_seconds{{quantile="{fraction}"}} {self.quantile(fraction):.3f}'
+                )
+            lines.append(f"netbox_drift_repair_latency_seconds_sum {self.latency_sum:.3f}")
+            lines.append(f"netbox_drift_repair_latency_seconds_count {self.latency_count}")
+            return "\n".join(lines) + "\n"
+
+
+def serve_metrics(metrics, port):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class DriftWatcher:
+    """Tail the NetBox change log and repair drift on managed objects"""
+
+    def __init__(self, configurator, eda_api, state_file, metrics=None):
+        self.configurator = configurator
+        self.netbox_url = configurator.netbox_url
+        self.session = configurator.session
+        self.eda_api = eda_api
+        self.state_file = state_file
+        self.metrics = metrics or DriftMetrics()
+        self.cursor = None
+        # object type -> set of IDs
+        self.managed = {}
+
+    def load_cursor(self):
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f).get("cursor")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save_cursor(self):
+        with open(self.state_file, "w") as f:
+            json.dump({"cursor": self.cursor}, f)
+        self.metrics.cursor = self.cursor
+
+    @traced
+    def start(self):
+        """Converge once, then pick up the managed set and the cursor"""
+        configurator = self.configurator
+        if not configure(configurator, self.eda_api):
+            return False
+        _, stored = configurator.load_fingerprint()
+        stored = stored or {}
+        self.managed = {key: set(ids) for key, ids in stored.get("objects", {}).items()}
+        for key, ids in configurator.managed.items():
+            self.managed.setdefault(key, set()).update(ids)
+        # Field repairs on prefixes include the tenant/site binding
+        if configurator.tenant_id is None:
+            configurator.get_tenant("eda")
+            configurator.get_site("eda")
+
+        cursor = self.load_cursor()
+        if cursor is None:
+            cursor = stored.get("change_id")
+        if cursor is None:
+            cursor = configurator.latest_change_id() or 0
+        self.cursor = cursor
+        self.save_cursor()
+        print(f"Watching NetBox change log from ID {self.cursor}")
+        return True
+
+    def poll(self):
+        """Return the managed objects' change log entries after the cursor, oldest first
+
+        Also returns the ID of the last entry read, managed or not, which
+        the cursor can move to once the entries are handled.
+        """
+        changes = []
+        last_id = self.cursor
+        for page in self.configurator.change_pages(self.cursor, drift_types(self.managed), CHANGE_FIELDS):
+            changes.extend(change for change in page if self.is_managed(change))
+            last_id = page[-1]["id"]
+        return changes, last_id
+
+    def is_managed(self, change):
+        return change.get("changed_object_id") in self.managed.get(
+            change.get("changed_object_type"), ()
+        )
+
+    def desired_objects(self, object_type):
+        """Desired payloads for a managed object type, keyed by identifying field"""
+        configurator = self.configurator
+        if object_type == "extras.tag":
+            entries = configurator.TAGS
+        elif object_type == "extras.webhook":
+            entries = [configurator.webhook_payload(self.eda_api)]
+        elif object_type == "ipam.prefix":
+            entries = []
+            for prefix in configurator.PREFIXES:
+                prefix = dict(prefix)
+                if configurator.tenant_id:
+                    prefix["tenant"] = configurator.tenant_id
+                if configurator.site_id:
+                    prefix["site"] = configurator.site_id
+                entries.append(prefix)
+        elif object_type == "ipam.vlangroup":
+            entries = configurator.VLAN_GROUPS
+        elif object_type == "ipam.asnrange":
+            entries = configurator.ASN_RANGES
+        elif object_type == "ipam.rir":
+            entries = [configurator.RIR]
+        elif object_type == "extras.eventrule":
+            entries = [{"name": "eda"}]
+        else:
+            return {}
+        key = OBJECT_TYPES[object_type][1]
+        return {entry[key]: entry for entry in entries}
+
+    def run_owner_step(self, object_type):
+        """Re-run the configurator step owning an object type; return True if it wrote anything"""
+        configurator = self.configurator
+        writes = configurator.write_count
+        if object_type == "extras.tag":
+            configurator.create_tags()
+        elif object_type == "extras.webhook":
+            webhook_id = configurator.create_webhook(self.eda_api)
+            if webhook_id:
+                configurator.create_event_rule(webhook_id)
+        elif object_type == "extras.eventrule":
+            webhook_ids = self.managed.get("extras.webhook") or {None}
+            webhook_id = next(iter(webhook_ids))
+            if webhook_id is None:
+                webhook_id = configurator.create_webhook(self.eda_api)
+            if webhook_id:
+                configurator.create_event_rule(webhook_id)
+        elif object_type == "ipam.prefix":
+            configurator.create_prefixes()
+        elif object_type == "ipam.vlangroup":
+            configurator.create_vlan_groups()
+        elif object_type in ("ipam.rir", "ipam.asnrange"):
+            configurator.create_asn_ranges()
+        return configurator.write_count > writes
+
+    def rename_target(self, object_type, current, desired_objects):
+        """Desired entry a renamed object belongs to, or None if all of them exist
+
+        Entries whose identifying value no longer exists in NetBox are the
+        candidates; with several, the one sharing most fields with the
+        object wins.
+        """
+        endpoint, key = OBJECT_TYPES[object_type]
+        response = self.session.get(
+            f"{self.netbox_url}/api/{endpoint}/",
+            params={key: sorted(desired_objects), "limit": len(desired_objects)},
+        )
+        if response.status_code != 200:
+            self.configurator._error(f"Error listing {endpoint}: {response.status_code}")
+            return None
+        present = {item.get(key) for item in response.json().get("results", [])}
+        missing = [entry for value, entry in desired_objects.items() if value not in present]
+        if not missing:
+            return None
+        return max(
+            missing,
+            key=lambda entry: sum(
+                normalize(current.get(field)) == normalize(value) for field, value in entry.items()
+            ),
+        )
+
+    @traced
+    def repair(self, object_type, obj_id):
+        """Bring one managed object back to its desired state; return the outcome"""
+        endpoint, key = OBJECT_TYPES.get(object_type, (None, None))
+        if endpoint is None:
+            return IN_SYNC
+        response = self.session.get(f"{self.netbox_url}/api/{endpoint}/{obj_id}/")
+        if response.status_code == 404:
+            print(f"  {object_type} {obj_id} was deleted; recreating")
+            self.managed[object_type].discard(obj_id)
+            # Nothing to write when it was recreated already (e.g. by us)
+            return REPAIRED if self.run_owner_step(object_type) else IN_SYNC
+        if response.status_code != 200:
+            self.configurator._error(
+                f"Error reading {object_type} {obj_id}: {response.status_code}"
+            )
+            return FAILED
+
+        current = response.json()
+        desired_objects = self.desired_objects(object_type)
+        desired = desired_objects.get(current.get(key))
+        if desired is None:
+            # Renamed: patch the identifying field back onto this object
+            # rather than letting the owning step create a duplicate
+            desired = self.rename_target(object_type, current, desired_objects)
+            if desired is None:
+                if not self.configurator.errors:
+                    print(f"  {object_type} {obj_id} was renamed and is no longer managed")
+                    self.managed[object_type].discard(obj_id)
+                return IN_SYNC
+
+        outcome = self.patch_fields(object_type, obj_id, current, desired)
+        if object_type in OWNER_COMPARED and outcome != FAILED:
+            if self.run_owner_step(object_type):
+                outcome = REPAIRED
+        return outcome
+
+    def patch_fields(self, object_type, obj_id, current, desired):
+        """PATCH the fields of `current` that differ from `desired`"""
+        endpoint = OBJECT_TYPES[object_type][0]
+        patch = {
+            field: value
+            for field, value in desired.items()
+            if field not in WRITE_ONLY_FIELDS
+            and normalize(current.get(field)) != normalize(value)
+        }
+        if not patch:
+            # Typically the change log entry of an earlier repair
+            return IN_SYNC
+        print(f"  {object_type} {obj_id} drifted ({', '.join(sorted(patch))}); patching")
+        response = self.session.patch(f"{self.netbox_url}/api/{endpoint}/{obj_id}/", json=patch)
+        if response.status_code != 200:
+            self.configurator._error(
+                f"Error repairing {object_type} {obj_id}: {response.status_code} {response.text}"
+            )
+            return FAILED
+        return REPAIRED
+
+    def handle(self, changes):
+        """Repair the managed objects touched by a batch of changes"""
+        self.metrics.inc("changes_seen", len(changes))
+        # Several edits to one object collapse into one repair, timed from the
+        # earliest of them
+        drifted = {}
+        for change in changes:
+            if not self.is_managed(change):
+                continue
+            target = (change["changed_object_type"], change["changed_object_id"])
+            if target[0] in EDA_OWNED:
+                continue
+            changed_at = parse_time(change.get("time"))
+            earliest = drifted.get(target)
+            if target not in drifted or (
+                changed_at is not None and (earliest is None or changed_at < earliest)
+            ):
+                drifted[target] = changed_at
+        if not drifted:
+            return
+
+        configurator = self.configurator
+        configurator.errors = []
+        configurator.managed = {}
+        repaired = False
+        for (object_type, obj_id), changed_at in sorted(drifted.items()):
+            with span("repair_drift", object_type=object_type, object_id=obj_id) as s:
+                outcome = self.repair(object_type, obj_id)
+                if configurator.errors:
+                    outcome = FAILED
+                s.set("outcome", outcome)
+                if outcome == FAILED:
+                    s.fail(configurator.errors[-1] if configurator.errors else None)
+            configurator.errors = []
+            if outcome == IN_SYNC:
+                continue
+            self.metrics.inc("drifted_objects")
+            if outcome == FAILED:
+                self.metrics.inc("repair_failures")
+                continue
+            repaired = True
+            self.metrics.inc("repairs")
+            if changed_at:
+                latency = max(0.0, time.time() - changed_at)
+                self.metrics.observe_repair(latency)
+                print(f"  repaired {object_type} {obj_id} {latency:.2f}s after the change")
+
+        # Objects recreated by owner steps have new IDs
+        for key, ids in configurator.managed.items():
+            self.managed.setdefault(key, set()).update(ids)
+        configurator.managed = {key: set(ids) for key, ids in self.managed.items()}
+        if repaired:
+            configurator.store_fingerprint(self.eda_api)
+
+    def run(self, interval, stop):
+        while not stop.is_set():
+            started = time.monotonic()
+            self.metrics.inc("polls")
+            # NetBox may have changed since the last interval
+            self.session.clear_cache()
+            try:
+                changes, last_id = self.poll()
+            except Exception as exc:
+                self.metrics.inc("poll_errors")
+                print(f"Warning: {exc}", file=sys.stderr)
+                changes, last_id = None, self.cursor
+            self.metrics.last_poll = time.time()
+            if changes:
+                print(f"{len(changes)} new change(s) up to ID {changes[-1]['id']}")
+                self.handle(changes)
+            if last_id != self.cursor:
+                # The cursor only advances once the batch has been handled, so
+                # a crash mid-repair replays it on restart
+                self.cursor = last_id
+                self.save_cursor()
+            stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Watch the NetBox change log and repair drift on EDA-managed objects"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=10,
+        help="Seconds between change log polls (default: 10)",
+    )
+    parser.add_argument(
+        "--state-file",
+        default=".netbox_drift_cursor",
+        help="File persisting the change log cursor (default: .netbox_drift_cursor)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics on this port at /metrics",
+    )
+    parser.add_argument(
+        "--pools",
+        default=None,
+        help="JSON file with prefixes, VLAN groups and ASN ranges (as for configure_netbox.py)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    netbox_url, eda_api, _ = read_config_files()
+    configurator = NetBoxConfigurator(netbox_url, api_token=get_api_token())
+    if args.pools:
+        configurator.load_pools(args.pools)
+
+    metrics = DriftMetrics()
+    if args.metrics_port:
+        serve_metrics(metrics, args.metrics_port)
+        print(f"Metrics on http://0.0.0.0:{args.metrics_port}/metrics")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    if not configurator.wait_for_netbox():
+        print("NetBox is not ready. Please check the deployment.")
+        sys.exit(1)
+    watcher = DriftWatcher(configurator, eda_api, args.state_file, metrics)
+    with span("watch_netbox_start"):
+        if not watcher.start():
+            print("Initial configuration failed; not starting the watcher")
+            sys.exit(1)
+    watcher.run(args.interval, stop)
+    print(f"Stopped at change ID {watcher.cursor}")
+    print(f"NetBox client: {format_metrics(configurator.session.metrics())}")
+
+
+if __name__ == "__main__":
+    main()